@@ -1,75 +1,600 @@
 """
 Thin async wrapper around the AceStep local REST API.
 
-AceStep runs as a separate process (default: http://localhost:8002).
+AceStep runs as a separate process (default: http://localhost:8002,
+ACESTEP_URL for another host, or a Unix socket when ACESTEP_UDS is set).
+ACESTEP_BACKENDS lists several instances to spread generation across.
 We never import AceStep directly — all communication is via HTTP.
 
 Key quirk: /query_result returns `result` as a JSON *string*, not a
-nested object. parse_result() handles that.
+nested object. _parse_entry() handles that.
 """
 
+import asyncio
+import copy
 import json
-import mimetypes
+import logging
 import os
-from pathlib import Path
+import random
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlparse
 
 import httpx
 
+logger = logging.getLogger("wrangler")
+
 _acestep_port = os.environ.get("ACESTEP_PORT", "8002")
-ACESTEP_BASE_URL = f"http://localhost:{_acestep_port}"
+# Opt-in Unix-domain socket (set by run.py --acestep-uds). When set, the
+# pool talks to AceStep over the socket and the URL host is only cosmetic.
+ACESTEP_UDS = os.environ.get("ACESTEP_UDS") or None
+ACESTEP_BASE_URL = ("http://acestep" if ACESTEP_UDS
+                    else (os.environ.get("ACESTEP_URL") or f"http://localhost:{_acestep_port}").rstrip("/"))
+
+
+def _parse_backend(spec: str) -> tuple[str, str | None]:
+    """(base_url, uds) for one ACESTEP_BACKENDS entry: a URL or unix:/path."""
+    if spec.startswith("unix:"):
+        return "http://acestep", spec[len("unix:"):]
+    return spec.rstrip("/"), None
+
+
+# Several AceStep instances (run.py --gpu 0,1,2): comma-separated base URLs
+# or unix:/socket paths. The first one is the primary and replaces the
+# single-instance settings above; see "Multiple backends" below.
+_BACKEND_SPECS = [s.strip() for s in os.environ.get("ACESTEP_BACKENDS", "").split(",") if s.strip()]
+if _BACKEND_SPECS:
+    ACESTEP_BASE_URL, ACESTEP_UDS = _parse_backend(_BACKEND_SPECS[0])
+# Remote mode only (see transfer.py): multipart upload target that stores a
+# file on the AceStep host and returns its server-side path.
+ACESTEP_UPLOAD_ROUTE = os.environ.get("ACESTEP_UPLOAD_ROUTE", "/v1/audio/upload")
+# AceStep's API has no route to stop a running task. A build that adds one
+# (POST {"task_id": ...}) can be named here; unset, cancel_task() is a no-op.
+ACESTEP_CANCEL_ROUTE = os.environ.get("ACESTEP_CANCEL_ROUTE", "")
 _TIMEOUT_SUBMIT  = httpx.Timeout(30.0)
 _TIMEOUT_POLL    = httpx.Timeout(10.0)
 _TIMEOUT_AUDIO   = httpx.Timeout(60.0)
 
+# ---------------------------------------------------------------------------
+# Shared connection pool
+# ---------------------------------------------------------------------------
+#
+# One AsyncClient for the whole process so status polls reuse keep-alive
+# connections instead of paying a TCP handshake each time. Opened on app
+# startup and closed on shutdown; created lazily if a call arrives first
+# (scripts, tests). Timeouts stay per call — the pool only owns connections.
+
+_POOL_MAX_CONNECTIONS = int(os.environ.get("ACESTEP_POOL_MAX_CONNECTIONS", "32"))
+_POOL_MAX_KEEPALIVE   = int(os.environ.get("ACESTEP_POOL_MAX_KEEPALIVE", "16"))
+_POOL_KEEPALIVE_EXPIRY = float(os.environ.get("ACESTEP_POOL_KEEPALIVE_EXPIRY", "30"))
+
+_client: httpx.AsyncClient | None = None
+_pool_stats = {"requests": 0, "connections_opened": 0, "errors": 0, "retries": 0}
+
+
+async def _trace(event_name: str, info: dict) -> None:
+    # httpcore trace hook — fires once per new socket, never for reused ones
+    if event_name in ("connection.connect_tcp.complete",
+                      "connection.connect_unix_socket.complete"):
+        _pool_stats["connections_opened"] += 1
+
+
+def _new_client(uds: str | None = None) -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=_POOL_KEEPALIVE_EXPIRY,
+    )
+    uds = uds or ACESTEP_UDS
+    # An explicit transport owns its own limits; the client's are ignored.
+    transport = httpx.AsyncHTTPTransport(uds=uds, limits=limits) if uds else None
+    return httpx.AsyncClient(limits=limits, transport=transport, timeout=_TIMEOUT_POLL)
+
+
+def _http() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _new_client()
+    return _client
+
+
+async def open_client() -> None:
+    """Create the shared client. Called from the app's startup hook."""
+    _http()
+
+
+async def close_client() -> None:
+    """Close the shared client(s) and their pooled connections."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    for b in _backends[1:]:
+        if b.client is not None:
+            await b.client.aclose()
+            b.client = None
+
+
+def pool_stats() -> dict:
+    """Request/connection counters for the shared client.
+
+    reused = requests served over an already-open keep-alive connection."""
+    requests = _pool_stats["requests"]
+    opened = _pool_stats["connections_opened"]
+    return {
+        **_pool_stats,
+        "reused": max(0, requests - opened),
+        "reuse_ratio": round(1 - opened / requests, 3) if requests else 0.0,
+        "max_connections": _POOL_MAX_CONNECTIONS,
+        "max_keepalive": _POOL_MAX_KEEPALIVE,
+        "transport": "uds" if ACESTEP_UDS else "tcp",
+    }
+
+
+# ---------------------------------------------------------------------------
+# Resilience: retries for idempotent calls + circuit breaker
+# ---------------------------------------------------------------------------
+#
+# While AceStep loads a model or restarts it answers with connection errors
+# or 5xx. Idempotent calls are retried with jittered exponential backoff;
+# after ACESTEP_BREAKER_THRESHOLD consecutive upstream faults the breaker
+# opens and every call fails fast with AceStepUnavailable (carrying a
+# Retry-After hint) until the cooldown elapses and one probe call succeeds.
+# 4xx replies are the caller's problem and never count against AceStep.
+
+_RETRY_MAX        = int(os.environ.get("ACESTEP_RETRY_MAX", "2"))
+_RETRY_BASE_S     = float(os.environ.get("ACESTEP_RETRY_BASE_MS", "250")) / 1000
+_RETRY_CAP_S      = 4.0
+_BREAKER_THRESHOLD = int(os.environ.get("ACESTEP_BREAKER_THRESHOLD", "5"))
+_BREAKER_COOLDOWN  = float(os.environ.get("ACESTEP_BREAKER_COOLDOWN", "15"))
+
+_RETRYABLE_STATUS = {500, 502, 503, 504}
+
+# POSTs that only read state — safe to repeat. Everything else that isn't a
+# GET (release_task, lora/load, training/start, ...) is never retried.
+_IDEMPOTENT_POSTS = {"/query_result", "/format_input"}
+
+# Per-endpoint retry overrides (route → extra attempts). /health is polled by
+# every tab already, so retrying it would only add load.
+_RETRY_POLICY: dict[str, int] = {
+    "/health": 0,
+    "/query_result": 3,
+}
+
+# state: closed | open | half_open
+_circuit = {"state": "closed", "failures": 0, "opened_at": 0.0, "trips": 0,
+            "probe_in_flight": False}
+
+
+class AceStepUnavailable(Exception):
+    """Raised without contacting AceStep while the circuit breaker is open."""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = max(1, int(retry_after + 0.999))
+        super().__init__(f"AceStep unavailable, retry in {self.retry_after}s")
+
+
+def _retries_for(method: str, route: str) -> int:
+    if method != "GET" and route not in _IDEMPOTENT_POSTS:
+        return 0
+    return _RETRY_POLICY.get(route, _RETRY_MAX)
+
+
+def _backoff(attempt: int) -> float:
+    """Full-jitter exponential backoff for retry number `attempt` (1-based)."""
+    return random.uniform(0, min(_RETRY_CAP_S, _RETRY_BASE_S * 2 ** (attempt - 1)))
+
+
+def _new_circuit() -> dict:
+    return {"state": "closed", "failures": 0, "opened_at": 0.0, "trips": 0,
+            "probe_in_flight": False}
+
+
+def _circuit_before_call(circuit: dict) -> bool:
+    """Fail fast while open. Returns True when this call is the half-open probe."""
+    if circuit["state"] == "closed":
+        return False
+    remaining = _BREAKER_COOLDOWN - (time.monotonic() - circuit["opened_at"])
+    if circuit["state"] == "open" and remaining <= 0:
+        circuit["state"] = "half_open"
+    if circuit["state"] == "half_open" and not circuit["probe_in_flight"]:
+        circuit["probe_in_flight"] = True
+        return True
+    raise AceStepUnavailable(max(remaining, 1.0))
+
+
+def _circuit_record(circuit: dict, ok: bool, probe: bool) -> None:
+    if probe:
+        circuit["probe_in_flight"] = False
+    if ok:
+        circuit["state"] = "closed"
+        circuit["failures"] = 0
+        return
+    circuit["failures"] += 1
+    if probe or (circuit["state"] == "closed" and circuit["failures"] >= _BREAKER_THRESHOLD):
+        if circuit["state"] != "open":
+            circuit["trips"] += 1
+        circuit["state"] = "open"
+        circuit["opened_at"] = time.monotonic()
+
+
+def _circuit_snapshot(circuit: dict) -> dict:
+    out = {k: circuit[k] for k in ("state", "failures", "trips")}
+    if circuit["state"] == "open":
+        remaining = _BREAKER_COOLDOWN - (time.monotonic() - circuit["opened_at"])
+        out["retry_after"] = max(0, round(remaining, 1))
+    return out
+
+
+def circuit_state() -> dict:
+    """Breaker snapshot (primary backend) for /api/health."""
+    return _circuit_snapshot(_circuit)
+
+
+def _is_upstream_fault(exc: Exception) -> bool:
+    if isinstance(exc, httpx.TransportError):
+        return True
+    return isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code in _RETRYABLE_STATUS
+
+
+async def _request(method: str, path: str, timeout: httpx.Timeout,
+                   stream: bool = False, backend: int = 0, **kwargs) -> httpx.Response:
+    """Send one request to AceStep over the shared pool; raises on HTTP errors.
+
+    Goes through the backend's circuit breaker and, for idempotent routes,
+    retries upstream faults with backoff. With stream=True the body is left
+    unread and the caller must aclose()."""
+    b = _backends[backend]
+    circuit = b.circuit
+    route = path.split("?", 1)[0]
+    retries = _retries_for(method, route)
+    attempt = 0
+    while True:
+        probe = _circuit_before_call(circuit)
+        _pool_stats["requests"] += 1
+        client = b.http()
+        try:
+            req = client.build_request(
+                method, f"{b.url}{path}", timeout=timeout,
+                extensions={"trace": _trace}, **kwargs,
+            )
+            r = await client.send(req, stream=stream)
+            if stream and r.is_error:
+                await r.aclose()
+            r.raise_for_status()
+        except asyncio.CancelledError:
+            if probe:
+                circuit["probe_in_flight"] = False
+            raise
+        except Exception as exc:
+            _pool_stats["errors"] += 1
+            fault = _is_upstream_fault(exc)
+            _circuit_record(circuit, not fault, probe)
+            if fault and attempt < retries and circuit["state"] == "closed":
+                attempt += 1
+                _pool_stats["retries"] += 1
+                await asyncio.sleep(_backoff(attempt))
+                continue
+            raise
+        _circuit_record(circuit, True, probe)
+        return r
+
+
+# ---------------------------------------------------------------------------
+# Multiple backends
+# ---------------------------------------------------------------------------
+#
+# With ACESTEP_BACKENDS set, each AceStep instance (normally one per GPU) has
+# its own pool and breaker. New tasks go to the admitted backend with the
+# fewest outstanding tasks; task ids and the audio paths they produce remember
+# their backend, so polls and audio fetches go back to the instance that owns
+# them. A backend is ejected while its breaker is open or its /health probe
+# (check_backends, run periodically by the app) fails, and readmitted once it
+# answers again. Backend 0 is the single-instance pool above, so everything
+# that only knows one AceStep keeps talking to the primary.
+
+_MAX_AFFINITY = 50_000   # task ids / audio paths remembered per map
+
+
+class _Backend:
+    __slots__ = ("index", "_url", "_uds", "client", "_circuit",
+                 "active", "dispatched", "healthy", "ejections",
+                 "instance", "seen_at", "restarts")
+
+    def __init__(self, index: int, url: str = "", uds: str | None = None):
+        self.index = index
+        self._url, self._uds = url, uds
+        self.client: httpx.AsyncClient | None = None
+        self._circuit = _new_circuit()
+        self.active = 0          # tasks submitted here and not yet seen finished
+        self.dispatched = 0
+        self.healthy = True
+        self.ejections = 0
+        self.instance = None     # /health instance_id, when AceStep reports one
+        self.seen_at = 0.0       # monotonic time of the last healthy probe
+        self.restarts = 0
+
+    # The primary resolves through the module globals (tests and scripts
+    # patch ACESTEP_BASE_URL / _client / _circuit directly).
+    @property
+    def url(self) -> str:
+        return ACESTEP_BASE_URL if self.index == 0 else self._url
+
+    @property
+    def circuit(self) -> dict:
+        return _circuit if self.index == 0 else self._circuit
+
+    def http(self) -> httpx.AsyncClient:
+        if self.index == 0:
+            return _http()
+        if self.client is None or self.client.is_closed:
+            self.client = _new_client(self._uds)
+        return self.client
+
+    @property
+    def label(self) -> str:
+        uds = ACESTEP_UDS if self.index == 0 else self._uds
+        return f"unix:{uds}" if uds else self.url
+
+    @property
+    def admitted(self) -> bool:
+        return self.healthy and self.circuit["state"] != "open"
+
+
+_backends: list[_Backend] = [_Backend(0)] + [
+    _Backend(i, *_parse_backend(spec)) for i, spec in enumerate(_BACKEND_SPECS[1:], start=1)
+]
+_task_backend: "OrderedDict[str, int]" = OrderedDict()   # task_id → backend index
+_task_open: set[str] = set()                              # counted in Backend.active
+_path_backend: "OrderedDict[str, int]" = OrderedDict()   # AceStep audio path → backend
+
+
+def _remember(table: OrderedDict, key: str, backend: int) -> None:
+    table[key] = backend
+    table.move_to_end(key)
+    while len(table) > _MAX_AFFINITY:
+        table.popitem(last=False)
+
+
+def _audio_path(audio_url: str) -> str:
+    if "?" in audio_url:
+        vals = parse_qs(urlparse(audio_url).query).get("path")
+        if vals:
+            return vals[0]
+    return audio_url
+
+
+def backend_count() -> int:
+    """Backends currently accepting work."""
+    return sum(1 for b in _backends if b.admitted)
+
+
+def pick_backend() -> int:
+    """Least-loaded admitted backend. Falls back to every backend when none
+    is admitted, so the caller gets the breaker's fail-fast error."""
+    pool = [b for b in _backends if b.admitted] or _backends
+    return min(pool, key=lambda b: (b.active, b.dispatched)).index
+
+
+def backend_of(task_id: str) -> int:
+    return _task_backend.get(task_id, 0)
+
+
+def backend_for_path(audio_url: str) -> int:
+    return _path_backend.get(_audio_path(audio_url), 0)
+
+
+async def _submit(payload: dict, backend: int | None) -> str:
+    """POST /release_task to `backend` (least-loaded if None) and record the
+    task's affinity. The slot is reserved before the request goes out, so a
+    burst of concurrent submits spreads across backends."""
+    b = _backends[pick_backend() if backend is None else backend]
+    b.active += 1
+    try:
+        r = await _request("POST", "/release_task", _TIMEOUT_SUBMIT, json=payload, backend=b.index)
+        task_id = r.json()["data"]["task_id"]
+    except BaseException:
+        b.active -= 1
+        raise
+    b.dispatched += 1
+    _remember(_task_backend, task_id, b.index)
+    _task_open.add(task_id)
+    return task_id
+
+
+def adopt_task(task_id: str, backend: int) -> None:
+    """Track a task an earlier Wrangler process submitted to `backend`
+    (restored from the job store) as if _submit had just sent it."""
+    if not 0 <= backend < len(_backends):
+        backend = 0
+    _remember(_task_backend, task_id, backend)
+    if task_id not in _task_open:
+        _task_open.add(task_id)
+        _backends[backend].active += 1
+
+
+def settle_task(task_id: str) -> None:
+    """Stop counting task_id against its backend's load (idempotent)."""
+    if task_id in _task_open:
+        _task_open.discard(task_id)
+        b = _backends[_task_backend.get(task_id, 0)]
+        b.active = max(0, b.active - 1)
+
+
+async def check_backends() -> dict[int, float]:
+    """Probe every backend's /health; eject failures, readmit recoveries.
+
+    Probes bypass the breaker's fail-fast (a loading AceStep answering 503
+    would otherwise keep it open for a whole cooldown) and a healthy answer
+    closes it. Returns {backend index: time its previous instance was last
+    seen} for backends whose instance_id changed — AceStep restarted there
+    and forgot every task submitted before that time."""
+    restarted: dict[int, float] = {}
+
+    async def probe(b: _Backend) -> None:
+        _pool_stats["requests"] += 1
+        try:
+            r = await b.http().get(f"{b.url}/health", timeout=_TIMEOUT_POLL,
+                                   extensions={"trace": _trace})
+            r.raise_for_status()
+            ok = True
+        except Exception:
+            _pool_stats["errors"] += 1
+            ok = False
+        if ok:
+            body = r.json()
+            instance = (body.get("data") or body).get("instance_id") if isinstance(body, dict) else None
+            if instance is not None:
+                if b.instance is not None and instance != b.instance:
+                    b.restarts += 1
+                    restarted[b.index] = b.seen_at
+                    logger.warning("AceStep backend %d (%s) restarted", b.index, b.label)
+                b.instance = instance
+            b.seen_at = time.monotonic()
+        if ok and b.circuit["state"] != "closed" and not b.circuit["probe_in_flight"]:
+            _circuit_record(b.circuit, True, False)
+        if b.healthy and not ok:
+            b.ejections += 1
+            logger.warning("AceStep backend %d (%s) ejected", b.index, b.label)
+        elif ok and not b.healthy:
+            logger.info("AceStep backend %d (%s) readmitted", b.index, b.label)
+        b.healthy = ok
+
+    await asyncio.gather(*(probe(b) for b in _backends))
+    return restarted
+
+
+def backend_stats() -> list[dict]:
+    return [{"url": b.label, "admitted": b.admitted,
+             "active": b.active, "dispatched": b.dispatched, "ejections": b.ejections,
+             "restarts": b.restarts,
+             "circuit": _circuit_snapshot(b.circuit)}
+            for b in _backends]
+
+
+# ---------------------------------------------------------------------------
+# Single-flight TTL cache for read-mostly endpoints
+# ---------------------------------------------------------------------------
+#
+# Every open tab polls health, LoRA/training/label status and the model list.
+# Concurrent identical calls share one in-flight upstream request, and the
+# result is served from memory for a short per-endpoint TTL, so upstream
+# volume stays flat as tabs are added. Mutating calls invalidate the
+# entries they affect; a fetch that was already in flight when an entry was
+# invalidated is not allowed to repopulate it.
+
+_STATUS_TTL = float(os.environ.get("ACESTEP_STATUS_CACHE_TTL", "2"))
+_CACHE_TTL: dict[str, float] = {
+    "/health": _STATUS_TTL,
+    "/v1/lora/status": _STATUS_TTL,
+    "/v1/training/status": _STATUS_TTL,
+    "/v1/dataset/auto_label_status": _STATUS_TTL,
+    "/v1/models": float(os.environ.get("ACESTEP_MODELS_CACHE_TTL", "10")),
+}
+
+_cache: dict[str, tuple[float, object]] = {}      # route → (expires_at, json)
+_cache_inflight: dict[str, asyncio.Task] = {}
+_cache_gen: dict[str, int] = {}                    # bumped on invalidate
+_cache_stats = {"hits": 0, "misses": 0, "coalesced": 0}
+
+
+def invalidate(*routes: str) -> None:
+    """Drop cached entries (and detach in-flight fetches) for these routes."""
+    for route in routes:
+        _cache.pop(route, None)
+        _cache_inflight.pop(route, None)
+        _cache_gen[route] = _cache_gen.get(route, 0) + 1
+
+
+def cache_stats() -> dict:
+    return dict(_cache_stats)
+
+
+async def _cached_get(route: str) -> object:
+    """GET `route` as JSON through the TTL cache. Returns a private copy."""
+    now = time.monotonic()
+    hit = _cache.get(route)
+    if hit and hit[0] > now:
+        _cache_stats["hits"] += 1
+        return copy.deepcopy(hit[1])
+
+    loop = asyncio.get_running_loop()
+    task = _cache_inflight.get(route)
+    if task is not None and task.get_loop() is loop:
+        _cache_stats["coalesced"] += 1
+    else:
+        _cache_stats["misses"] += 1
+        gen = _cache_gen.get(route, 0)
+
+        async def fetch() -> object:
+            try:
+                r = await _request("GET", route, _TIMEOUT_POLL)
+                body = r.json()
+                if _cache_gen.get(route, 0) == gen:
+                    _cache[route] = (time.monotonic() + _CACHE_TTL[route], body)
+                return body
+            finally:
+                if _cache_inflight.get(route) is task:
+                    del _cache_inflight[route]
+
+        task = asyncio.ensure_future(fetch())
+        _cache_inflight[route] = task
+    # shield: one caller disconnecting must not cancel the shared fetch
+    return copy.deepcopy(await asyncio.shield(task))
+
 
 async def health_check() -> dict:
-    async with httpx.AsyncClient(timeout=_TIMEOUT_POLL) as client:
-        r = await client.get(f"{ACESTEP_BASE_URL}/health")
-        r.raise_for_status()
-        return r.json()
+    return await _cached_get("/health")
 
 
 async def list_models() -> list:
     """Names of the DiT models currently loaded by the AceStep server."""
-    async with httpx.AsyncClient(timeout=_TIMEOUT_POLL) as client:
-        r = await client.get(f"{ACESTEP_BASE_URL}/v1/models")
-        r.raise_for_status()
-        data = r.json().get("data") or []
-        return [str(m.get("id", "")).split("/")[-1] for m in data]
+    data = (await _cached_get("/v1/models")).get("data") or []
+    return [str(m.get("id", "")).split("/")[-1] for m in data]
 
 
-async def release_task(payload: dict) -> str:
-    """Submit a generation task. Returns the task_id string."""
-    async with httpx.AsyncClient(timeout=_TIMEOUT_SUBMIT) as client:
-        r = await client.post(f"{ACESTEP_BASE_URL}/release_task", json=payload)
-        r.raise_for_status()
-        body = r.json()
-        return body["data"]["task_id"]
+async def release_task(payload: dict, backend: int | None = None) -> str:
+    """Submit a generation task. Returns the task_id string.
 
+    Goes to `backend` if given (e.g. the one its source audio was staged
+    on), else to the least-loaded backend."""
+    return await _submit(payload, backend)
 
-async def query_result(task_id: str) -> dict:
-    """
-    Poll a task. Returns a normalised dict:
-      { "status": "processing" | "done" | "error",
-        "results": list[{"audio_url": str, "meta": dict|None}] | None }
 
-    NOTE: AceStep returns `result` as a JSON *string* — we parse it here.
-    For batch_size > 1 the list contains one entry per generated item.
-    """
-    async with httpx.AsyncClient(timeout=_TIMEOUT_POLL) as client:
-        r = await client.post(
-            f"{ACESTEP_BASE_URL}/query_result",
-            json={"task_id_list": [task_id]},
-        )
-        r.raise_for_status()
-        body  = r.json()
-        entry = body["data"][0]
-        code  = entry["status"]   # 0=running, 1=succeeded, 2=failed
+async def cancel_task(task_id: str) -> bool:
+    """Ask the backend running task_id to drop it. True if it agreed (the
+    task no longer counts against the backend's load); False if no cancel
+    route is configured or the backend refused or didn't answer."""
+    if not ACESTEP_CANCEL_ROUTE:
+        return False
+    try:
+        await _request("POST", ACESTEP_CANCEL_ROUTE, _TIMEOUT_POLL,
+                       backend=backend_of(task_id), json={"task_id": task_id})
+    except Exception as exc:
+        logger.info("AceStep did not cancel task_id=%s: %s", task_id, exc)
+        return False
+    settle_task(task_id)
+    return True
+
+
+# /query_result has no error code: a failed entry whose error text contains
+# this (case-insensitively) is a task the AceStep instance doesn't know —
+# its "Task not found". Override if a build words it differently.
+LOST_TASK_ERROR = os.environ.get("ACESTEP_LOST_TASK_ERROR", "not found").lower()
+
+
+def _parse_entry(entry: dict) -> dict:
+    """Normalise one /query_result entry (see query_result)."""
+    code = entry["status"]   # 0=running, 1=succeeded, 2=failed
 
     if code == 0:
         return {"status": "processing", "results": None}
 
     if code == 2:
+        # An id AceStep has never heard of (it restarted since) is reported
+        # as a failure too; flag it so the job can be resubmitted.
+        if LOST_TASK_ERROR in str(entry.get("error") or "").lower():
+            return {"status": "error", "results": None, "lost": True}
         return {"status": "error", "results": None}
 
     # status == 1: result is a JSON string — parse it
@@ -89,6 +614,113 @@ async def query_result(task_id: str) -> dict:
     }
 
 
+# /query_result takes a task_id_list, so many polls can share one request.
+_QUERY_BATCH_SIZE = int(os.environ.get("ACESTEP_QUERY_BATCH_SIZE", "64"))
+_QUERY_COALESCE_S = float(os.environ.get("ACESTEP_QUERY_COALESCE_MS", "10")) / 1000
+
+
+async def _query_chunk(task_ids: list[str], backend: int = 0) -> dict[str, dict]:
+    r = await _request(
+        "POST", "/query_result", _TIMEOUT_POLL,
+        json={"task_id_list": task_ids}, backend=backend,
+    )
+    entries = r.json()["data"] or []
+    out: dict[str, dict] = {}
+    for i, entry in enumerate(entries):
+        # Entries carry their task_id; fall back to request order if not
+        tid = entry.get("task_id") or (task_ids[i] if i < len(task_ids) else None)
+        if tid is not None:
+            out[tid] = _parse_entry(entry)
+    return out
+
+
+async def query_results(task_ids: list[str]) -> dict[str, dict]:
+    """
+    Poll many tasks at once. Returns {task_id: normalised dict} (same shape
+    as query_result). Task ids AceStep did not report are absent.
+
+    Ids are grouped by the backend that owns them and sent in chunks of
+    ACESTEP_QUERY_BATCH_SIZE, concurrently. An unreachable backend only
+    drops its own ids from the answer; the call raises if every one failed.
+    """
+    ids = list(dict.fromkeys(task_ids))
+    if not ids:
+        return {}
+    groups: dict[int, list[str]] = {}
+    for tid in ids:
+        groups.setdefault(_task_backend.get(tid, 0), []).append(tid)
+    calls = [(b, g[i:i + _QUERY_BATCH_SIZE])
+             for b, g in groups.items() for i in range(0, len(g), _QUERY_BATCH_SIZE)]
+    parts = await asyncio.gather(*(_query_chunk(c, b) for b, c in calls),
+                                 return_exceptions=True)
+    failures = [p for p in parts if isinstance(p, BaseException)]
+    if failures and len(failures) == len(parts):
+        raise failures[0]
+    out: dict[str, dict] = {}
+    for (b, _), part in zip(calls, parts):
+        if isinstance(part, BaseException):
+            continue
+        for tid, data in part.items():
+            if data["status"] == "processing":
+                continue
+            settle_task(tid)
+            if b and data["status"] == "done":
+                for item in data["results"]:
+                    _remember(_path_backend, _audio_path(item["audio_url"]), b)
+        out.update(part)
+    return out
+
+
+# task_id → futures of callers waiting on the next coalesced flush
+_query_waiters: dict[str, list[asyncio.Future]] = {}
+_query_flush: asyncio.Task | None = None
+
+
+async def _flush_queries() -> None:
+    await asyncio.sleep(_QUERY_COALESCE_S)
+    waiters = dict(_query_waiters)
+    _query_waiters.clear()
+    try:
+        results = await query_results(list(waiters))
+    except Exception as exc:
+        for futs in waiters.values():
+            for f in futs:
+                if not f.done():
+                    f.set_exception(exc)
+        return
+    for tid, futs in waiters.items():
+        data = results.get(tid)
+        for f in futs:
+            if f.done():
+                continue
+            if data is None:
+                f.set_exception(KeyError(f"AceStep did not report task {tid}"))
+            else:
+                f.set_result(copy.deepcopy(data))  # callers mutate their copy
+
+
+async def query_result(task_id: str) -> dict:
+    """
+    Poll a task. Returns a normalised dict:
+      { "status": "processing" | "done" | "error",
+        "results": list[{"audio_url": str, "meta": dict|None}] | None }
+
+    NOTE: AceStep returns `result` as a JSON *string* — we parse it here.
+    For batch_size > 1 the list contains one entry per generated item.
+    An error for a task id AceStep doesn't know also carries "lost": True.
+
+    Concurrent calls (e.g. many tabs polling /status) are coalesced into a
+    single batched /query_result request after a short window.
+    """
+    global _query_flush
+    loop = asyncio.get_running_loop()
+    fut = loop.create_future()
+    _query_waiters.setdefault(task_id, []).append(fut)
+    if _query_flush is None or _query_flush.done() or _query_flush.get_loop() is not loop:
+        _query_flush = asyncio.create_task(_flush_queries())
+    return await fut
+
+
 # AceStep's _parse_description_hints() maps these to ISO codes.
 _LANG_LABELS: dict[str, str] = {
     "en": "English",
@@ -123,29 +755,20 @@ async def create_sample(query: str, language: str = "en") -> str:
     """
     label = _LANG_LABELS.get(language)
     enriched_query = f"{query}. {label} vocals." if label else query
-    async with httpx.AsyncClient(timeout=_TIMEOUT_SUBMIT) as client:
-        r = await client.post(
-            f"{ACESTEP_BASE_URL}/release_task",
-            json={
-                "sample_query": enriched_query,
-                "vocal_language": language,
-            },
-        )
-        r.raise_for_status()
-        body = r.json()
-        return body["data"]["task_id"]
+    return await _submit({
+        "sample_query": enriched_query,
+        "vocal_language": language,
+    }, None)
 
 
 async def format_input(lyrics: str) -> dict:
     """Call AceStep's /format_input LM endpoint for structured lyrics analysis.
     Returns the raw response body as a dict."""
-    async with httpx.AsyncClient(timeout=_TIMEOUT_SUBMIT) as client:
-        r = await client.post(
-            f"{ACESTEP_BASE_URL}/format_input",
-            json={"lyrics": lyrics},
-        )
-        r.raise_for_status()
-        return r.json()
+    r = await _request(
+        "POST", "/format_input", _TIMEOUT_SUBMIT,
+        json={"lyrics": lyrics},
+    )
+    return r.json()
 
 
 # ---------------------------------------------------------------------------
@@ -155,34 +778,44 @@ async def format_input(lyrics: str) -> dict:
 _TIMEOUT_LORA = httpx.Timeout(60.0)  # loading can take a while
 
 
+async def _broadcast(method: str, path: str, timeout: httpx.Timeout, **kwargs) -> dict:
+    """Apply a model-state change on every backend so each generates with the
+    same adapter. Returns the primary's reply; raises the first failure.
+
+    The cached LoRA status is dropped either way: backends that did apply
+    the change must not keep being reported in their old state."""
+    try:
+        replies = await asyncio.gather(
+            *(_request(method, path, timeout, backend=b.index, **kwargs) for b in _backends),
+            return_exceptions=True,
+        )
+    finally:
+        invalidate("/v1/lora/status")
+    for r in replies:
+        if isinstance(r, BaseException):
+            raise r
+    return replies[0].json()
+
+
 async def lora_load(lora_path: str, adapter_name: str | None = None) -> dict:
     """Load a LoRA/LoKR adapter into the active model."""
     payload: dict = {"lora_path": lora_path}
     if adapter_name:
         payload["adapter_name"] = adapter_name
-    async with httpx.AsyncClient(timeout=_TIMEOUT_LORA) as client:
-        r = await client.post(f"{ACESTEP_BASE_URL}/v1/lora/load", json=payload)
-        r.raise_for_status()
-        return r.json()
+    return await _broadcast("POST", "/v1/lora/load", _TIMEOUT_LORA, json=payload)
 
 
 async def lora_unload() -> dict:
     """Unload all LoRA adapters and restore the base model."""
-    async with httpx.AsyncClient(timeout=_TIMEOUT_LORA) as client:
-        r = await client.post(f"{ACESTEP_BASE_URL}/v1/lora/unload")
-        r.raise_for_status()
-        return r.json()
+    return await _broadcast("POST", "/v1/lora/unload", _TIMEOUT_LORA)
 
 
 async def lora_toggle(use_lora: bool) -> dict:
     """Enable or disable the loaded LoRA adapter."""
-    async with httpx.AsyncClient(timeout=_TIMEOUT_POLL) as client:
-        r = await client.post(
-            f"{ACESTEP_BASE_URL}/v1/lora/toggle",
-            json={"use_lora": use_lora},
-        )
-        r.raise_for_status()
-        return r.json()
+    return await _broadcast(
+        "POST", "/v1/lora/toggle", _TIMEOUT_POLL,
+        json={"use_lora": use_lora},
+    )
 
 
 async def lora_scale(scale: float, adapter_name: str | None = None) -> dict:
@@ -190,18 +823,12 @@ async def lora_scale(scale: float, adapter_name: str | None = None) -> dict:
     payload: dict = {"scale": scale}
     if adapter_name:
         payload["adapter_name"] = adapter_name
-    async with httpx.AsyncClient(timeout=_TIMEOUT_POLL) as client:
-        r = await client.post(f"{ACESTEP_BASE_URL}/v1/lora/scale", json=payload)
-        r.raise_for_status()
-        return r.json()
+    return await _broadcast("POST", "/v1/lora/scale", _TIMEOUT_POLL, json=payload)
 
 
 async def lora_status() -> dict:
     """Get current LoRA adapter state."""
-    async with httpx.AsyncClient(timeout=_TIMEOUT_POLL) as client:
-        r = await client.get(f"{ACESTEP_BASE_URL}/v1/lora/status")
-        r.raise_for_status()
-        return r.json()
+    return await _cached_get("/v1/lora/status")
 
 
 # ---------------------------------------------------------------------------
@@ -219,184 +846,162 @@ async def dataset_scan(payload: dict | str) -> dict:
     """
     if isinstance(payload, str):
         payload = {"audio_dir": payload}
-    async with httpx.AsyncClient(timeout=_TIMEOUT_SUBMIT) as client:
-        r = await client.post(
-            f"{ACESTEP_BASE_URL}/v1/dataset/scan",
-            json=payload,
-        )
-        r.raise_for_status()
-        return r.json()
+    r = await _request("POST", "/v1/dataset/scan", _TIMEOUT_SUBMIT, json=payload)
+    return r.json()
 
 
 async def dataset_preprocess_async(output_dir: str) -> dict:
     """Start async preprocessing of loaded dataset."""
-    async with httpx.AsyncClient(timeout=_TIMEOUT_TRAIN) as client:
-        r = await client.post(
-            f"{ACESTEP_BASE_URL}/v1/dataset/preprocess_async",
-            json={"output_dir": output_dir},
-        )
-        r.raise_for_status()
-        return r.json()
+    r = await _request(
+        "POST", "/v1/dataset/preprocess_async", _TIMEOUT_TRAIN,
+        json={"output_dir": output_dir},
+    )
+    return r.json()
 
 
 async def dataset_auto_label(payload: dict | None = None) -> dict:
     """Auto-label dataset samples using the LLM (synchronous)."""
-    async with httpx.AsyncClient(timeout=_TIMEOUT_TRAIN) as client:
-        r = await client.post(
-            f"{ACESTEP_BASE_URL}/v1/dataset/auto_label",
-            json=payload or {},
-        )
-        r.raise_for_status()
-        return r.json()
+    r = await _request(
+        "POST", "/v1/dataset/auto_label", _TIMEOUT_TRAIN,
+        json=payload or {},
+    )
+    invalidate("/v1/dataset/auto_label_status")
+    return r.json()
 
 
 async def dataset_auto_label_async(payload: dict | None = None) -> dict:
     """Start async auto-labeling. Returns task_id for polling."""
-    async with httpx.AsyncClient(timeout=_TIMEOUT_SUBMIT) as client:
-        r = await client.post(
-            f"{ACESTEP_BASE_URL}/v1/dataset/auto_label_async",
-            json=payload or {},
-        )
-        r.raise_for_status()
-        return r.json()
+    r = await _request(
+        "POST", "/v1/dataset/auto_label_async", _TIMEOUT_SUBMIT,
+        json=payload or {},
+    )
+    invalidate("/v1/dataset/auto_label_status")
+    return r.json()
 
 
 async def dataset_auto_label_status() -> dict:
     """Poll latest auto-label task progress."""
-    async with httpx.AsyncClient(timeout=_TIMEOUT_POLL) as client:
-        r = await client.get(f"{ACESTEP_BASE_URL}/v1/dataset/auto_label_status")
-        r.raise_for_status()
-        return r.json()
+    return await _cached_get("/v1/dataset/auto_label_status")
 
 
 async def dataset_sample_update(sample_idx: int, payload: dict) -> dict:
     """Update a single dataset sample's metadata."""
-    async with httpx.AsyncClient(timeout=_TIMEOUT_SUBMIT) as client:
-        r = await client.put(
-            f"{ACESTEP_BASE_URL}/v1/dataset/sample/{sample_idx}",
-            json=payload,
-        )
-        r.raise_for_status()
-        return r.json()
+    r = await _request(
+        "PUT", f"/v1/dataset/sample/{sample_idx}", _TIMEOUT_SUBMIT,
+        json=payload,
+    )
+    return r.json()
 
 
 async def dataset_save(save_path: str, dataset_name: str = "my_lora_dataset") -> dict:
     """Save dataset state to a JSON file for later resumption."""
-    async with httpx.AsyncClient(timeout=_TIMEOUT_SUBMIT) as client:
-        r = await client.post(
-            f"{ACESTEP_BASE_URL}/v1/dataset/save",
-            json={"save_path": save_path, "dataset_name": dataset_name},
-        )
-        r.raise_for_status()
-        return r.json()
+    r = await _request(
+        "POST", "/v1/dataset/save", _TIMEOUT_SUBMIT,
+        json={"save_path": save_path, "dataset_name": dataset_name},
+    )
+    return r.json()
 
 
 async def dataset_load(dataset_path: str) -> dict:
     """Load a saved dataset JSON file."""
-    async with httpx.AsyncClient(timeout=_TIMEOUT_SUBMIT) as client:
-        r = await client.post(
-            f"{ACESTEP_BASE_URL}/v1/dataset/load",
-            json={"dataset_path": dataset_path},
-        )
-        r.raise_for_status()
-        return r.json()
+    r = await _request(
+        "POST", "/v1/dataset/load", _TIMEOUT_SUBMIT,
+        json={"dataset_path": dataset_path},
+    )
+    return r.json()
 
 
 async def dataset_preprocess_status(task_id: str | None = None) -> dict:
     """Poll preprocessing progress."""
     if task_id:
-        url = f"{ACESTEP_BASE_URL}/v1/dataset/preprocess_status/{task_id}"
+        url = f"/v1/dataset/preprocess_status/{task_id}"
     else:
-        url = f"{ACESTEP_BASE_URL}/v1/dataset/preprocess_status"
-    async with httpx.AsyncClient(timeout=_TIMEOUT_POLL) as client:
-        r = await client.get(url)
-        r.raise_for_status()
-        return r.json()
+        url = "/v1/dataset/preprocess_status"
+    r = await _request("GET", url, _TIMEOUT_POLL)
+    return r.json()
 
 
 async def dataset_samples() -> dict:
     """List loaded dataset samples."""
-    async with httpx.AsyncClient(timeout=_TIMEOUT_POLL) as client:
-        r = await client.get(f"{ACESTEP_BASE_URL}/v1/dataset/samples")
-        r.raise_for_status()
-        return r.json()
+    r = await _request("GET", "/v1/dataset/samples", _TIMEOUT_POLL)
+    return r.json()
 
 
 async def training_start(payload: dict) -> dict:
     """Start LoRA training from preprocessed tensors."""
-    async with httpx.AsyncClient(timeout=_TIMEOUT_TRAIN) as client:
-        r = await client.post(
-            f"{ACESTEP_BASE_URL}/v1/training/start",
-            json=payload,
-        )
-        r.raise_for_status()
-        return r.json()
+    r = await _request("POST", "/v1/training/start", _TIMEOUT_TRAIN, json=payload)
+    invalidate("/v1/training/status")
+    return r.json()
 
 
 async def training_start_lokr(payload: dict) -> dict:
     """Start LoKR training from preprocessed tensors."""
-    async with httpx.AsyncClient(timeout=_TIMEOUT_TRAIN) as client:
-        r = await client.post(
-            f"{ACESTEP_BASE_URL}/v1/training/start_lokr",
-            json=payload,
-        )
-        r.raise_for_status()
-        return r.json()
+    r = await _request("POST", "/v1/training/start_lokr", _TIMEOUT_TRAIN, json=payload)
+    invalidate("/v1/training/status")
+    return r.json()
 
 
 async def training_status() -> dict:
     """Get current training status."""
-    async with httpx.AsyncClient(timeout=_TIMEOUT_POLL) as client:
-        r = await client.get(f"{ACESTEP_BASE_URL}/v1/training/status")
-        r.raise_for_status()
-        return r.json()
+    return await _cached_get("/v1/training/status")
 
 
 async def training_stop() -> dict:
     """Stop the current training run."""
-    async with httpx.AsyncClient(timeout=_TIMEOUT_SUBMIT) as client:
-        r = await client.post(f"{ACESTEP_BASE_URL}/v1/training/stop")
-        r.raise_for_status()
-        return r.json()
+    r = await _request("POST", "/v1/training/stop", _TIMEOUT_SUBMIT)
+    invalidate("/v1/training/status")
+    return r.json()
 
 
 async def training_export(export_path: str, lora_output_dir: str) -> dict:
     """Export trained adapter to a destination path."""
-    async with httpx.AsyncClient(timeout=_TIMEOUT_SUBMIT) as client:
-        r = await client.post(
-            f"{ACESTEP_BASE_URL}/v1/training/export",
-            json={"export_path": export_path, "lora_output_dir": lora_output_dir},
-        )
-        r.raise_for_status()
-        return r.json()
+    r = await _request(
+        "POST", "/v1/training/export", _TIMEOUT_SUBMIT,
+        json={"export_path": export_path, "lora_output_dir": lora_output_dir},
+    )
+    invalidate("/v1/training/status")
+    return r.json()
 
 
 async def reinitialize_service() -> dict:
     """Reinitialize model components after training."""
-    async with httpx.AsyncClient(timeout=_TIMEOUT_TRAIN) as client:
-        r = await client.post(f"{ACESTEP_BASE_URL}/v1/reinitialize")
-        r.raise_for_status()
-        return r.json()
+    r = await _request("POST", "/v1/reinitialize", _TIMEOUT_TRAIN)
+    invalidate(*_CACHE_TTL)
+    return r.json()
 
 
-async def get_audio_bytes(path: str) -> tuple[bytes, str]:
+# Headers relayed from AceStep's audio response to the browser
+AUDIO_PASSTHROUGH_HEADERS = (
+    "content-type", "content-length", "content-range", "accept-ranges",
+    "content-encoding", "etag", "last-modified",
+)
+
+
+async def open_audio_stream(path: str, range_header: str | None = None) -> httpx.Response:
+    """
+    Start a streamed GET of audio from the AceStep HTTP server.
+
+    `path` is the `/v1/audio?path=...` form returned by query_result. The
+    body is not read — relay it with aiter_raw() and aclose() when done, so
+    memory stays flat regardless of file size. A browser Range header is
+    forwarded as-is, so a 206 partial response passes straight through.
     """
-    Download audio and return (bytes, content_type).
+    headers = {"Range": range_header} if range_header else None
+    return await _request("GET", path, _TIMEOUT_AUDIO, stream=True, headers=headers,
+                          backend=backend_for_path(path))
+
 
-    AceStep's query_result returns a local filesystem path in the `file` field.
-    When `path` has no query string it is treated as an absolute filesystem path
-    and served directly (both processes share the same filesystem).
-    Paths that include a query string are forwarded to the AceStep HTTP server.
+async def upload_audio(path: str, filename: str | None = None, backend: int = 0) -> str:
+    """
+    Upload a local audio file to the AceStep host; returns the server-side
+    path to use as src_audio_path / reference_audio_path. The file object is
+    streamed, not read into memory. Not retried — callers dedupe by content.
     """
-    if "?" not in path:
-        fp = Path(path)
-        if not fp.is_file():
-            raise FileNotFoundError(f"Audio file not found: {path}")
-        ct = mimetypes.guess_type(str(fp))[0] or "audio/mpeg"
-        return fp.read_bytes(), ct
-
-    async with httpx.AsyncClient(timeout=_TIMEOUT_AUDIO) as client:
-        r = await client.get(f"{ACESTEP_BASE_URL}{path}")
-        r.raise_for_status()
-        ct = r.headers.get("content-type", "audio/mpeg")
-        return r.content, ct
+    name = filename or os.path.basename(path)
+    with open(path, "rb") as fh:
+        r = await _request("POST", ACESTEP_UPLOAD_ROUTE, _TIMEOUT_AUDIO, backend=backend,
+                           files={"file": (name, fh, "application/octet-stream")})
+    server_path = r.json()["data"]["path"]
+    if backend:
+        _remember(_path_backend, server_path, backend)
+    return server_path
@@ -0,0 +1,95 @@
+"""Generation runtime prediction, learned from completed jobs.
+
+Runtime is modelled per (gen_model, lm_model, task_type) bucket as
+
+    seconds ≈ overhead + rate × work,   work = inference_steps × duration × batch_size
+
+fitted by exponentially weighted least squares, so estimates follow
+hardware and model changes. A bucket with too few samples falls back to
+its (gen_model, task_type) parent, then to the global fit, then to a
+fixed prior — a fresh process still gives a usable (if rough) answer.
+"""
+
+from typing import Optional
+
+_DECAY = 0.95             # weight kept by older samples per new observation
+_MIN_SAMPLES = 3          # before a bucket's own fit is trusted
+_PRIOR_OVERHEAD_S = 8.0   # model/LM setup per job
+_PRIOR_RATE = 0.01        # seconds per step·second·batch (~20s for 40 steps × 30s)
+_MIN_RUNTIME_S = 1.0
+
+
+def work(features: dict) -> float:
+    return (float(features.get("steps") or 0) * float(features.get("duration") or 0)
+            * max(1, int(features.get("batch_size") or 1)))
+
+
+class _Fit:
+    """Exponentially weighted running sums for a 1-D least-squares line."""
+
+    __slots__ = ("count", "w", "sx", "sy", "sxx", "sxy")
+
+    def __init__(self):
+        self.count = 0
+        self.w = self.sx = self.sy = self.sxx = self.sxy = 0.0
+
+    def add(self, x: float, y: float) -> None:
+        self.count += 1
+        self.w = self.w * _DECAY + 1.0
+        self.sx = self.sx * _DECAY + x
+        self.sy = self.sy * _DECAY + y
+        self.sxx = self.sxx * _DECAY + x * x
+        self.sxy = self.sxy * _DECAY + x * y
+
+    def predict(self, x: float) -> Optional[float]:
+        if self.count < _MIN_SAMPLES:
+            return None
+        mx, my = self.sx / self.w, self.sy / self.w
+        var = self.sxx / self.w - mx * mx
+        if var <= 1e-9 * max(1.0, mx * mx):
+            # Every sample had the same work — scale proportionally
+            return my * (x / mx) if mx > 0 else my
+        rate = max(0.0, (self.sxy / self.w - mx * my) / var)
+        overhead = max(0.0, my - rate * mx)
+        return overhead + rate * x
+
+
+class RuntimePredictor:
+    def __init__(self):
+        self._fits: dict[tuple, _Fit] = {}
+
+    @staticmethod
+    def _keys(features: dict) -> list[tuple]:
+        gen = features.get("gen_model", "")
+        task = features.get("task_type", "text2music")
+        return [(gen, features.get("lm_model", ""), task), (gen, task), ()]
+
+    def observe(self, features: dict, seconds: float) -> None:
+        """Record one job's measured wall-clock runtime."""
+        if seconds <= 0:
+            return
+        x = work(features)
+        for key in self._keys(features):
+            self._fits.setdefault(key, _Fit()).add(x, seconds)
+
+    def predict(self, features: dict) -> float:
+        """Expected wall-clock seconds for a job with these features."""
+        x = work(features)
+        for key in self._keys(features):
+            fit = self._fits.get(key)
+            if fit is not None:
+                y = fit.predict(x)
+                if y is not None:
+                    return max(_MIN_RUNTIME_S, y)
+        return max(_MIN_RUNTIME_S, _PRIOR_OVERHEAD_S + _PRIOR_RATE * x)
+
+    @property
+    def warm(self) -> bool:
+        """True once the global fit has enough samples to beat the prior."""
+        fit = self._fits.get(())
+        return fit is not None and fit.count >= _MIN_SAMPLES
+
+    def stats(self) -> dict:
+        return {"buckets": len(self._fits) - (1 if () in self._fits else 0),
+                "samples": self._fits[()].count if () in self._fits else 0,
+                "warm": self.warm}
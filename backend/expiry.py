@@ -0,0 +1,57 @@
+"""Deadline min-heap for TTL expiry.
+
+The cleanup loop used to scan every job, upload, session and lock on each
+tick to find the few that had expired. Instead, each entry is scheduled
+here once, when it is created, at its deadline. A tick pops only the keys
+whose deadline has passed.
+
+Invalidation is lazy:
+- Rescheduling a key just pushes a new heap entry. The superseded one is
+  skipped when it reaches the top.
+- Refreshing a record (a session seen again, a lock re-acquired) does not
+  touch the heap at all. When its old deadline comes up, the caller
+  re-checks the live record and reschedules it if it is still fresh.
+
+Stale entries are dropped in one rebuild once they outnumber live ones.
+"""
+
+import heapq
+import itertools
+from typing import Hashable
+
+_MIN_COMPACT = 64
+
+
+class DeadlineHeap:
+    """Keys ordered by deadline, one live deadline per key."""
+
+    __slots__ = ("_heap", "_due", "_seq")
+
+    def __init__(self):
+        self._heap: list[tuple[float, int, Hashable]] = []
+        self._due: dict[Hashable, float] = {}   # heap entries that disagree are stale
+        self._seq = itertools.count()           # tie-break, so keys are never compared
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def schedule(self, key: Hashable, deadline: float) -> None:
+        """Make key come due at deadline, replacing any earlier schedule."""
+        if self._due.get(key) == deadline:
+            return
+        self._due[key] = deadline
+        heapq.heappush(self._heap, (deadline, next(self._seq), key))
+        if len(self._heap) > 2 * len(self._due) + _MIN_COMPACT:
+            self._heap = [(d, next(self._seq), k) for k, d in self._due.items()]
+            heapq.heapify(self._heap)
+
+    def pop_due(self, now: float) -> list:
+        """Remove and return every key whose deadline is at or before now,
+        earliest first."""
+        heap, due, out = self._heap, self._due, []
+        while heap and heap[0][0] <= now:
+            deadline, _, key = heapq.heappop(heap)
+            if due.get(key) == deadline:
+                del due[key]
+                out.append(key)
+        return out
@@ -0,0 +1,403 @@
+"""Job queues: dispatched jobs in submission order (JobQueue) and jobs
+still held by Wrangler, in fair-share dispatch order (FairQueue), split
+into an interactive and a bulk lane (LaneQueue).
+
+/status, the event stream, /generate's per-user limit and /api/session
+all ask the queue the same questions on every request: how many jobs are
+ahead of this one, and how many does this user have? A plain list answers
+by scanning, which dominates /status once thousands of jobs are queued.
+
+JobQueue keeps jobs in numbered slots in arrival order, with a Fenwick
+(binary indexed) tree over slot occupancy:
+
+    position(task_id)   O(log n)   jobs ahead of it
+    remove(task_id)     O(log n)
+    append(task_id, u)  O(log n)
+    count(user)         O(1)
+
+Removal leaves a hole; once holes outnumber live jobs the slots are
+compacted in one O(n) pass, so memory stays proportional to the queue.
+
+FairQueue holds the jobs that haven't been sent to AceStep yet. It hands
+them out weighted round-robin across users: each user gets a turn of
+`weight` jobs, then the next user with jobs waiting goes. One user's
+batch of submissions can't starve everyone queued behind it.
+
+LaneQueue puts a FairQueue per lane: short, cheap jobs (previews) in the
+interactive lane go before long renders in the bulk lane, so a preview
+doesn't wait out a ten-minute render. A bulk job held longer than
+`aging_s` is promoted to the interactive lane, so bulk work can't starve.
+"""
+
+import itertools
+import time
+from collections import OrderedDict, deque
+from typing import Iterable, Iterator, Mapping, Optional
+
+_MIN_COMPACT = 64   # don't bother compacting tiny queues
+_versions = itertools.count(1)   # shared, so no two queue states get the same version
+
+
+class JobQueue:
+    """Ordered (task_id, user) pairs with rank lookups and per-user counts."""
+
+    __slots__ = ("_items", "_tree", "_slot", "_per_user", "version")
+
+    def __init__(self, items: Iterable[tuple[str, str]] = ()):
+        self._items: list[Optional[tuple[str, str]]] = [None]   # 1-based slots
+        self._tree: list[int] = [0]
+        self._slot: dict[str, int] = {}
+        self._per_user: dict[str, int] = {}
+        self.version = next(_versions)   # changes on every edit; lets callers memoize
+        for task_id, user in items:
+            self.append(task_id, user)
+
+    def __len__(self) -> int:
+        return len(self._slot)
+
+    def __contains__(self, task_id: object) -> bool:
+        return task_id in self._slot
+
+    def __iter__(self) -> Iterator[tuple[str, str]]:
+        """(task_id, user) in queue order."""
+        for item in self._items[1:]:
+            if item is not None:
+                yield item
+
+    def append(self, task_id: str, user: str) -> None:
+        if task_id in self._slot:
+            return
+        i = len(self._items)
+        self._items.append((task_id, user))
+        # Node i covers slots (i - lowbit(i), i]: itself plus the nodes below
+        # it that end at i - 1.
+        self._tree.append(1 + self._prefix(i - 1) - self._prefix(i - (i & -i)))
+        self._slot[task_id] = i
+        self._per_user[user] = self._per_user.get(user, 0) + 1
+        self.version = next(_versions)
+
+    def remove(self, task_id: str) -> bool:
+        """Drop task_id; False if it wasn't queued."""
+        i = self._slot.pop(task_id, None)
+        if i is None:
+            return False
+        _, user = self._items[i]
+        self._items[i] = None
+        n = len(self._items)
+        while i < n:
+            self._tree[i] -= 1
+            i += i & -i
+        left = self._per_user[user] - 1
+        if left:
+            self._per_user[user] = left
+        else:
+            del self._per_user[user]
+        self.version = next(_versions)
+        holes = len(self._items) - 1 - len(self._slot)
+        if holes > _MIN_COMPACT and holes > len(self._slot):
+            self._compact()
+        return True
+
+    def replace(self, task_id: str, new_task_id: str, user: str) -> bool:
+        """Put (new_task_id, user) in task_id's slot, keeping its place in
+        line; False if task_id wasn't queued."""
+        i = self._slot.pop(task_id, None)
+        if i is None:
+            return False
+        _, old_user = self._items[i]
+        self._items[i] = (new_task_id, user)
+        self._slot[new_task_id] = i
+        left = self._per_user[old_user] - 1
+        if left:
+            self._per_user[old_user] = left
+        else:
+            del self._per_user[old_user]
+        self._per_user[user] = self._per_user.get(user, 0) + 1
+        self.version = next(_versions)
+        return True
+
+    def position(self, task_id: str) -> int:
+        """Number of jobs ahead of task_id, or -1 if it isn't queued."""
+        i = self._slot.get(task_id)
+        return -1 if i is None else self._prefix(i - 1)
+
+    def count(self, user: str) -> int:
+        return self._per_user.get(user, 0)
+
+    def _prefix(self, i: int) -> int:
+        total = 0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _compact(self) -> None:
+        live = [item for item in self._items[1:] if item is not None]
+        self._items = [None] + live
+        n = len(self._items)
+        self._tree = [0] + [1] * len(live)
+        for i in range(1, n):
+            parent = i + (i & -i)
+            if parent < n:
+                self._tree[parent] += self._tree[i]
+        self._slot = {task_id: i for i, (task_id, _) in enumerate(live, 1)}
+
+
+class FairQueue:
+    """Held jobs, dispatched weighted round-robin across users.
+
+    Users take turns in the order they first queued a job. A turn serves up
+    to the user's weight (default 1) of their jobs, oldest first. A user
+    whose jobs run out leaves the rotation, and rejoins at the end on the
+    next submission. Urgent jobs (resubmissions of jobs AceStep lost) go
+    before every turn.
+
+    position() is computed from per-user queue lengths without replaying
+    the schedule: O(users + the job's index in its user's queue).
+    """
+
+    __slots__ = ("_urgent", "_users", "_credit", "_owner", "_weights", "version")
+
+    def __init__(self, weights: Optional[Mapping[str, int]] = None):
+        self._urgent: deque[str] = deque()
+        # user → their held task ids; rotation order, whose turn it is first
+        self._users: "OrderedDict[str, deque[str]]" = OrderedDict()
+        self._credit = 0   # jobs left in the current turn
+        self._owner: dict[str, str] = {}
+        self._weights = weights if weights is not None else {}
+        self.version = next(_versions)
+
+    def weight(self, user: str) -> int:
+        return max(1, int(self._weights.get(user, 1)))
+
+    def __len__(self) -> int:
+        return len(self._owner)
+
+    def __contains__(self, task_id: object) -> bool:
+        return task_id in self._owner
+
+    def count(self, user: str) -> int:
+        queue = self._users.get(user)
+        held = len(queue) if queue is not None else 0
+        return held + sum(1 for t in self._urgent if self._owner[t] == user)
+
+    def push(self, task_id: str, user: str) -> None:
+        if task_id in self._owner:
+            return
+        self._owner[task_id] = user
+        queue = self._users.get(user)
+        if queue is None:
+            if not self._users:
+                self._credit = self.weight(user)
+            queue = self._users[user] = deque()
+        queue.append(task_id)
+        self.version = next(_versions)
+
+    def push_urgent(self, task_id: str, user: str) -> None:
+        """Queue task_id ahead of every turn (after earlier urgent jobs)."""
+        if task_id in self._owner:
+            return
+        self._owner[task_id] = user
+        self._urgent.append(task_id)
+        self.version = next(_versions)
+
+    def peek(self) -> Optional[str]:
+        """The job to dispatch next, without removing it."""
+        if self._urgent:
+            return self._urgent[0]
+        for queue in self._users.values():
+            return queue[0]
+        return None
+
+    def dispatched(self, task_id: str) -> bool:
+        """Remove task_id after it was sent upstream. If it was the head of
+        the current turn, that uses up one job of the turn."""
+        user = self._owner.get(task_id)
+        in_turn = (not self._urgent and bool(self._users)
+                   and next(iter(self._users)) == user and self._users[user][0] == task_id)
+        if not self.remove(task_id):
+            return False
+        if in_turn and user in self._users:   # still has jobs; else remove() moved on
+            self._credit -= 1
+            if self._credit <= 0:
+                self._users.move_to_end(user)
+                self._credit = self.weight(next(iter(self._users)))
+        return True
+
+    def remove(self, task_id: str) -> bool:
+        """Drop task_id wherever it is; False if it wasn't held."""
+        user = self._owner.pop(task_id, None)
+        if user is None:
+            return False
+        self.version = next(_versions)
+        queue = self._users.get(user)
+        if queue is None or task_id not in queue:
+            self._urgent.remove(task_id)
+            return True
+        queue.remove(task_id)
+        if not queue:
+            was_current = user == next(iter(self._users))
+            del self._users[user]
+            if was_current and self._users:
+                self._credit = self.weight(next(iter(self._users)))
+        return True
+
+    def position(self, task_id: str) -> int:
+        """Jobs that will be dispatched before task_id, or -1 if not held."""
+        user = self._owner.get(task_id)
+        if user is None:
+            return -1
+        queue = self._users.get(user)
+        if queue is None or task_id not in queue:
+            return self._urgent.index(task_id)
+        k = queue.index(task_id)
+        rotation = list(self._users.items())
+        mine = next(i for i, (u, _) in enumerate(rotation) if u == user)
+        # The turn of `user` that serves its k-th job...
+        first = self._credit if mine == 0 else self.weight(user)
+        turn = 0 if k < first else 1 + (k - first) // self.weight(user)
+        # ...comes after every user ahead of it in the rotation has had
+        # turns 0..turn, and every user behind it turns 0..turn-1.
+        ahead = len(self._urgent) + k
+        for i, (other, jobs) in enumerate(rotation):
+            if i == mine:
+                continue
+            turns = turn + 1 if i < mine else turn
+            if turns:
+                first = self._credit if i == 0 else self.weight(other)
+                ahead += min(len(jobs), first + (turns - 1) * self.weight(other))
+        return ahead
+
+    def __iter__(self) -> Iterator[tuple[str, str]]:
+        """(task_id, user) in the order they will be dispatched, if nothing
+        else is queued meanwhile."""
+        for task_id in self._urgent:
+            yield task_id, self._owner[task_id]
+        rotation = [(u, list(q), self._credit if i == 0 else self.weight(u))
+                    for i, (u, q) in enumerate(self._users.items())]
+        served = [0] * len(rotation)
+        while rotation:
+            remaining = []
+            for (user, jobs, allowance), done in zip(rotation, served):
+                for task_id in jobs[done:done + allowance]:
+                    yield task_id, user
+                done += allowance
+                if done < len(jobs):
+                    remaining.append(((user, jobs, self.weight(user)), done))
+            rotation = [r for r, _ in remaining]
+            served = [d for _, d in remaining]
+
+
+INTERACTIVE, BULK = "interactive", "bulk"
+
+
+class LaneQueue:
+    """Held jobs in two FairQueue lanes, interactive ahead of bulk.
+
+    Bulk jobs are promoted to the back of their user's interactive jobs
+    once they have been held `aging_s` seconds; age() does this and is
+    called before each dispatch decision. It visits only jobs whose time
+    has come (arrival order), so a call costs O(promoted).
+    """
+
+    __slots__ = ("_lanes", "_lane", "_bulk_since", "aging_s", "version")
+
+    def __init__(self, weights: Optional[Mapping[str, int]] = None, aging_s: float = 300.0):
+        self._lanes = {INTERACTIVE: FairQueue(weights), BULK: FairQueue(weights)}
+        self._lane: dict[str, str] = {}   # task_id → lane it is held in
+        # (held since, task_id) for bulk jobs, oldest first; stale entries
+        # (dispatched or removed since) are skipped by age()
+        self._bulk_since: deque[tuple[float, str]] = deque()
+        self.aging_s = aging_s
+        self.version = next(_versions)
+
+    def weight(self, user: str) -> int:
+        return self._lanes[INTERACTIVE].weight(user)
+
+    def __len__(self) -> int:
+        return len(self._lane)
+
+    def __contains__(self, task_id: object) -> bool:
+        return task_id in self._lane
+
+    def count(self, user: str) -> int:
+        return sum(q.count(user) for q in self._lanes.values())
+
+    def lane(self, task_id: str) -> Optional[str]:
+        return self._lane.get(task_id)
+
+    def push(self, task_id: str, user: str, lane: str = INTERACTIVE,
+             now: Optional[float] = None) -> None:
+        if lane not in self._lanes:
+            raise ValueError(f"unknown lane {lane!r}")
+        if task_id in self._lane:
+            return
+        self._lane[task_id] = lane
+        self._lanes[lane].push(task_id, user)
+        if lane == BULK:
+            self._bulk_since.append((time.monotonic() if now is None else now, task_id))
+        self.version = next(_versions)
+
+    def push_urgent(self, task_id: str, user: str) -> None:
+        """Queue task_id ahead of every turn in either lane."""
+        if task_id in self._lane:
+            return
+        self._lane[task_id] = INTERACTIVE
+        self._lanes[INTERACTIVE].push_urgent(task_id, user)
+        self.version = next(_versions)
+
+    def age(self, now: Optional[float] = None) -> int:
+        """Promote bulk jobs held at least aging_s; returns how many moved."""
+        now = time.monotonic() if now is None else now
+        bulk, interactive = self._lanes[BULK], self._lanes[INTERACTIVE]
+        promoted = 0
+        while self._bulk_since and self._bulk_since[0][0] + self.aging_s <= now:
+            _, task_id = self._bulk_since.popleft()
+            if self._lane.get(task_id) != BULK:
+                continue
+            user = bulk._owner[task_id]
+            bulk.remove(task_id)
+            interactive.push(task_id, user)
+            self._lane[task_id] = INTERACTIVE
+            promoted += 1
+        if promoted:
+            self.version = next(_versions)
+        return promoted
+
+    def peek(self) -> Optional[str]:
+        """The job to dispatch next, without removing it."""
+        for queue in self._lanes.values():
+            task_id = queue.peek()
+            if task_id is not None:
+                return task_id
+        return None
+
+    def dispatched(self, task_id: str) -> bool:
+        lane = self._lane.pop(task_id, None)
+        if lane is None:
+            return False
+        self._lanes[lane].dispatched(task_id)
+        self.version = next(_versions)
+        return True
+
+    def remove(self, task_id: str) -> bool:
+        lane = self._lane.pop(task_id, None)
+        if lane is None:
+            return False
+        self._lanes[lane].remove(task_id)
+        self.version = next(_versions)
+        return True
+
+    def position(self, task_id: str) -> int:
+        """Jobs that will be dispatched before task_id, or -1 if not held."""
+        lane = self._lane.get(task_id)
+        if lane is None:
+            return -1
+        ahead = len(self._lanes[INTERACTIVE]) if lane == BULK else 0
+        return ahead + self._lanes[lane].position(task_id)
+
+    def __iter__(self) -> Iterator[tuple[str, str]]:
+        """(task_id, user) in the order they will be dispatched, if nothing
+        else is queued and nothing ages meanwhile."""
+        for queue in self._lanes.values():
+            yield from queue
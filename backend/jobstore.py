@@ -0,0 +1,203 @@
+"""Durable job bookkeeping in SQLite, so a restart or deploy keeps jobs.
+
+main.py keeps working from its in-process dicts; this module mirrors them
+to disk. put_job()/put_upload()/delete_*() only record the new row state
+in memory, so they never block. A background writer flushes the
+accumulated changes every JOB_DB_FLUSH_MS in one transaction on a worker
+thread. Later writes to the same key replace earlier ones, so a job that
+changes state several times between flushes costs one row write.
+
+On startup load() returns what the previous process left: finished jobs
+(results and take refs), pending jobs (to hand back to the watcher) and
+uploads (so their files still expire).
+
+The database runs in WAL mode with synchronous=NORMAL. Readers never
+block the writer, and a crash loses at most the last unflushed batch.
+Setting JOB_DB to an empty string disables persistence.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger("wrangler")
+
+DB_PATH = os.environ.get("JOB_DB", str(Path(__file__).parent.parent / "wrangler-jobs.db"))
+FLUSH_INTERVAL_S = float(os.environ.get("JOB_DB_FLUSH_MS", "200")) / 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    task_id    TEXT PRIMARY KEY,
+    user       TEXT NOT NULL,
+    status     TEXT NOT NULL,       -- pending | done
+    created_at REAL NOT NULL,       -- unix seconds
+    data       TEXT NOT NULL        -- JSON
+);
+CREATE INDEX IF NOT EXISTS jobs_user ON jobs (user);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+CREATE INDEX IF NOT EXISTS jobs_created_at ON jobs (created_at);
+CREATE TABLE IF NOT EXISTS uploads (
+    upload_id  TEXT PRIMARY KEY,
+    user       TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    data       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS uploads_created_at ON uploads (created_at);
+"""
+
+_UPSERT = {
+    "jobs": "INSERT INTO jobs (task_id, user, status, created_at, data) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (task_id) DO UPDATE SET user = excluded.user, status = excluded.status, "
+            "created_at = excluded.created_at, data = excluded.data",
+    "uploads": "INSERT INTO uploads (upload_id, user, created_at, data) VALUES (?, ?, ?, ?) "
+               "ON CONFLICT (upload_id) DO UPDATE SET user = excluded.user, "
+               "created_at = excluded.created_at, data = excluded.data",
+}
+_DELETE = {
+    "jobs": "DELETE FROM jobs WHERE task_id = ?",
+    "uploads": "DELETE FROM uploads WHERE upload_id = ?",
+}
+
+_conn: Optional[sqlite3.Connection] = None
+_lock = threading.Lock()      # one writer at a time, even across a shutdown flush
+# (table, key) → row tuple to upsert, or None to delete; insertion-ordered,
+# so rows come back from load() in the order jobs were first stored
+_dirty: dict[tuple[str, str], Optional[tuple]] = {}
+_wake: Optional[asyncio.Event] = None
+_writer: Optional[asyncio.Task] = None
+_stats = {"rows_written": 0, "batches": 0, "errors": 0}
+
+
+def enabled() -> bool:
+    return bool(DB_PATH)
+
+
+def _connect() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        Path(DB_PATH).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        _conn = conn
+    return _conn
+
+
+def _mark(table: str, key: str, row: Optional[tuple]) -> None:
+    if not enabled():
+        return
+    _dirty[(table, key)] = row
+    if _wake is not None:
+        _wake.set()
+
+
+def put_job(task_id: str, user: str, status: str, created_at: float, data: dict) -> None:
+    """Record a job's current state (created_at in unix seconds)."""
+    _mark("jobs", task_id, (task_id, user, status, created_at, json.dumps(data)))
+
+
+def delete_job(task_id: str) -> None:
+    _mark("jobs", task_id, None)
+
+
+def put_upload(upload_id: str, user: str, created_at: float, data: dict) -> None:
+    _mark("uploads", upload_id, (upload_id, user, created_at, json.dumps(data)))
+
+
+def delete_upload(upload_id: str) -> None:
+    _mark("uploads", upload_id, None)
+
+
+def _write(batch: dict) -> None:
+    with _lock:
+        conn = _connect()
+        conn.execute("BEGIN")
+        try:
+            for (table, key), row in batch.items():
+                if row is None:
+                    conn.execute(_DELETE[table], (key,))
+                else:
+                    conn.execute(_UPSERT[table], row)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+
+async def flush() -> None:
+    """Write every change recorded so far, off the event loop."""
+    global _dirty
+    if not _dirty:
+        return
+    batch, _dirty = _dirty, {}
+    try:
+        await asyncio.to_thread(_write, batch)
+    except Exception as exc:
+        _stats["errors"] += 1
+        logger.warning("job store write failed (%d rows, will retry): %s", len(batch), exc)
+        for key, row in batch.items():   # newer changes win
+            _dirty.setdefault(key, row)
+        return
+    _stats["rows_written"] += len(batch)
+    _stats["batches"] += 1
+
+
+def _load() -> tuple[list[dict], list[dict]]:
+    with _lock:
+        conn = _connect()
+        jobs = [{"task_id": t, "user": u, "status": s, "created_at": c, "data": json.loads(d)}
+                for t, u, s, c, d in conn.execute(
+                    "SELECT task_id, user, status, created_at, data FROM jobs ORDER BY rowid")]
+        uploads = [{"upload_id": i, "user": u, "created_at": c, "data": json.loads(d)}
+                   for i, u, c, d in conn.execute(
+                       "SELECT upload_id, user, created_at, data FROM uploads ORDER BY rowid")]
+    return jobs, uploads
+
+
+async def load() -> tuple[list[dict], list[dict]]:
+    """(jobs, uploads) left by the previous process, oldest first."""
+    if not enabled():
+        return [], []
+    return await asyncio.to_thread(_load)
+
+
+async def _writer_loop() -> None:
+    while True:
+        await _wake.wait()
+        await asyncio.sleep(FLUSH_INTERVAL_S)   # let a batch accumulate
+        _wake.clear()
+        await flush()
+
+
+def start() -> None:
+    global _wake, _writer
+    if not enabled():
+        return
+    _wake = asyncio.Event()
+    if _dirty:
+        _wake.set()
+    _writer = asyncio.create_task(_writer_loop())
+
+
+async def stop() -> None:
+    """Stop the writer and flush what is left."""
+    global _writer, _wake, _conn
+    if _writer is not None:
+        _writer.cancel()
+        _writer = None
+    _wake = None
+    await flush()
+    with _lock:
+        if _conn is not None:
+            _conn.close()
+            _conn = None
+
+
+def stats() -> dict:
+    return {**_stats, "unflushed": len(_dirty), "path": DB_PATH or None}
@@ -2,12 +2,16 @@
 ACE-Step Wrangler — FastAPI backend.
 
 Endpoints:
-  POST /generate                    Submit a generation job, return task_id
-  GET  /status/{task_id}            Poll job status; stores result on completion
-  GET  /audio                       Proxy audio stream from AceStep (no download header)
+  POST /generate                    Submit a generation job, return task_id (honours Idempotency-Key)
+  GET  /status/{task_id}            Job status as last seen by the watcher
+  DELETE /jobs/{task_id}            Cancel a held or running job
+  POST /generate-lyrics             Lyrics + metadata from a description (?async=true → task_id)
+  POST /analyze-audio               BPM, key, lyrics, caption of an upload (?async=true → task_id)
+  GET  /events                      Server-Sent Events: per-user job lifecycle stream
+  GET  /audio                       Stream audio, Range-aware (no download header)
   GET  /download/{job_id}/{n}/audio Download audio with Content-Disposition
   GET  /download/{job_id}/{n}/json  Download generation metadata as JSON
-  GET  /api/health                  Forward AceStep health check
+  GET  /api/health                  Forward AceStep health check (+ pool / breaker / cache / backend / webhook / ETA / job store / result cache stats)
 
   POST /lora/load                   Load a LoRA/LoKR adapter
   POST /lora/unload                 Unload adapter, restore base model
@@ -34,6 +38,8 @@ Endpoints:
 Static frontend is served from /  (catch-all, mounted last).
 """
 
+import hashlib
+import heapq
 import json
 import logging
 import os
@@ -43,16 +49,18 @@ import tempfile
 import time
 import uuid
 import mimetypes
+from collections import OrderedDict, deque
 import uvicorn
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Union
 from urllib.parse import urlparse, parse_qs
 
-from fastapi import FastAPI, HTTPException, Request, UploadFile
-from fastapi.responses import FileResponse, Response
+from fastapi import FastAPI, HTTPException, Query, Request, UploadFile
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
+from starlette.background import BackgroundTask
 import httpx
 
 import asyncio
@@ -62,12 +70,35 @@ logger = logging.getLogger("wrangler")
 
 import takes
 import alignment
+import webhooks
+import eta
+import transfer
+import jobstore
+import resultcache
+from expiry import DeadlineHeap
+from jobqueue import BULK, INTERACTIVE, JobQueue, LaneQueue
 from acestep_wrapper import (
+    open_client,
+    close_client,
+    pool_stats,
+    circuit_state,
+    cache_stats,
+    AceStepUnavailable,
     health_check,
     list_models,
+    backend_count,
+    adopt_task,
+    backend_of,
+    backend_stats,
+    check_backends,
+    pick_backend,
+    settle_task,
     release_task,
+    cancel_task,
     query_result,
-    get_audio_bytes,
+    query_results,
+    open_audio_stream,
+    AUDIO_PASSTHROUGH_HEADERS,
     format_input,
     create_sample,
     lora_load,
@@ -104,7 +135,35 @@ MAX_JOBS_PER_USER = int(os.environ.get("MAX_JOBS_PER_USER", "2"))
 SESSION_TIMEOUT_MIN = int(os.environ.get("SESSION_TIMEOUT_MINUTES", "60"))
 JOB_TTL_MIN = int(os.environ.get("JOB_TTL_MINUTES", "120"))
 UPLOAD_TTL_MIN = int(os.environ.get("UPLOAD_TTL_MINUTES", "120"))
+# How long a /generate Idempotency-Key keeps answering with its first task
+IDEMPOTENCY_TTL_MIN = int(os.environ.get("IDEMPOTENCY_TTL_MINUTES", "60"))
 TMP_AUDIO_TTL_DAYS = float(os.environ.get("TMP_AUDIO_TTL_DAYS", "7"))  # 0 = disabled
+# The watcher checks each job near its predicted completion, within these bounds
+WATCH_MIN_INTERVAL_S = float(os.environ.get("WATCH_MIN_INTERVAL_SECONDS", "1"))
+WATCH_MAX_INTERVAL_S = float(os.environ.get("WATCH_MAX_INTERVAL_SECONDS", "10"))
+WATCH_COLD_INTERVAL_S = 2.0   # cap until the runtime model has learned anything
+ESTIMATE_REUSE_S = 1.0        # /status reuses a queue-wide ETA pass this long
+# How often each AceStep backend is probed while healthy, and while not
+BACKEND_HEALTH_INTERVAL_S = float(os.environ.get("BACKEND_HEALTH_INTERVAL_SECONDS", "5"))
+ENGINE_POLL_INTERVAL_S = float(os.environ.get("ENGINE_POLL_INTERVAL_SECONDS", "1"))
+# Generation requests held by Wrangler (AceStep loading, or waiting for a
+# dispatch slot), and how many may be running on AceStep at once
+ENGINE_WAIT_QUEUE_SIZE = int(os.environ.get("ENGINE_WAIT_QUEUE_SIZE", "1000"))
+DISPATCH_IN_FLIGHT_PER_BACKEND = int(os.environ.get("DISPATCH_IN_FLIGHT_PER_BACKEND", "2"))  # 0 = no cap
+# Fair-share weights per x-auth-user, "alice=3,bob=2"; unlisted users get 1
+USER_WEIGHTS = {u.strip(): int(w) for u, _, w in
+                (e.partition("=") for e in os.environ.get("USER_WEIGHTS", "").split(",")) if w}
+# Held jobs predicted to take at most this long go in the interactive lane,
+# ahead of bulk renders; a bulk job held BULK_AGING_SECONDS is promoted
+INTERACTIVE_MAX_S = float(os.environ.get("INTERACTIVE_MAX_SECONDS", "60"))
+BULK_AGING_S = float(os.environ.get("BULK_AGING_SECONDS", "300"))
+# Held random-seed requests with otherwise identical settings are fused into
+# one AceStep call of at most FUSE_MAX_BATCH takes and FUSE_MAX_AUDIO_SECONDS
+# of audio (batch × duration, which is what bounds VRAM); 1 = never fuse
+FUSE_MAX_BATCH = int(os.environ.get("FUSE_MAX_BATCH", "4"))
+FUSE_MAX_AUDIO_S = float(os.environ.get("FUSE_MAX_AUDIO_SECONDS", "480"))
+# Times a job lost to an AceStep restart is resubmitted before it fails
+JOB_MAX_RESUBMITS = int(os.environ.get("JOB_MAX_RESUBMITS", "2"))
 
 # ---------------------------------------------------------------------------
 # User middleware — inject request.state.user from reverse proxy header
@@ -117,46 +176,61 @@ async def inject_user(request: Request, call_next):
 
     now = time.monotonic()
     # Session tracking
-    if user not in _sessions:
+    session = _sessions.get(user)
+    if session is None:
         # Enforce max users (skip for "local" — single-user/dev mode)
-        if user != "local" and MAX_USERS > 0:
-            timeout = SESSION_TIMEOUT_MIN * 60
-            active = sum(
-                1 for s in _sessions.values()
-                if now - s["last_seen"] < timeout
+        if user != "local" and MAX_USERS > 0 and _active_sessions(now) >= MAX_USERS:
+            from starlette.responses import JSONResponse
+            return JSONResponse(
+                status_code=503,
+                content={"detail": "Server is at capacity. Try again later."},
             )
-            if active >= MAX_USERS:
-                from starlette.responses import JSONResponse
-                return JSONResponse(
-                    status_code=503,
-                    content={"detail": "Server is at capacity. Try again later."},
-                )
-        _sessions[user] = {"first_seen": now, "last_seen": now}
+        _sessions[user] = _Session(now)
     else:
-        _sessions[user]["last_seen"] = now
+        session.last_seen = now
+        _sessions.move_to_end(user)
 
     response = await call_next(request)
     return response
 
 # ---------------------------------------------------------------------------
-# In-process stores (cleared on restart — acceptable for now)
+# In-process stores — _jobs, _pending and _uploads are mirrored to the
+# SQLite job store (jobstore.py) and reloaded on startup
 # ---------------------------------------------------------------------------
 
 # task_id → { "results": [...], "params": dict, "format": str, "user": str, "created_at": float }
+# A job that failed under an id AceStep never saw also carries
+# "status": "error" and "reason"; it is kept in memory only.
 _jobs: dict[str, dict] = {}
 
-# task_id → { "params": dict, "format": str, "user": str, "created_at": float }
+# task_id → { "params": dict, "format": str, "user": str, "created_at": float,
+#             "request": GenerateRequest, "upstream_id": str | None,
+#             "resubmits": int }
+# The key is the id the client holds; upstream_id is AceStep's task id (the
+# same unless the job was held for the engine or resubmitted after an
+# AceStep restart), None while held. created_at is the upstream submit time.
 _pending: dict[str, dict] = {}
 
 # upload_id → { "path": str, "filename": str, "user": str, "created_at": float }
 _uploads: dict[str, dict] = {}
 _upload_dir = Path(tempfile.mkdtemp(prefix="wrangler-uploads-"))
 
-# (task_id, user) — tracks submission order for queue position
-_queue_order: list[tuple[str, str]] = []
+# (task_id, user) in submission order — queue position, per-user job counts
+# and the in-flight cap; every dispatched generation job is in it until
+# finalized, except fused members (they ride on their leader's entry)
+_queue_order = JobQueue()
 
-# user → { "last_seen": float, "first_seen": float }
-_sessions: dict[str, dict] = {}
+
+class _Session:
+    __slots__ = ("first_seen", "last_seen")
+
+    def __init__(self, now: float):
+        self.first_seen = self.last_seen = now
+
+
+# user → _Session, least recently seen first: a request moves its user to
+# the end, so idle sessions collect at the front (see _expire_sessions)
+_sessions: "OrderedDict[str, _Session]" = OrderedDict()
 
 # "lora"|"training" → { "user": str, "acquired_at": float, "action": str }
 _resource_locks: dict[str, dict] = {}
@@ -179,6 +253,7 @@ def _acquire_lock(resource: str, user: str, action: str) -> str | None:
         else:
             return f"Resource is in use by another user."
     _resource_locks[resource] = {"user": user, "acquired_at": now, "action": action}
+    _expire_after("lock", resource, now)
     return None
 
 
@@ -190,6 +265,387 @@ def _release_lock(resource: str, user: str) -> None:
     if lock["user"] == user or time.monotonic() - lock["acquired_at"] > _LOCK_TIMEOUT:
         del _resource_locks[resource]
 
+# ---------------------------------------------------------------------------
+# Expiry — every TTL'd entry is scheduled once, on creation (see expiry.py);
+# sessions, refreshed on every request, keep their own last_seen order
+# ---------------------------------------------------------------------------
+
+_expiry = DeadlineHeap()
+_EXPIRY_COUNTER = {"job": "jobs", "pending": "pending", "upload": "uploads", "lock": "locks",
+                   "idempotency": "idempotency_keys"}
+
+
+def _ttl(kind: str) -> float:
+    if kind in ("job", "pending"):
+        return JOB_TTL_MIN * 60
+    if kind == "upload":
+        return UPLOAD_TTL_MIN * 60
+    if kind == "idempotency":
+        return IDEMPOTENCY_TTL_MIN * 60
+    return _LOCK_TIMEOUT
+
+
+def _expiring_record(kind: str, key: str) -> tuple[dict | None, str]:
+    """The live record behind an expiry key and the field its TTL runs from."""
+    if kind == "job":
+        return _jobs.get(key), "created_at"
+    if kind == "pending":
+        return _pending.get(key), "created_at"
+    if kind == "upload":
+        return _uploads.get(key), "created_at"
+    if kind == "idempotency":
+        return _idempotency.get(key), "created_at"
+    return _resource_locks.get(key), "acquired_at"
+
+
+def _expire_after(kind: str, key: str, start: float) -> None:
+    """Have the cleanup loop look at (kind, key) once its TTL from start runs
+    out. Later refreshes of the record need no call — expiry re-checks it."""
+    _expiry.schedule((kind, key), start + _ttl(kind))
+
+
+def _expire_sessions(now: float) -> int:
+    """Drop sessions idle for SESSION_TIMEOUT_MIN. _sessions is ordered by
+    last_seen, so only the expired ones are visited."""
+    timeout = SESSION_TIMEOUT_MIN * 60
+    expired = 0
+    while _sessions:
+        user, session = next(iter(_sessions.items()))
+        if now - session.last_seen < timeout:
+            break
+        del _sessions[user]
+        if user not in _subscribers:
+            _event_log.pop(user, None)
+        expired += 1
+    return expired
+
+
+def _active_sessions(now: float) -> int:
+    _expire_sessions(now)
+    return len(_sessions)
+
+# ---------------------------------------------------------------------------
+# Durable job store — what survives a restart
+# ---------------------------------------------------------------------------
+
+def _to_wall(mono: float) -> float:
+    return time.time() - (time.monotonic() - mono)
+
+
+def _from_wall(wall: float) -> float:
+    return time.monotonic() - (time.time() - wall)
+
+
+def _store_pending(task_id: str) -> None:
+    """Record a pending job's resumable state: enough to poll it again, or
+    to resubmit it if it was still held or AceStep lost it."""
+    pending = _pending.get(task_id)
+    if pending is None:
+        return
+    upstream_id = _upstream_id(task_id)
+    req = pending.get("request")
+    jobstore.put_job(task_id, pending.get("user", "local"), "pending",
+                     _to_wall(pending.get("created_at", time.monotonic())), {
+        "params":      pending.get("params", {}),
+        "format":      pending.get("format", "mp3"),
+        "upstream_id": upstream_id,
+        "backend":     None if upstream_id is None else backend_of(upstream_id),
+        "resubmits":   pending.get("resubmits", 0),
+        "callback":    pending.get("callback"),
+        "request":     req.model_dump(exclude=_CALLBACK_FIELDS) if req is not None else None,
+        "cache_key":   pending.get("cache_key"),
+        "fused":       pending.get("fused"),
+        "fused_into":  pending.get("fused_into"),
+        "fused_batch": pending.get("fused_batch"),
+        "kind":        pending.get("kind"),
+    })
+
+
+def _store_job(task_id: str) -> None:
+    job = _jobs[task_id]
+    jobstore.put_job(task_id, job["user"], "done", _to_wall(job["created_at"]), {
+        "results": job["results"], "params": job["params"], "format": job["format"],
+        "kind": job.get("kind"), "result": job.get("result"),
+    })
+
+
+async def _restore_jobs() -> None:
+    """Reload what the previous process left in the job store. Pending jobs
+    go straight back to the watcher (first check due now), or onto the hold
+    queue if they had not reached AceStep yet."""
+    jobs, uploads = await jobstore.load()
+    counts = {"jobs": 0, "pending": 0, "uploads": 0, "failed": 0}
+    for row in jobs:
+        task_id, user, data = row["task_id"], row["user"], row["data"]
+        created_at = _from_wall(row["created_at"])
+        if row["status"] == "done":
+            _jobs[task_id] = {"results": data["results"], "params": data["params"],
+                              "format": data["format"], "user": user, "created_at": created_at}
+            if data.get("kind"):
+                _jobs[task_id].update(kind=data["kind"], result=data.get("result"))
+            _expire_after("job", task_id, created_at)
+            counts["jobs"] += 1
+            continue
+        pending = {"params": data["params"], "format": data["format"], "user": user,
+                   "created_at": created_at, "upstream_id": data["upstream_id"],
+                   "resubmits": data.get("resubmits", 0), "next_check": 0.0}
+        if data.get("request") is not None:
+            try:
+                pending["request"] = GenerateRequest(**data["request"])
+            except ValidationError as exc:   # stored by an older version
+                logger.warning("restored task_id=%s cannot be resubmitted: %s", task_id, exc)
+        if data.get("callback"):
+            pending["callback"] = data["callback"]
+        for key in ("cache_key", "fused", "fused_into", "fused_batch", "kind"):
+            if data.get(key):
+                pending[key] = data[key]
+        _pending[task_id] = pending
+        if pending["upstream_id"] is None and "request" not in pending:
+            # Held, and nothing valid to submit: drain would choke on it
+            _finalize_job(task_id, {"status": "error",
+                                    "reason": "cannot be resubmitted after restart"},
+                          publish_positions=False)
+            counts["failed"] += 1
+            continue
+        _expire_after("pending", task_id, created_at)
+        if pending["upstream_id"] is None:
+            _waiting.push(task_id, user, _job_lane(pending["params"]))
+            _index_fusable(task_id)
+        elif pending.get("fused_into"):
+            _count_member(user, 1)   # rides on its batch leader's AceStep task
+        else:
+            if not pending.get("kind"):   # see _track_task
+                _queue_order.append(task_id, user)
+            adopt_task(pending["upstream_id"], data.get("backend") or 0)
+        counts["pending"] += 1
+    for row in uploads:
+        _uploads[row["upload_id"]] = {**row["data"], "user": row["user"],
+                                      "created_at": _from_wall(row["created_at"])}
+        _expire_after("upload", row["upload_id"], _uploads[row["upload_id"]]["created_at"])
+        counts["uploads"] += 1
+    if any(counts.values()):
+        logger.info("job store restored %s", counts)
+
+# ---------------------------------------------------------------------------
+# Job event stream — per-user fan-out behind GET /events
+# ---------------------------------------------------------------------------
+
+_EVENT_BACKLOG = 256       # per-user replay buffer for Last-Event-ID reconnects
+_SUBSCRIBER_QUEUE = 256    # per-connection buffer; overflow forces a reconnect + replay
+_EVENT_KEEPALIVE_S = 15
+
+_event_seq = 0
+# user → deque[(event_id, event, data)]
+_event_log: dict[str, deque] = {}
+# user → set of per-connection queues
+_subscribers: dict[str, set[asyncio.Queue]] = {}
+
+
+def _publish(user: str, event: str, data: dict) -> None:
+    """Record a job event for user and push it to their open /events streams."""
+    global _event_seq
+    _event_seq += 1
+    item = (_event_seq, event, data)
+    _event_log.setdefault(user, deque(maxlen=_EVENT_BACKLOG)).append(item)
+    for queue in list(_subscribers.get(user, ())):
+        try:
+            queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # Slow reader: end its stream; EventSource reconnects with
+            # Last-Event-ID and catches up from _event_log.
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(None)
+
+
+def _dequeue(task_id: str, publish: bool = True) -> None:
+    """Drop task_id from the dispatched or held queue and tell everyone
+    behind it (callers removing a batch pass publish=False and publish
+    once). A finished job frees a dispatch slot."""
+    _unindex_fusable(task_id)
+    if _queue_order.remove(task_id) or _waiting.remove(task_id):
+        _kick_dispatch()
+        if publish:
+            _publish_positions()
+
+
+def _queue_position(task_id: str) -> int:
+    """Jobs ahead of task_id: dispatched ones in submission order, then held
+    ones in the order the fair-share scheduler will send them; -1 if neither.
+    A job fused into another's batch has that job's position."""
+    task_id = _pending.get(task_id, {}).get("fused_into", task_id)
+    pos = _queue_order.position(task_id)
+    if pos < 0 and task_id in _waiting:
+        pos = len(_queue_order) + _waiting.position(task_id)
+    return pos
+
+
+def _queue_depth() -> int:
+    return len(_queue_order) + len(_waiting)
+
+
+def _queue_version() -> tuple[int, int]:
+    return _queue_order.version, _waiting.version
+
+
+def _publish_positions() -> None:
+    global _estimate_memo
+    depth = _queue_depth()
+    now = time.monotonic()
+    estimates = _queue_estimates(now)
+    _estimate_memo = (_queue_version(), now, estimates)
+    for pos, (t, u) in enumerate([*_queue_order, *_waiting]):
+        if _pending.get(t, {}).get("cancelled"):
+            continue   # its owner was told it's cancelled
+        _publish(u, "queue_position", {"task_id": t, "status": _job_state(t),
+                                       "queue_position": pos, "queue_depth": depth,
+                                       **_eta_fields(estimates.get(t))})
+
+
+def _upstream_id(task_id: str) -> str | None:
+    """AceStep's id for a tracked job (None while held for the engine)."""
+    pending = _pending.get(task_id)
+    return task_id if pending is None else pending.get("upstream_id", task_id)
+
+
+def _job_state(task_id: str) -> str:
+    """"processing" once sent to AceStep; a held job is "waiting" for the
+    engine or "queued" for a dispatch slot."""
+    if task_id in _pending and _upstream_id(task_id) is None:
+        return "queued" if _engine_ready else "waiting"
+    return "processing"
+
+# ---------------------------------------------------------------------------
+# Runtime prediction — drives queue ETAs and the watcher's check schedule
+# ---------------------------------------------------------------------------
+
+_runtime = eta.RuntimePredictor()
+# Backend index → monotonic time that AceStep instance last finished a job;
+# a job's service starts at the later of this and its own submission.
+_service_free_at: dict[int, float] = {}
+# (queue versions, monotonic time, estimates) of the last pass _job_estimate used
+_estimate_memo: tuple[tuple, float, dict] | None = None
+
+
+def _job_features(params: dict) -> dict:
+    quality = max(0, min(2, params.get("quality", 1)))
+    steps = params.get("inference_steps_raw")
+    return {
+        "gen_model":  params.get("gen_model", "turbo"),
+        "lm_model":   params.get("lm_model", "1.7b"),
+        "task_type":  params.get("task_type", "text2music"),
+        "steps":      steps if steps is not None else _QUALITY_STEPS[quality],
+        "duration":   params.get("duration", 30.0),
+        "batch_size": params.get("batch_size", 1),
+    }
+
+
+def _job_lane(params: dict) -> str:
+    """Scheduling lane by predicted cost: the runtime model's estimate for
+    steps × duration × batch_size on this job's model."""
+    predicted = _runtime.predict(_job_features(params))
+    return INTERACTIVE if predicted <= INTERACTIVE_MAX_S else BULK
+
+
+def _dispatch_features(pending: dict) -> dict:
+    """_job_features of what AceStep actually runs for a job: a fused batch's
+    leader runs every member's takes."""
+    params = pending.get("params") or {}
+    if "fused_batch" in pending:
+        params = {**params, "batch_size": pending["fused_batch"]}
+    return _job_features(params)
+
+
+def _predicted_runtime(pending: dict) -> float:
+    if "predicted_s" not in pending:
+        pending["predicted_s"] = _runtime.predict(_dispatch_features(pending))
+    return pending["predicted_s"]
+
+
+def _queue_estimates(now: float | None = None) -> dict[str, tuple[float, float]]:
+    """task_id → (expected_wait_seconds, eta_seconds) for every pending job,
+    assuming each AceStep backend works through the jobs dispatched to it
+    in submission order, and held jobs go out in fair-share order to
+    whichever backend frees up first. Held jobs get no estimate while the
+    engine is down."""
+    now = time.monotonic() if now is None else now
+    out: dict[str, tuple[float, float]] = {}
+    busy_for: dict[int, float] = {}   # backend → seconds of queued work ahead
+    for t, _ in _queue_order:
+        pending = _pending.get(t)
+        if pending is None or _upstream_id(t) is None:
+            continue
+        backend = backend_of(_upstream_id(t))
+        runtime = _predicted_runtime(pending)
+        if backend not in busy_for:  # head of this backend's queue is already running
+            started = max(pending.get("created_at", now), _service_free_at.get(backend, 0.0))
+            runtime = max(0.0, runtime - (now - started))
+        wait = busy_for.get(backend, 0.0)
+        out[t] = (wait, wait + runtime)
+        busy_for[backend] = wait + runtime
+    if _engine_ready and _waiting:
+        lanes = sorted(busy_for.values()) + [0.0] * max(0, backend_count() - len(busy_for))
+        lanes = lanes or [0.0]
+        for t, _ in _waiting:
+            pending = _pending.get(t)
+            if pending is None:
+                continue
+            wait = heapq.heappop(lanes)
+            out[t] = (wait, wait + _predicted_runtime(pending))
+            heapq.heappush(lanes, out[t][1])
+    for t, pending in _pending.items():
+        if pending.get("fused_into") in out:
+            out[t] = out[pending["fused_into"]]   # finishes with its batch
+        elif t not in out and _upstream_id(t) is not None:
+            # not queued (e.g. restored) — treat as running alone
+            elapsed = now - pending.get("created_at", now)
+            out[t] = (0.0, max(0.0, _predicted_runtime(pending) - elapsed))
+    return out
+
+
+def _job_estimate(task_id: str) -> tuple[float, float] | None:
+    """_queue_estimates() for one job. /status is polled constantly, so the
+    last full pass is reused — aged by the time since — while the queue is
+    unchanged and the pass is under ESTIMATE_REUSE_S old."""
+    global _estimate_memo
+    now = time.monotonic()
+    if (_estimate_memo is None or _estimate_memo[0] != _queue_version()
+            or now - _estimate_memo[1] > ESTIMATE_REUSE_S):
+        _estimate_memo = (_queue_version(), now, _queue_estimates(now))
+    _, computed_at, estimates = _estimate_memo
+    estimate = estimates.get(task_id)
+    if estimate is None:
+        return None
+    age = now - computed_at
+    return max(0.0, estimate[0] - age), max(0.0, estimate[1] - age)
+
+
+def _eta_fields(estimate: tuple[float, float] | None) -> dict:
+    if estimate is None:
+        return {"expected_wait_seconds": None, "eta_seconds": None}
+    wait, remaining = estimate
+    return {"expected_wait_seconds": round(wait, 1), "eta_seconds": round(remaining, 1)}
+
+
+def _schedule_checks(now: float) -> None:
+    """Set each pending job's next upstream check near its predicted finish.
+
+    Overdue jobs back off in proportion to how late they are, so one stuck
+    job doesn't pin the watcher at its minimum interval."""
+    for t, (_, remaining) in _queue_estimates(now).items():
+        pending = _pending[t]
+        if remaining > 0:
+            delay = remaining
+        else:
+            overdue = now - pending.get("created_at", now) - _predicted_runtime(pending)
+            delay = 0.25 * max(0.0, overdue)
+        pending["next_check"] = now + _check_delay(delay)
+
+
+def _check_delay(delay: float) -> float:
+    cap = WATCH_MAX_INTERVAL_S if _runtime.warm else min(WATCH_MAX_INTERVAL_S, WATCH_COLD_INTERVAL_S)
+    return max(WATCH_MIN_INTERVAL_S, min(cap, delay))
+
 # ---------------------------------------------------------------------------
 # Parameter mapping tables
 # ---------------------------------------------------------------------------
@@ -274,10 +730,30 @@ class GenerateRequest(BaseModel):
     repaint_mode:     Optional[str]  = None       # conservative | balanced | aggressive
     repaint_strength: Optional[float] = None      # 0.0-1.0, balanced mode only
 
+    # Headless clients — POSTed the result on completion/failure (see webhooks.py)
+    callback_url:    Optional[str] = None
+    callback_secret: Optional[str] = None         # HMAC-SHA256 key; never stored in params
+
+_CALLBACK_FIELDS = {"callback_url", "callback_secret"}
+
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
 
+def _upstream_error(exc: Exception, prefix: str = "AceStep error") -> HTTPException:
+    """Map a failed AceStep call to an HTTP error for the client.
+
+    An open circuit breaker becomes 503 + Retry-After so clients back off
+    instead of hammering a restarting engine; anything else stays a 502."""
+    if isinstance(exc, AceStepUnavailable):
+        return HTTPException(
+            status_code=503,
+            detail=f"{prefix}: {exc}",
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+    return HTTPException(status_code=502, detail=f"{prefix}: {exc}")
+
+
 def _build_payload(req: GenerateRequest) -> dict:
     lyric_adherence = max(0, min(2, req.lyric_adherence))
     quality         = max(0, min(2, req.quality))
@@ -511,9 +987,31 @@ class EstimateDurationRequest(BaseModel):
 @app.get("/api/health")
 async def api_health():
     try:
-        return await health_check()
+        result = await health_check()
+    except AceStepUnavailable as exc:
+        raise HTTPException(status_code=503, detail=str(exc),
+                            headers={"Retry-After": str(exc.retry_after)})
     except Exception as exc:
         raise HTTPException(status_code=503, detail=str(exc))
+    if isinstance(result, dict):
+        result["upstream"] = {
+            "pool": pool_stats(),
+            "circuit": circuit_state(),
+            "cache": cache_stats(),
+        }
+        backends = backend_stats()
+        if len(backends) > 1:
+            result["upstream"]["backends"] = backends
+        result["engine"] = {"ready": _engine_ready, "waiting": len(_waiting)}
+        result["dispatch"] = {"held": len(_waiting), "in_flight": len(_queue_order),
+                              "in_flight_cap": _in_flight_cap()}
+        result["webhooks"] = webhooks.stats()
+        result["job_store"] = jobstore.stats()
+        result["result_cache"] = _results.stats()
+        result["runtime_model"] = _runtime.stats()
+        if transfer.REMOTE:
+            result["transfer"] = transfer.stats()
+    return result
 
 
 @app.get("/api/models")
@@ -584,44 +1082,523 @@ def _ensure_in_tmp(path: str) -> str:
     return tmp_path
 
 
+async def _stage_audio(path: str, backend: int = 0) -> str:
+    """Path AceStep can read for src/reference audio: a /tmp copy when it
+    shares our filesystem, else an upload to the backend's host (see
+    transfer.py)."""
+    if transfer.REMOTE:
+        return await transfer.stage_source(path, backend)
+    return _ensure_in_tmp(path)
+
+
+async def _stage_request(req: GenerateRequest, backend: int) -> GenerateRequest:
+    """req with src/reference audio moved where `backend` can read it.
+
+    AceStep rejects absolute audio paths outside /tmp — copy (or upload,
+    for a remote AceStep) if needed."""
+    updates = {}
+    for field in ("src_audio_path", "reference_audio_path"):
+        path = getattr(req, field)
+        if path:
+            safe = await _stage_audio(path, backend)
+            if safe != path:
+                updates[field] = safe
+    return req.model_copy(update=updates) if updates else req
+
+
+# ---------------------------------------------------------------------------
+# Local dispatch queue — engine readiness gate, lanes and fair-share scheduling
+# ---------------------------------------------------------------------------
+#
+# Wrangler, not AceStep's FIFO, decides what runs next. A request is sent
+# straight to AceStep only when nothing is held and fewer than the in-flight
+# cap (DISPATCH_IN_FLIGHT_PER_BACKEND per admitted backend) are running.
+# Otherwise it is held in _waiting under a provisional task id. The status is
+# "waiting" while AceStep is loading or restarting, and "queued" while it
+# waits for a slot. _drain_waiting() dispatches held jobs weighted
+# round-robin across users (USER_WEIGHTS) whenever a slot frees up or the
+# engine comes back. Jobs predicted to finish within INTERACTIVE_MAX_S go in
+# the interactive lane, ahead of bulk renders, and bulk jobs may not take the
+# last free slot. The provisional id stays the client's handle for the job;
+# pending["upstream_id"] maps it to AceStep's.
+
+_engine_ready = True   # optimistic until a probe or submit says otherwise
+_engine_wake = asyncio.Event()
+_waiting = LaneQueue(USER_WEIGHTS, BULK_AGING_S)   # held task ids, in dispatch order
+_drain_task: asyncio.Task | None = None
+_submitting = 0   # submits awaiting AceStep's answer; count against the cap
+
+
+def _engine_down(exc: Exception) -> bool:
+    """True for failures that mean AceStep isn't serving yet (or any more),
+    as opposed to a request it rejected."""
+    if isinstance(exc, (AceStepUnavailable, httpx.TransportError)):
+        return True
+    return isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code in (500, 502, 503, 504)
+
+
+def _in_flight_cap() -> int | None:
+    if DISPATCH_IN_FLIGHT_PER_BACKEND <= 0:
+        return None
+    return DISPATCH_IN_FLIGHT_PER_BACKEND * max(1, backend_count())
+
+
+def _has_dispatch_slot(lane: str = INTERACTIVE) -> bool:
+    """Bulk jobs leave one slot free, so a preview never queues on AceStep
+    behind more renders than are already running."""
+    cap = _in_flight_cap()
+    if cap is None:
+        return True
+    reserve = 1 if lane == BULK and cap > 1 else 0
+    return len(_queue_order) + _submitting < cap - reserve
+
+
+def _kick_dispatch() -> None:
+    """Start a drain if something is held and it could go out now."""
+    global _drain_task
+    if _engine_ready and _waiting and _has_dispatch_slot() \
+            and (_drain_task is None or _drain_task.done()):
+        _drain_task = asyncio.create_task(_drain_waiting())
+
+
+def _set_engine_ready(ready: bool) -> None:
+    global _engine_ready
+    if ready != _engine_ready:
+        logger.info("engine %s (%d request(s) held)", "ready" if ready else "not ready", len(_waiting))
+        _engine_ready = ready
+        if not ready:
+            _engine_wake.set()   # re-probe at the fast interval
+    _kick_dispatch()
+
+
+def _hold(req: GenerateRequest, user: str, lane: str | None = None,
+          cache_key: str | None = None) -> dict:
+    """Accept a generation request that can't be sent to AceStep right now:
+    the engine isn't ready, the in-flight cap is reached, or other jobs are
+    already held (they may have priority)."""
+    if len(_waiting) >= ENGINE_WAIT_QUEUE_SIZE:
+        raise HTTPException(status_code=503, detail="The wait queue is full",
+                            headers={"Retry-After": str(int(max(1, ENGINE_POLL_INTERVAL_S * 5)))})
+    task_id = str(uuid.uuid4())
+    _pending[task_id] = {
+        "params": req.model_dump(exclude=_CALLBACK_FIELDS),
+        "format": req.audio_format,
+        "user": user,
+        "created_at": time.monotonic(),
+        "request": req,
+        "upstream_id": None,
+    }
+    if cache_key:
+        _pending[task_id]["cache_key"] = cache_key
+    if req.callback_url:
+        _pending[task_id]["callback"] = {"url": req.callback_url, "secret": req.callback_secret}
+    _store_pending(task_id)
+    _expire_after("pending", task_id, _pending[task_id]["created_at"])
+    _waiting.push(task_id, user, lane or _job_lane(_pending[task_id]["params"]))
+    _index_fusable(task_id)
+    state = _job_state(task_id)
+    _publish(user, "queued", {"task_id": task_id, "status": state,
+                              "queue_position": _queue_position(task_id),
+                              "queue_depth": _queue_depth(), **_eta_fields(_job_estimate(task_id))})
+    logger.info("generate user=%s task_id=%s held (%s)", user, task_id,
+                "engine not ready" if state == "waiting" else "dispatch queue")
+    _kick_dispatch()
+    return {"task_id": task_id, "status": state, "lane": _waiting.lane(task_id)}
+
+
+# ---------------------------------------------------------------------------
+# Request fusion — identical random-seed requests share one AceStep batch
+# ---------------------------------------------------------------------------
+#
+# Clicking Generate three times with the same settings queues three jobs
+# that differ only in their random seeds. When the first of them is
+# dispatched, the others still held are sent along in the same
+# release_task call with a larger batch_size. The first becomes the batch
+# leader: it alone is in _queue_order and polled by the watcher, and its
+# pending["fused"] lists [task_id, batch_size] for every member in batch
+# order. The others carry pending["fused_into"] = leader. _finalize_job()
+# hands each member its slice of the batch's results.
+
+# fusion key → held task ids with that key, oldest first (dict as ordered set)
+_fusable: dict[str, dict[str, None]] = {}
+
+
+def _fusion_key(req: GenerateRequest) -> str | None:
+    """Requests with equal keys differ only in random seed and batch size,
+    so AceStep can render them as one batch."""
+    if req.seed is not None or FUSE_MAX_BATCH <= 1:
+        return None
+    payload = _build_payload(req)
+    for field in ("batch_size", "seed", "use_random_seed"):
+        payload.pop(field, None)
+    return json.dumps(payload, sort_keys=True, default=str)
+
+
+def _index_fusable(task_id: str) -> None:
+    req = _pending[task_id].get("request")
+    key = _fusion_key(req) if req is not None else None
+    if key is not None:
+        _pending[task_id]["fusion_key"] = key
+        _fusable.setdefault(key, {})[task_id] = None
+
+
+def _unindex_fusable(task_id: str) -> None:
+    key = _pending.get(task_id, {}).get("fusion_key")
+    held = _fusable.get(key)
+    if held is not None:
+        held.pop(task_id, None)
+        if not held:
+            del _fusable[key]
+
+
+def _fusion_group(task_id: str) -> list[str]:
+    """task_id plus the held jobs that can share its AceStep batch, oldest
+    first, within FUSE_MAX_BATCH and FUSE_MAX_AUDIO_S."""
+    pending = _pending[task_id]
+    group = [task_id]
+    key = pending.get("fusion_key")
+    if key is None:
+        return group
+    duration = pending["request"].duration
+    batch = max(1, pending["request"].batch_size)
+    for other in _fusable.get(key, ()):
+        if other == task_id or other not in _pending:
+            continue
+        size = max(1, _pending[other]["request"].batch_size)
+        if batch + size <= FUSE_MAX_BATCH and (batch + size) * duration <= FUSE_MAX_AUDIO_S:
+            group.append(other)
+            batch += size
+    return group
+
+
+def _unfuse(task_id: str) -> list[str]:
+    """Split a batch leader from its members (AceStep lost the batch);
+    returns the members still pending, each back to a job of its own."""
+    pending = _pending.get(task_id, {})
+    pending.pop("fused_batch", None)
+    pending.pop("predicted_s", None)
+    return [t for t, _ in pending.pop("fused", ()) if t != task_id and t in _pending]
+
+
+# user → live fused members of theirs. A member has no _queue_order entry
+# of its own (it rides on its leader's), so it's counted here towards
+# MAX_JOBS_PER_USER instead; see _jobs_in_progress.
+_fused_members: dict[str, int] = {}
+
+
+def _count_member(user: str, delta: int) -> None:
+    left = _fused_members.get(user, 0) + delta
+    if left > 0:
+        _fused_members[user] = left
+    else:
+        _fused_members.pop(user, None)
+
+
+def _detach_member(pending: dict) -> None:
+    """Clear a job's fused_into, if it has one, and stop counting it as a member."""
+    if pending.pop("fused_into", None) is not None:
+        _count_member(pending.get("user", "local"), -1)
+
+
+def _pop_pending(task_id: str) -> dict:
+    """Remove task_id from _pending (a no-op {} if it's gone)."""
+    pending = _pending.pop(task_id, {})
+    _detach_member(pending)
+    return pending
+
+
+async def _drain_waiting() -> None:
+    """Dispatch held requests in fair-share order until none are left, the
+    in-flight cap is reached, or the engine stops answering again."""
+    global _submitting
+    submitted = 0
+    try:
+        while _waiting and _engine_ready:
+            _waiting.age()
+            task_id = _waiting.peek()
+            if not _has_dispatch_slot(_waiting.lane(task_id)):
+                break
+            pending = _pending.get(task_id)
+            if pending is None:
+                _waiting.remove(task_id)
+                continue
+            req = pending["request"]
+            group = _fusion_group(task_id)
+            sizes = {t: max(1, _pending[t]["request"].batch_size) for t in group}
+            backend = pick_backend()
+            _submitting += 1
+            try:
+                staged = await _stage_request(req, backend)
+                payload = _build_payload(staged)
+                payload["batch_size"] = sum(sizes.values())
+                upstream_id = await release_task(payload, backend=backend)
+            except Exception as exc:
+                if _engine_down(exc):
+                    _set_engine_ready(False)
+                    return
+                _finalize_job(task_id, {"status": "error", "reason": f"submit failed: {exc}"})
+                continue
+            finally:
+                _submitting -= 1
+            for t in group:
+                _waiting.dispatched(t)
+                _unindex_fusable(t)
+            live = [t for t in group if t in _pending]
+            if not live:   # expired or cancelled while the submit was in flight
+                params = staged.model_dump(exclude=_CALLBACK_FIELDS)
+                params["batch_size"] = sum(sizes.values())
+                await _discard_unwanted(task_id, pending, upstream_id, params)
+                continue
+            if task_id in _pending:
+                pending["params"] = staged.model_dump(exclude=_CALLBACK_FIELDS)
+            leader, now = live[0], time.monotonic()
+            for t in live:
+                p = _pending[t]
+                if t == leader:
+                    p["next_check"] = 0.0
+                    if len(group) > 1:
+                        p["fused"] = [[m, sizes[m]] for m in group]
+                        p["fused_batch"] = sum(sizes.values())
+                        p.pop("predicted_s", None)
+                    _queue_order.append(t, p["user"])
+                else:
+                    p["fused_into"] = leader
+                    _count_member(p["user"], 1)
+                p["upstream_id"] = upstream_id
+                p["created_at"] = now
+                _store_pending(t)
+            submitted += 1
+            logger.info("dispatched task_id=%s upstream=%s user=%s%s", leader, upstream_id,
+                        _pending[leader]["user"],
+                        f" fused={len(group)} batch={sum(sizes.values())}" if len(group) > 1 else "")
+    finally:
+        if submitted:
+            _publish_positions()
+            _watch_wake.set()
+
+
+def _requeue_orphans(task_ids: list[str], reason: str) -> None:
+    """Put jobs AceStep lost (it restarted) back at the head of the held
+    queue, in queue order; _drain_waiting() resubmits the stored request —
+    same seed settings — under the same client task id. A job lost more
+    than JOB_MAX_RESUBMITS times fails instead."""
+    orphans = 0
+    requeue = []
+    for task_id in sorted(task_ids, key=_queue_order.position):
+        if not _pending.get(task_id, {}).get("fused_into"):   # members go with their leader
+            requeue += [task_id, *_unfuse(task_id)]
+    for task_id in requeue:
+        pending = _pending.get(task_id)
+        if pending is None or _upstream_id(task_id) is None:
+            continue
+        settle_task(_upstream_id(task_id))
+        _detach_member(pending)
+        tries = pending.get("resubmits", 0)
+        if "request" not in pending or tries >= JOB_MAX_RESUBMITS:
+            _finalize_job(task_id, {"status": "error",
+                                    "reason": f"{reason}; not resubmitted after {tries} attempt(s)"})
+            continue
+        pending["resubmits"] = tries + 1
+        pending["upstream_id"] = None
+        for key in ("next_check", "last_running_at"):
+            pending.pop(key, None)
+        _store_pending(task_id)
+        _queue_order.remove(task_id)
+        _waiting.push_urgent(task_id, pending["user"])
+        _index_fusable(task_id)
+        orphans += 1
+        logger.warning("resubmitting task_id=%s (%s, attempt %d)", task_id, reason, tries + 1)
+    if orphans:
+        _publish_positions()
+        _kick_dispatch()
+
+
+def _recover_restarted(restarted: dict[int, float]) -> None:
+    """Handle backends whose AceStep instance changed (see check_backends):
+    jobs submitted before the old instance was last seen are gone; ones
+    submitted since may be on the new instance, so the watcher asks."""
+    lost = []
+    for task_id, pending in _pending.items():
+        upstream_id = _upstream_id(task_id)
+        if upstream_id is None or backend_of(upstream_id) not in restarted:
+            continue
+        if pending.get("created_at", 0.0) <= restarted[backend_of(upstream_id)]:
+            lost.append(task_id)
+        else:
+            pending["next_check"] = 0.0
+    _requeue_orphans(lost, "AceStep restarted")
+    _watch_wake.set()
+
+
+# ---------------------------------------------------------------------------
+# Result cache — a fixed-seed repeat is answered from the earlier job's takes
+# ---------------------------------------------------------------------------
+
+_results = resultcache.ResultCache()
+
+
+async def _cache_key(req: GenerateRequest) -> str | None:
+    """req's result-cache key, or None if it can't be served from cache: a
+    random seed, source audio that can't be read, or LoRA state unknown."""
+    if req.seed is None or _results.max_entries <= 0:
+        return None
+    payload = _build_payload(req)
+    try:
+        digests = {field: await asyncio.to_thread(resultcache.file_digest, payload[field])
+                   for field in resultcache.AUDIO_FIELDS if payload.get(field)}
+        lora = await lora_status()
+    except Exception as exc:
+        logger.debug("result cache skipped: %s", exc)
+        return None
+    return resultcache.request_key(payload, digests, lora)
+
+
+def _serve_cached(req: GenerateRequest, user: str, cache_key: str) -> dict | None:
+    """Finish a new job with the takes of an identical earlier one, if the
+    user has one whose takes still exist."""
+    entry = _results.get(user, cache_key)
+    if entry is None:
+        return None
+    if not all(r.get("take") and takes.audio_path_for(r["take"]["job_id"], r["take"]["index"])
+               for r in entry["results"]):
+        _results.discard(user, cache_key)   # a take was deleted since
+        return None
+    task_id = str(uuid.uuid4())
+    _pending[task_id] = {
+        "params": req.model_dump(exclude=_CALLBACK_FIELDS),
+        "format": req.audio_format,
+        "user": user,
+        "created_at": time.monotonic(),
+    }
+    if req.callback_url:
+        _pending[task_id]["callback"] = {"url": req.callback_url, "secret": req.callback_secret}
+    _finalize_job(task_id, {"status": "done", "results": entry["results"]},
+                  publish_positions=False)
+    logger.info("generate user=%s task_id=%s served from cache (job %s)",
+                user, task_id, entry["task_id"])
+    return {"task_id": task_id, "status": "done", "cached": True}
+
+
+# ---------------------------------------------------------------------------
+# Idempotency keys — a retried POST /generate returns the original task
+# ---------------------------------------------------------------------------
+#
+# A client may send Idempotency-Key with /generate. The first request with a
+# key submits as usual; any other request from the same user with that key,
+# within IDEMPOTENCY_TTL_MIN, gets the first one's response instead of a
+# second render. A duplicate that arrives while the first is still being
+# submitted waits for it. If the first fails, the key is released and the
+# next attempt submits afresh.
+
+# (user, key) → {"created_at", "body" (request hash), "done" (future → response or None)}
+_idempotency: dict[tuple[str, str], dict] = {}
+
+
+def _request_digest(req: GenerateRequest) -> str:
+    blob = json.dumps(req.model_dump(), sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
 @app.post("/generate")
-async def generate(req: GenerateRequest, request: Request):
+async def generate(req: GenerateRequest, request: Request, response: Response):
     user = request.state.user
+    key = request.headers.get("idempotency-key")
+    if not key:
+        return await _submit_generation(req, user)
+    slot = (user, key[:256])
+    body = _request_digest(req)
+    while (entry := _idempotency.get(slot)) is not None:
+        if entry["body"] != body:
+            raise HTTPException(status_code=422,
+                                detail="Idempotency-Key was already used for a different request")
+        first = await asyncio.shield(entry["done"])
+        if first is not None:
+            response.headers["Idempotent-Replayed"] = "true"
+            logger.info("generate user=%s replayed task_id=%s for Idempotency-Key", user, first["task_id"])
+            return dict(first)
+        # The first attempt failed and released the key; try again
+    now = time.monotonic()
+    entry = _idempotency[slot] = {"created_at": now, "body": body,
+                                  "done": asyncio.get_running_loop().create_future()}
+    try:
+        result = await _submit_generation(req, user)
+    except BaseException:
+        del _idempotency[slot]
+        entry["done"].set_result(None)
+        raise
+    entry["done"].set_result(dict(result))
+    _expire_after("idempotency", slot, now)
+    return result
+
+
+async def _submit_generation(req: GenerateRequest, user: str) -> dict:
+    global _submitting
 
     # Per-user rate limit (skip for "local" user)
     if user != "local":
-        user_pending = sum(1 for p in _pending.values() if p.get("user") == user)
+        user_pending = _jobs_in_progress(user)
         if user_pending >= MAX_JOBS_PER_USER:
             raise HTTPException(
                 status_code=429,
                 detail=f"You already have {user_pending} jobs in progress. Wait for one to finish.",
             )
 
-    # AceStep rejects absolute audio paths outside /tmp — copy if needed
-    updates = {}
-    if req.src_audio_path:
-        safe = _ensure_in_tmp(req.src_audio_path)
-        if safe != req.src_audio_path:
-            updates["src_audio_path"] = safe
-    if req.reference_audio_path:
-        safe = _ensure_in_tmp(req.reference_audio_path)
-        if safe != req.reference_audio_path:
-            updates["reference_audio_path"] = safe
-    if updates:
-        req = req.model_copy(update=updates)
-    payload = _build_payload(req)
+    if req.callback_url and not await webhooks.url_allowed(req.callback_url):
+        raise HTTPException(status_code=422, detail="callback_url must be an http(s) URL on a "
+                                                    "public host (or one in WEBHOOK_ALLOWED_HOSTS)")
+
+    cache_key = await _cache_key(req)
+    if cache_key is not None:
+        hit = _serve_cached(req, user, cache_key)
+        if hit is not None:
+            return hit
+
+    lane = _job_lane(req.model_dump(exclude=_CALLBACK_FIELDS))
+    if not _engine_ready or _waiting or not _has_dispatch_slot(lane):
+        return _hold(req, user, lane, cache_key)
+    backend = pick_backend()
+    _submitting += 1
     try:
-        task_id = await release_task(payload)
-    except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"AceStep error: {exc}")
+        try:
+            staged = await _stage_request(req, backend)
+        except FileNotFoundError as exc:
+            raise HTTPException(status_code=404, detail=str(exc))
+        except Exception as exc:
+            if not _engine_down(exc):
+                raise _upstream_error(exc, "AceStep upload error")
+            _set_engine_ready(False)
+            return _hold(req, user, lane, cache_key)
+        try:
+            task_id = await release_task(_build_payload(staged), backend=backend)
+        except Exception as exc:
+            if not _engine_down(exc):
+                raise _upstream_error(exc)
+            _set_engine_ready(False)
+            return _hold(req, user, lane, cache_key)
+    finally:
+        _submitting -= 1
 
     _pending[task_id] = {
-        "params": req.model_dump(),
+        "params": staged.model_dump(exclude=_CALLBACK_FIELDS),
         "format": req.audio_format,
         "user": user,
         "created_at": time.monotonic(),
+        "request": req,
     }
-    _queue_order.append((task_id, user))
+    if cache_key:
+        _pending[task_id]["cache_key"] = cache_key
+    if req.callback_url:
+        _pending[task_id]["callback"] = {"url": req.callback_url, "secret": req.callback_secret}
+    _store_pending(task_id)
+    _expire_after("pending", task_id, _pending[task_id]["created_at"])
+    _queue_order.append(task_id, user)
+    estimates = _queue_estimates()
+    _publish(user, "queued", {"task_id": task_id, "status": "processing",
+                              "queue_position": _queue_position(task_id),
+                              "queue_depth": _queue_depth(),
+                              **_eta_fields(estimates.get(task_id))})
+    _pending[task_id]["next_check"] = time.monotonic() + _check_delay(estimates[task_id][1])
+    _watch_wake.set()
     logger.info("generate user=%s task_id=%s duration=%s batch=%s", user, task_id, req.duration, req.batch_size)
     return {"task_id": task_id}
 
@@ -631,60 +1608,150 @@ class GenerateLyricsRequest(BaseModel):
     vocal_language: str = "en"
 
 
+# ---------------------------------------------------------------------------
+# Lyrics and audio analysis — AceStep tasks tracked like generations
+# ---------------------------------------------------------------------------
+#
+# Both are AceStep tasks whose result is metadata rather than takes. They
+# go in _pending/_queue_order with pending["kind"] set, so the watcher
+# polls them, the job store keeps them, and /status reports them. When
+# one finishes, _finalize_job() stores the typed result in _jobs[...]["result"].
+# With ?async=true the route returns the task id at once; otherwise it
+# waits for the watcher to finish the job, and answers as it always has.
+
+class LyricsResult(BaseModel):
+    caption: str = ""
+    lyrics: str = ""
+    bpm: Optional[int] = None
+    key_scale: str = ""
+    time_signature: str = "4/4"
+    duration: Optional[Union[int, float]] = None
+    audio_url: str = ""
+    audio_path: str = ""
+
+
+class AudioAnalysisResult(BaseModel):
+    caption: str = ""
+    lyrics: str = ""
+    bpm: Optional[int] = None
+    key_scale: str = ""
+    time_signature: str = "4/4"
+    vocal_language: str = ""
+    duration: Optional[Union[int, float]] = None
+
+
+def _meta_number(value, kind=float):
+    """AceStep reports some meta numbers as strings, or as "N/A"."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    try:
+        return kind(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def _lyrics_result(result: dict) -> dict:
+    meta = result.get("meta") or {}
+    # Audio path for preview & rework
+    raw_audio_url = result.get("audio_url", "")
+    audio_path = ""
+    if raw_audio_url:
+        audio_path = parse_qs(urlparse(raw_audio_url).query).get("path", [""])[0]
+        if transfer.REMOTE:
+            transfer.remember(audio_path)
+    return LyricsResult(
+        caption=result.get("prompt") or "",
+        lyrics=result.get("lyrics") or "",
+        bpm=_meta_number(meta.get("bpm"), int),
+        key_scale=meta.get("keyscale") or "",
+        time_signature=str(meta.get("timesignature") or "4/4"),
+        duration=_meta_number(meta.get("duration")),
+        audio_url=raw_audio_url,
+        audio_path=audio_path,
+    ).model_dump()
+
+
+def _analysis_result(result: dict) -> dict:
+    meta = result.get("meta") or {}
+    return AudioAnalysisResult(
+        caption=result.get("prompt") or "",
+        lyrics=result.get("lyrics") or "",
+        bpm=_meta_number(meta.get("bpm"), int),
+        key_scale=meta.get("keyscale") or "",
+        time_signature=str(meta.get("timesignature") or "4/4"),
+        vocal_language=meta.get("language") or "",
+        duration=_meta_number(meta.get("duration")),
+    ).model_dump()
+
+
+# pending["kind"] → (builds the typed result from AceStep's first result,
+# what the blocking route calls the job in errors, seconds it waits)
+_TASK_KINDS = {
+    "lyrics":   (_lyrics_result, "Lyrics generation", 600),   # includes audio generation
+    "analysis": (_analysis_result, "Audio analysis", 300),     # LM-only, ~10-30s
+}
+# task_id → future a blocking route is awaiting; _finalize_job resolves it
+_task_waiters: dict[str, asyncio.Future] = {}
+
+
+def _track_task(task_id: str, user: str, kind: str, params: dict) -> None:
+    """Hand a submitted lyrics/analysis task to the watcher."""
+    now = time.monotonic()
+    _pending[task_id] = {"params": params, "format": "mp3", "user": user,
+                         "created_at": now, "kind": kind}
+    _store_pending(task_id)
+    _expire_after("pending", task_id, now)
+    # Not in _queue_order: the task went to AceStep directly, outside
+    # fair-share dispatch, so it takes no dispatch slot and doesn't count
+    # against the owner's MAX_JOBS_PER_USER
+    estimates = _queue_estimates()
+    _pending[task_id]["next_check"] = now + _check_delay(estimates[task_id][1])
+    _publish(user, "queued", {"task_id": task_id, "status": "processing", "kind": kind,
+                              "queue_position": _queue_position(task_id),
+                              "queue_depth": _queue_depth(),
+                              **_eta_fields(estimates.get(task_id))})
+    _watch_wake.set()
+
+
+async def _task_response(task_id: str, kind: str, wait: bool) -> dict:
+    """The route's answer: the task id now, or the typed result once done."""
+    if not wait:
+        return {"task_id": task_id, "status": "processing", "kind": kind}
+    _, what, timeout = _TASK_KINDS[kind]
+    future = _task_waiters[task_id] = asyncio.get_running_loop().create_future()
+    try:
+        data = await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"{what} timed out")
+    finally:
+        _task_waiters.pop(task_id, None)
+    if data["status"] != "done":
+        raise HTTPException(status_code=502, detail=data.get("reason") or f"{what} failed")
+    return _jobs[task_id]["result"]
+
+
 @app.post("/generate-lyrics")
-async def generate_lyrics(req: GenerateLyricsRequest, request: Request):
+async def generate_lyrics(req: GenerateLyricsRequest, request: Request,
+                          run_async: bool = Query(False, alias="async")):
     """Generate structured lyrics from a natural language description.
 
     Uses AceStep's sample_query mode: the LM generates lyrics + metadata,
-    then AceStep proceeds to audio generation. We poll until complete and
-    extract the lyrics/metadata from the result. The generated audio is
-    available as a bonus but not returned here.
+    then AceStep proceeds to audio generation. The lyrics/metadata are
+    extracted from the result; the generated audio is available as a bonus
+    (audio_url/audio_path). With ?async=true, returns {task_id} at once and
+    the result arrives on /status and /events.
     """
     if not req.description.strip():
         raise HTTPException(status_code=422, detail="Description cannot be empty")
-    logger.info("generate-lyrics user=%s desc=%.60s", request.state.user, req.description)
+    user = request.state.user
+    logger.info("generate-lyrics user=%s desc=%.60s", user, req.description)
 
     try:
         task_id = await create_sample(req.description, req.vocal_language)
     except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"AceStep error: {exc}")
-
-    # Server-side polling — includes full audio generation, so allow longer
-    for _ in range(300):  # 300 × 2s = 10 min timeout
-        await asyncio.sleep(2)
-        try:
-            data = await query_result(task_id)
-        except Exception as exc:
-            raise HTTPException(status_code=502, detail=f"AceStep poll error: {exc}")
-
-        if data["status"] == "done":
-            results = data.get("results") or []
-            if not results:
-                raise HTTPException(status_code=502, detail="No results returned")
-            result = results[0]
-            meta = result.get("meta") or {}
-
-            # Extract audio paths for preview & rework
-            raw_audio_url = result.get("audio_url", "")
-            audio_path = ""
-            if raw_audio_url:
-                parsed = parse_qs(urlparse(raw_audio_url).query)
-                audio_path = parsed.get("path", [""])[0]
-
-            return {
-                "caption": result.get("prompt", ""),
-                "lyrics": result.get("lyrics", ""),
-                "bpm": meta.get("bpm"),
-                "key_scale": meta.get("keyscale", ""),
-                "time_signature": meta.get("timesignature", "4/4"),
-                "duration": meta.get("duration"),
-                "audio_url": raw_audio_url,
-                "audio_path": audio_path,
-            }
-        elif data["status"] == "error":
-            raise HTTPException(status_code=502, detail="Lyrics generation failed")
-
-    raise HTTPException(status_code=504, detail="Lyrics generation timed out")
+        raise _upstream_error(exc)
+    _track_task(task_id, user, "lyrics", {"task_type": "lyrics"})
+    return await _task_response(task_id, "lyrics", wait=not run_async)
 
 
 class AnalyzeAudioRequest(BaseModel):
@@ -692,52 +1759,34 @@ class AnalyzeAudioRequest(BaseModel):
 
 
 @app.post("/analyze-audio")
-async def analyze_audio(req: AnalyzeAudioRequest, request: Request):
+async def analyze_audio(req: AnalyzeAudioRequest, request: Request,
+                        run_async: bool = Query(False, alias="async")):
     """Analyze uploaded audio: extract BPM, key, lyrics, style description, and audio codes.
 
     Uses AceStep's full_analysis_only mode: VAE-encodes audio, VQ-tokenizes to
     discrete codes, then the LLM reverse-engineers metadata from the codes.
-    No audio generation occurs — this is analysis only.
+    No audio generation occurs — this is analysis only. With ?async=true,
+    returns {task_id} at once and the result arrives on /status and /events.
     """
     if not req.audio_path:
         raise HTTPException(status_code=422, detail="audio_path is required")
 
-    safe_path = _ensure_in_tmp(req.audio_path)
+    backend = pick_backend()
+    try:
+        safe_path = await _stage_audio(req.audio_path, backend)
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    except Exception as exc:
+        raise _upstream_error(exc, "AceStep upload error")
     try:
         task_id = await release_task({
             "full_analysis_only": True,
             "src_audio_path": safe_path,
-        })
+        }, backend=backend)
     except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"AceStep error: {exc}")
-
-    # Server-side polling — analysis is LM-only, typically ~10-30s
-    for _ in range(150):  # 150 × 2s = 5 min timeout
-        await asyncio.sleep(2)
-        try:
-            data = await query_result(task_id)
-        except Exception as exc:
-            raise HTTPException(status_code=502, detail=f"AceStep poll error: {exc}")
-
-        if data["status"] == "done":
-            results = data.get("results") or []
-            if not results:
-                raise HTTPException(status_code=502, detail="No results returned")
-            result = results[0]
-            meta = result.get("meta") or {}
-            return {
-                "caption": result.get("prompt", ""),
-                "lyrics": result.get("lyrics", ""),
-                "bpm": meta.get("bpm"),
-                "key_scale": meta.get("keyscale", ""),
-                "time_signature": meta.get("timesignature", "4/4"),
-                "vocal_language": meta.get("language", ""),
-                "duration": meta.get("duration"),
-            }
-        elif data["status"] == "error":
-            raise HTTPException(status_code=502, detail="Audio analysis failed")
-
-    raise HTTPException(status_code=504, detail="Audio analysis timed out")
+        raise _upstream_error(exc)
+    _track_task(task_id, request.state.user, "analysis", {"task_type": "analysis"})
+    return await _task_response(task_id, "analysis", wait=not run_async)
 
 
 _PERSIST_TASK_TYPES = {"text2music", "cover", "repaint"}
@@ -761,9 +1810,17 @@ def _persist_results(task_id: str, results: list, pending: dict) -> None:
             "seed": params.get("seed"),
         }
     for i, result in enumerate(results or []):
+        if result.get("take"):
+            continue   # already a take (served from the result cache)
+        source = result
+        if transfer.REMOTE:
+            # Write the take from the local cache copy fetched by the watcher
+            local = transfer.cached(result.get("audio_url", ""))
+            if local is not None:
+                source = {**result, "audio_url": str(local)}
         try:
             take = takes.write_take(
-                task_id, i, result, params, fmt,
+                task_id, i, source, params, fmt,
                 seed_mode=params.get("seed_mode", "random"),
                 parent_take=params.get("parent_take"),
                 rework=rework,
@@ -773,108 +1830,533 @@ def _persist_results(task_id: str, results: list, pending: dict) -> None:
             logger.warning("take persist failed job=%s idx=%d: %s", task_id, i, exc)
             continue
         if take:
-            src = takes._url_to_fs_path(result.get("audio_url", ""))
+            src = result.get("audio_url", "")
             result["audio_url"] = str(takes.TAKES_DIR / task_id / take["audio_file"])
             result["take"] = {"job_id": task_id, "index": i}
             _enqueue_alignment(task_id, i)
             # The takes/ copy is now the durable one — drop the tmp original.
-            # Guarded to AceStep's tmp cache so no other source is ever touched.
-            if src and "/.cache/acestep/tmp/" in str(src):
-                try:
-                    src.unlink(missing_ok=True)
-                except OSError:
-                    pass
+            _reclaim_tmp_audio(src)
 
 
-def _finalize_job(task_id: str, data: dict) -> None:
-    """Apply a job's terminal state to the in-process stores. Idempotent —
-    safe to call from both /status polling and the background watcher."""
+def _reclaim_tmp_audio(audio_url: str) -> None:
+    """Delete a result's original from AceStep's tmp cache. Guarded to that
+    cache so no other source is ever touched."""
+    src = takes._url_to_fs_path(audio_url)
+    if src and "/.cache/acestep/tmp/" in str(src):
+        try:
+            src.unlink(missing_ok=True)
+        except OSError:
+            pass
+
+
+def _notify_callback(pending: dict, event: str, payload: dict) -> None:
+    callback = pending.get("callback")
+    if callback:
+        webhooks.enqueue(callback["url"], callback["secret"], event,
+                         {"event": event, "user": pending.get("user", "local"), **payload})
+
+
+def _finalize_job(task_id: str, data: dict, publish_positions: bool = True) -> None:
+    """Apply a job's terminal state to the in-process stores and publish it
+    on the owner's event stream. Idempotent — safe to call more than once.
+    Pass publish_positions=False when finalizing a batch and call
+    _publish_positions() once afterwards.
+
+    For a fused batch's leader, data is the whole batch: each member,
+    the leader included, is finalized with its own slice of the results;
+    slices of members cancelled since are discarded. A cancelled job
+    AceStep kept rendering is dropped here, its audio deleted."""
+    fused = _pending.get(task_id, {}).pop("fused", None) \
+        if data["status"] in ("done", "error") else None
+    if fused is not None:
+        offset = 0
+        for member, count in fused:
+            part = data
+            if data["status"] == "done":
+                part = {**data, "results": (data["results"] or [])[offset:offset + count]}
+                if not part["results"]:
+                    part = {"status": "error", "reason": "missing from the fused batch's results"}
+            offset += count
+            if member in _pending:
+                _finalize_job(member, part, publish_positions)
+            else:
+                for result in part.get("results") or ():
+                    _reclaim_tmp_audio(result.get("audio_url", ""))
+        return
+    if _pending.get(task_id, {}).get("cancelled"):
+        if data["status"] in ("done", "error"):
+            _drop_discarded(task_id, data, publish_positions)
+        return
+    kind = _pending.get(task_id, {}).get("kind")
+    if kind and data["status"] == "done" and not data.get("results"):
+        data = {"status": "error", "reason": "No results returned"}
     if data["status"] == "done" and task_id not in _jobs:
-        pending = _pending.pop(task_id, {})
+        pending = _pop_pending(task_id)
+        user = pending.get("user", "local")
         _jobs[task_id] = {
             "results": data["results"],
             "params":  pending.get("params", {}),
             "format":  pending.get("format", "mp3"),
-            "user":    pending.get("user", "local"),
+            "user":    user,
             "created_at": pending.get("created_at", time.monotonic()),
         }
+        if kind:
+            _jobs[task_id].update(kind=kind, result=_TASK_KINDS[kind][0](data["results"][0]))
         _persist_results(task_id, data["results"], pending)
-        # Remove from queue
-        _queue_order[:] = [(t, u) for t, u in _queue_order if t != task_id]
+        if pending.get("cache_key") and data["results"] \
+                and all(r.get("take") for r in data["results"]):
+            _results.put(user, pending["cache_key"], task_id, data["results"])
+        _store_job(task_id)
+        _expire_after("job", task_id, _jobs[task_id]["created_at"])
+        _dequeue(task_id, publish_positions)
+        event = {"task_id": task_id, "status": "done", "results": _jobs[task_id]["results"]}
+        if kind:
+            event.update(kind=kind, result=_jobs[task_id]["result"])
+        _publish(user, "done", event)
+        _notify_callback(pending, "job.done", {
+            **event,
+            "takes": [r["take"] for r in event["results"] if r.get("take")],
+        })
         logger.info("complete user=%s task_id=%s results=%d", pending.get("user", "?"), task_id, len(data.get("results", [])))
 
     elif data["status"] == "error" and task_id in _pending:
-        pending = _pending.pop(task_id, {})
-        _queue_order[:] = [(t, u) for t, u in _queue_order if t != task_id]
+        pending = _pop_pending(task_id)
+        jobstore.delete_job(task_id)
+        _dequeue(task_id, publish_positions)
+        event = {"task_id": task_id, "status": "error",
+                 "reason": data.get("reason", "generation failed")}
+        if pending.get("upstream_id", task_id) != task_id:
+            # AceStep doesn't know the client's id (the job was held, or
+            # resubmitted), so /status can't ask it: keep the outcome here
+            _jobs[task_id] = {"status": "error", "reason": event["reason"], "results": [],
+                              "params": pending.get("params", {}),
+                              "format": pending.get("format", "mp3"),
+                              "user": pending.get("user", "local"),
+                              "created_at": pending.get("created_at", time.monotonic())}
+            _expire_after("job", task_id, _jobs[task_id]["created_at"])
+        _publish(pending.get("user", "local"), "failed", event)
+        _notify_callback(pending, "job.failed", event)
         logger.warning("failed user=%s task_id=%s", pending.get("user", "?"), task_id)
+    else:
+        return
+    waiter = _task_waiters.pop(task_id, None)
+    if waiter is not None and not waiter.done():
+        waiter.set_result(data)
 
 
 async def _watch_pending_jobs_once() -> None:
     """Check pending jobs against AceStep; finalize any that finished.
 
-    Runs the same done-transition as /status, so results are persisted as
-    takes even when no browser is polling (e.g. tab closed or poll died)."""
-    for task_id in list(_pending):
-        if task_id in _jobs:
+    This is the only place tracked jobs are polled upstream: /status reads
+    the state recorded here and browsers get pushed updates via /events.
+    Only jobs whose scheduled check is due are asked about, in one batched
+    /query_result call; completions feed the runtime predictor."""
+    now = time.monotonic()
+    upstream = {p.get("upstream_id", t): t for t, p in _pending.items()
+                if t not in _jobs and p.get("next_check", 0) <= now and not p.get("localizing")
+                and p.get("upstream_id", t) is not None and not p.get("fused_into")}
+    if not upstream:
+        return
+    try:
+        batch = await query_results(list(upstream))
+    except Exception:
+        return  # AceStep busy/unreachable — still due, retry next round
+    batch = {upstream[u]: d for u, d in batch.items() if u in upstream}
+    lost = [t for t, d in batch.items() if d.get("lost")]
+    if lost:
+        _requeue_orphans(lost, "task unknown to AceStep")
+        batch = {t: d for t, d in batch.items() if not d.get("lost")}
+    finished = [(t, d) for t, d in batch.items() if d["status"] in ("done", "error")]
+    for t, d in batch.items():
+        if d["status"] == "processing" and t in _pending:
+            _pending[t]["last_running_at"] = now
+    if finished:
+        by_backend: dict[int, list[str]] = {}
+        for t, d in finished:
+            if _pending.get(t, {}).get("kind"):
+                continue   # lyrics/analysis: not renders, so nothing to learn from
+            done_ids = by_backend.setdefault(backend_of(_upstream_id(t)), [])
+            if d["status"] == "done":
+                done_ids.append(t)
+        for backend, done_ids in by_backend.items():
+            _learn_runtimes(done_ids, now, _service_free_at.get(backend, 0.0))
+            _service_free_at[backend] = now
+        for p in _pending.values():  # re-predict with what was just learned
+            p.pop("predicted_s", None)
+    for task_id, data in finished:
+        if task_id not in _pending:   # cancelled or expired while AceStep was asked
             continue
-        try:
-            data = await query_result(task_id)
-        except Exception:
-            continue  # AceStep busy/unreachable — retry next round
-        if data["status"] in ("done", "error"):
-            _finalize_job(task_id, data)
+        if transfer.REMOTE and data["status"] == "done" and not _pending[task_id].get("cancelled"):
+            # Downloading can take a while; don't hold up everyone else's jobs
+            _pending[task_id]["localizing"] = True
+            task = asyncio.create_task(_localize_then_finalize(task_id, data))
+            _localizing.add(task)
+            task.add_done_callback(_localizing.discard)
+            continue
+        _finalize_job(task_id, data, publish_positions=False)
+    if finished:
+        _publish_positions()
+    _schedule_checks(now)
+
+
+_localizing: set[asyncio.Task] = set()   # remote downloads of finished jobs
+
+
+async def _localize_then_finalize(task_id: str, data: dict) -> None:
+    """Fetch a finished remote job's audio into the local cache, then
+    finalize it — unless it expired or was cancelled meanwhile."""
+    pending = _pending.get(task_id)
+    try:
+        await transfer.localize(data["results"])
+    finally:
+        if pending is not None:
+            pending.pop("localizing", None)
+    if _pending.get(task_id) is not pending:
+        return
+    if pending.get("cancelled"):
+        data = {**data, "results": []}   # cancelled mid-download; the cache copy is evicted in time
+    _finalize_job(task_id, data)
+
+
+def _learn_runtimes(done_ids: list[str], now: float, free_at: float = 0.0) -> None:
+    """Feed the predictor from jobs of one backend first seen done at `now`.
+
+    A job's true end lies between the last check that saw it running and
+    now, so the midpoint is used — otherwise a late first check would be
+    learned as a slow job and push the next check later still. Jobs that
+    finished together share the elapsed service time (since `free_at`, when
+    the backend last finished a job) in proportion to their predicted
+    runtimes."""
+    jobs = [_pending[t] for t in sorted(done_ids, key=_queue_order.position) if t in _pending]
+    if not jobs:
+        return
+    started = max(min(p.get("created_at", now) for p in jobs), free_at)
+    lower = max([started] + [p.get("last_running_at", started) for p in jobs])
+    elapsed = (lower + now) / 2 - started
+    predicted = sum(_predicted_runtime(p) for p in jobs)
+    for p in jobs:
+        _runtime.observe(_dispatch_features(p),
+                         elapsed * _predicted_runtime(p) / predicted)
+
+
+_watch_wake = asyncio.Event()   # set by /generate so a new job's check is scheduled
+
+
+def _next_watch_delay() -> float:
+    due = min((p.get("next_check", 0) for p in _pending.values()), default=None)
+    if due is None:
+        return WATCH_MAX_INTERVAL_S
+    return max(WATCH_MIN_INTERVAL_S, min(WATCH_MAX_INTERVAL_S, due - time.monotonic()))
 
 
 async def _pending_job_watcher() -> None:
     while True:
-        await asyncio.sleep(10)
+        try:
+            await asyncio.wait_for(_watch_wake.wait(), _next_watch_delay())
+        except asyncio.TimeoutError:
+            pass
+        _watch_wake.clear()
         try:
             await _watch_pending_jobs_once()
         except Exception as exc:
             logger.warning("pending-job watcher error: %s", exc)
 
 
-@app.get("/status/{task_id}")
-async def status(task_id: str):
-    try:
-        data = await query_result(task_id)
-    except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"AceStep error: {exc}")
+# ---------------------------------------------------------------------------
+# Cancellation
+# ---------------------------------------------------------------------------
+# A cancelled job leaves the job store and its owner's count of jobs in
+# progress at once. A held job simply leaves the queue. AceStep has no
+# cancel route (see ACESTEP_CANCEL_ROUTE), so a job it is already rendering
+# usually keeps running there: it stays in _pending marked "cancelled" —
+# still polled, still holding its dispatch slot and its place in everyone
+# else's ETA — and when it finishes its audio is deleted, not kept. A
+# member of a fused batch just leaves; the batch renders on for the others.
+
+# client task id → owner, for recently cancelled jobs, so /status and a
+# repeated DELETE answer "cancelled" rather than asking AceStep
+_cancelled: "OrderedDict[str, str]" = OrderedDict()
+_MAX_CANCELLED = 10_000
+# user → cancelled jobs of theirs AceStep is still rendering
+_discarding: dict[str, int] = {}
+
+
+def _jobs_in_progress(user: str) -> int:
+    """user's jobs against MAX_JOBS_PER_USER; cancelled ones don't count."""
+    return (_queue_order.count(user) + _waiting.count(user) + _fused_members.get(user, 0)
+            - _discarding.get(user, 0))
+
+
+def _hand_over_batch(task_id: str) -> bool:
+    """Make the next live member of task_id's fused batch its leader, in
+    task_id's place in the queue, so task_id can leave without stopping the
+    batch. False if no other member is left."""
+    pending = _pending[task_id]
+    fused = pending.get("fused") or ()
+    heir = next((t for t, _ in fused if t != task_id and t in _pending), None)
+    if heir is None:
+        return False
+    _detach_member(_pending[heir])   # counted through _queue_order from here on
+    _pending[heir].pop("predicted_s", None)
+    for key in ("fused", "fused_batch", "next_check", "last_running_at"):
+        if key in pending:
+            _pending[heir][key] = pending.pop(key)
+    _queue_order.replace(task_id, heir, _pending[heir]["user"])
+    for t, _ in fused:
+        if t != task_id and t in _pending:
+            if t != heir:
+                _pending[t]["fused_into"] = heir
+            _store_pending(t)
+    return True
+
+
+def _cancel_job(task_id: str, running: bool) -> None:
+    """Drop task_id from Wrangler's bookkeeping and tell its owner. With
+    running=True AceStep is still rendering it: keep polling it so its
+    result can be discarded (see _drop_discarded)."""
+    pending = _pending[task_id]
+    user = pending.get("user", "local")
+    jobstore.delete_job(task_id)
+    _cancelled[task_id] = user
+    while len(_cancelled) > _MAX_CANCELLED:
+        _cancelled.popitem(last=False)
+    if running:
+        pending["cancelled"] = True
+        pending.pop("request", None)   # never resubmitted if AceStep loses it
+        if task_id in _queue_order:
+            _discarding[user] = _discarding.get(user, 0) + 1
+    else:
+        _dequeue(task_id, publish=False)
+        _pop_pending(task_id)
+    waiter = _task_waiters.pop(task_id, None)
+    if waiter is not None and not waiter.done():
+        waiter.set_result({"status": "error", "reason": "cancelled"})
+    event = {"task_id": task_id, "status": "cancelled"}
+    _publish(user, "cancelled", event)
+    _notify_callback(pending, "job.cancelled", event)
+    _publish_positions()
+    logger.info("cancelled user=%s task_id=%s%s", user, task_id,
+                " (discarding AceStep's result)" if running else "")
+
+
+async def _discard_unwanted(task_id: str, pending: dict, upstream_id: str, params: dict) -> None:
+    """AceStep accepted task_id's submit after the job was cancelled or
+    expired. Cancel the task there, or else track it as a discarding job so
+    its backend load is settled and its audio reclaimed when it finishes."""
+    if await cancel_task(upstream_id):
+        return
+    user = pending.get("user", "local")
+    _pending[task_id] = {"params": params, "format": pending.get("format", "mp3"),
+                         "user": user, "created_at": time.monotonic(),
+                         "upstream_id": upstream_id, "cancelled": True, "next_check": 0.0}
+    _discarding[user] = _discarding.get(user, 0) + 1
+    _queue_order.append(task_id, user)
+    logger.info("discarding upstream=%s of task_id=%s, dropped during its submit",
+                upstream_id, task_id)
+    _watch_wake.set()
+
+
+def _drop_discarded(task_id: str, data: dict, publish_positions: bool = True) -> None:
+    """A cancelled job AceStep kept rendering has finished: free its slot
+    and delete its audio."""
+    pending = _pop_pending(task_id)
+    user = pending.get("user", "local")
+    if task_id in _queue_order:
+        left = _discarding.get(user, 0) - 1
+        if left > 0:
+            _discarding[user] = left
+        else:
+            _discarding.pop(user, None)
+    _dequeue(task_id, publish_positions)
+    for result in data.get("results") or ():
+        _reclaim_tmp_audio(result.get("audio_url", ""))
+    logger.info("discarded result of cancelled task_id=%s", task_id)
 
-    _finalize_job(task_id, data)
 
-    # Serve the stored results for finalized jobs — they carry the take ref
-    # and takes-dir audio path added at persist time. Without this, a poll
-    # arriving after the background watcher finalized the job would return
-    # AceStep's raw results, silently missing the take enrichment.
+@app.delete("/jobs/{task_id}")
+async def cancel_job(task_id: str, request: Request):
+    """Cancel a job that hasn't finished.
+
+    A held job is dropped from the queue. A dispatched one is cancelled on
+    AceStep where the backend supports it; otherwise AceStep finishes it
+    and the result is thrown away ("running_upstream": true). Finished jobs
+    answer 409 — delete their takes instead."""
+    user = request.state.user
+    owner = _cancelled.get(task_id)
+    if owner is not None and (user == "local" or owner == user):
+        return {"task_id": task_id, "status": "cancelled",
+                "running_upstream": task_id in _pending}
+    pending = _pending.get(task_id)
+    if pending is None or (user != "local" and pending.get("user") != user):
+        job = _jobs.get(task_id)
+        if job is not None and (user == "local" or job.get("user") == user):
+            raise HTTPException(status_code=409, detail="Job already finished")
+        raise HTTPException(status_code=404, detail="Job not found")
+    upstream_id = _upstream_id(task_id)
+    running = False
+    # A fused batch renders on for its other members; only a job that has
+    # AceStep's task to itself is worth stopping there.
+    if upstream_id is not None and not pending.get("fused_into") \
+            and not _hand_over_batch(task_id):
+        running = not await cancel_task(upstream_id)
+        if task_id in _cancelled:   # a concurrent DELETE got there first
+            return {"task_id": task_id, "status": "cancelled",
+                    "running_upstream": task_id in _pending}
+        if _pending.get(task_id) is not pending:
+            raise HTTPException(status_code=409, detail="Job already finished")
+    _cancel_job(task_id, running)
+    return {"task_id": task_id, "status": "cancelled", "running_upstream": running}
+
+
+@app.get("/status/{task_id}")
+async def status(task_id: str):
+    # Tracked jobs are answered from local state — the watcher owns upstream
+    # polling. Finalized jobs serve the stored results, which carry the take
+    # ref and takes-dir audio path added at persist time.
     job = _jobs.get(task_id)
-    if job is not None:
-        data["results"] = job["results"]
+    if job is not None and job.get("status") == "error":
+        data = {"status": "error", "reason": job["reason"], "results": None}
+    elif job is not None:
+        data = {"status": "done", "results": job["results"]}
+        if job.get("kind"):
+            data.update(kind=job["kind"], result=job["result"])
+    elif task_id in _cancelled or _pending.get(task_id, {}).get("cancelled"):
+        return {"status": "cancelled", "results": None, "queue_position": -1,
+                "queue_depth": _queue_depth(), **_eta_fields(None)}
+    elif task_id in _pending:
+        data = {"status": _job_state(task_id), "results": None}
+        if data["status"] == "waiting":
+            data["reason"] = "waiting for engine"
+        elif data["status"] == "queued":
+            data["reason"] = "waiting for a dispatch slot"
+        if task_id in _waiting:
+            data["lane"] = _waiting.lane(task_id)
+    else:
+        # Untracked (e.g. submitted before a restart) — ask AceStep directly.
+        try:
+            data = await query_result(task_id)
+        except Exception as exc:
+            raise _upstream_error(exc)
+        if data["status"] == "done":
+            if transfer.REMOTE:
+                await transfer.localize(data["results"])
+            _finalize_job(task_id, data)
+            data["results"] = _jobs[task_id]["results"]
 
     # Add queue position info
-    pos = next((i for i, (t, _) in enumerate(_queue_order) if t == task_id), -1)
-    data["queue_position"] = pos
-    data["queue_depth"] = len(_queue_order)
+    data["queue_position"] = _queue_position(task_id)
+    data["queue_depth"] = _queue_depth()
+    if data["status"] == "done":
+        data.update(_eta_fields((0.0, 0.0)))
+    else:
+        data.update(_eta_fields(_job_estimate(task_id)))
 
     return data
 
 
-@app.get("/audio")
-async def audio_proxy(path: str):
-    """Serve audio for <audio> elements. Uses FileResponse for local files (Range support)."""
-    if not _is_safe_audio_path(path):
-        raise HTTPException(status_code=403, detail="Access denied")
-    resolved = _resolve_audio_path(path)
-    fp = Path(resolved)
+def _sse(item: tuple) -> str:
+    event_id, event, data = item
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.get("/events")
+async def job_events(request: Request):
+    """Server-Sent Events stream of the caller's job lifecycle.
+
+    Events: queued, queue_position, done (results carry take refs), failed,
+    cancelled, alignment_done. Reconnects with Last-Event-ID replay what was missed
+    from a bounded per-user backlog."""
+    user = request.state.user
+    try:
+        last_id = int(request.headers.get("last-event-id", ""))
+    except ValueError:
+        last_id = None
+
+    async def stream():
+        queue: asyncio.Queue = asyncio.Queue(maxsize=_SUBSCRIBER_QUEUE)
+        _subscribers.setdefault(user, set()).add(queue)
+        try:
+            yield "retry: 3000\n\n"
+            if last_id is not None:
+                for item in list(_event_log.get(user, ())):
+                    if item[0] > last_id:
+                        yield _sse(item)
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), _EVENT_KEEPALIVE_S)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    yield ": keepalive\n\n"
+                    continue
+                if item is None:
+                    return
+                yield _sse(item)
+        finally:
+            subs = _subscribers.get(user)
+            if subs is not None:
+                subs.discard(queue)
+                if not subs:
+                    del _subscribers[user]
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _serve_audio(path: str, request: Request, filename: str | None = None) -> Response:
+    """Stream audio without buffering it in memory.
+
+    Local files go out via FileResponse (sendfile, Range support). Anything
+    else is relayed from AceStep chunk by chunk, with the browser's Range
+    header forwarded and the 206/Content-Range reply passed back unchanged.
+    `filename` adds an attachment Content-Disposition. With a remote AceStep
+    its files are pulled into the local cache first and served from there.
+    """
+    if transfer.REMOTE and transfer.is_remote(path):
+        try:
+            fp = await transfer.fetch(path)
+        except Exception as exc:
+            logger.warning("remote audio cache fill failed, proxying: %s", exc)
+            fp = None
+        if fp is not None:
+            ct = mimetypes.guess_type(str(fp))[0] or "audio/mpeg"
+            return FileResponse(str(fp), media_type=ct, filename=filename)
+        path = transfer.to_audio_url(transfer.remote_path(path))
+    fp = Path(_resolve_audio_path(path))
     if fp.is_file():
         ct = mimetypes.guess_type(str(fp))[0] or "audio/mpeg"
-        return FileResponse(str(fp), media_type=ct)
-    # Fallback: proxy from AceStep server
+        return FileResponse(str(fp), media_type=ct, filename=filename)
+    if "?" not in path:
+        raise HTTPException(status_code=502, detail=f"Audio fetch error: Audio file not found: {path}")
     try:
-        data, content_type = await get_audio_bytes(path)
-    except Exception as exc:
+        upstream = await open_audio_stream(path, request.headers.get("range"))
+    except httpx.HTTPStatusError as exc:
+        if exc.response.status_code == 416:
+            raise HTTPException(status_code=416, detail="Requested range not satisfiable")
         raise HTTPException(status_code=502, detail=f"Audio fetch error: {exc}")
-    return Response(content=data, media_type=content_type)
+    except Exception as exc:
+        raise _upstream_error(exc, "Audio fetch error")
+    headers = {k: upstream.headers[k] for k in AUDIO_PASSTHROUGH_HEADERS if k in upstream.headers}
+    headers.setdefault("content-type", "audio/mpeg")
+    if filename:
+        headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return StreamingResponse(
+        upstream.aiter_raw(),
+        status_code=upstream.status_code,
+        headers=headers,
+        background=BackgroundTask(upstream.aclose),
+    )
+
+
+@app.get("/audio")
+async def audio_proxy(path: str, request: Request):
+    """Serve audio for <audio> elements. Streams with Range support, no download header."""
+    if not _is_safe_audio_path(path) and not (transfer.REMOTE and transfer.is_remote(path)):
+        raise HTTPException(status_code=403, detail="Access denied")
+    return await _serve_audio(path, request)
 
 
 @app.post("/estimate-duration")
@@ -931,18 +2413,9 @@ async def download_audio(job_id: str, index: int, request: Request):
         raise HTTPException(status_code=404, detail="Result not found")
 
     audio_url = job["results"][index]["audio_url"]
-    try:
-        data, content_type = await get_audio_bytes(audio_url)
-    except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"Audio fetch error: {exc}")
-
     fmt      = job["format"]
     filename = f"acestep-{job_id[:8]}-{index + 1}.{fmt}"
-    return Response(
-        content=data,
-        media_type=content_type,
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
-    )
+    return await _serve_audio(audio_url, request, filename=filename)
 
 
 @app.get("/download/{job_id}/{index}/json")
@@ -993,19 +2466,24 @@ async def _drain_alignment_queue_once() -> None:
     job_id, index = await _align_queue.get()
     key = (job_id, index)
     _align_status[key] = "running"
+    take = None
     try:
         take = takes.read_take(job_id, index)
         audio = takes.audio_path_for(job_id, index)
         if take is None or audio is None:
-            _align_status[key] = "failed"
-            return
+            raise FileNotFoundError("take or audio missing")
         data = await asyncio.to_thread(alignment.run_alignment, str(audio), take["lyrics"])
         takes.update_take(job_id, index, {"alignment": data})
         _align_status[key] = "done"
+        _publish(take.get("user", "local"), "alignment_done",
+                 {"job_id": job_id, "index": index, "status": "done"})
         logger.info("alignment done job=%s idx=%d lines=%d", job_id, index,
                     len(data["lines"]))
     except Exception as exc:
         _align_status[key] = "failed"
+        if take is not None:
+            _publish(take.get("user", "local"), "alignment_done",
+                     {"job_id": job_id, "index": index, "status": "failed"})
         logger.warning("alignment failed job=%s idx=%d: %s", job_id, index, exc)
 
 
@@ -1068,6 +2546,9 @@ async def upload_audio(file: UploadFile, request: Request):
         "user": user,
         "created_at": time.monotonic(),
     }
+    _expire_after("upload", upload_id, _uploads[upload_id]["created_at"])
+    jobstore.put_upload(upload_id, user, time.time(),
+                        {"path": str(dest), "filename": file.filename or "audio"})
     logger.info("upload user=%s file=%s", user, file.filename)
     return {"upload_id": upload_id, "path": str(dest), "filename": file.filename}
 
@@ -1109,7 +2590,7 @@ async def lora_load_route(req: LoRALoadRequest, request: Request):
         raise HTTPException(status_code=exc.response.status_code, detail=detail)
     except Exception as exc:
         _release_lock("lora", user)
-        raise HTTPException(status_code=502, detail=f"AceStep error: {exc}")
+        raise _upstream_error(exc)
 
 
 @app.post("/lora/unload")
@@ -1121,7 +2602,7 @@ async def lora_unload_route(request: Request):
         result = await lora_unload()
         return result
     except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"AceStep error: {exc}")
+        raise _upstream_error(exc)
 
 
 @app.post("/lora/toggle")
@@ -1134,7 +2615,7 @@ async def lora_toggle_route(req: LoRAToggleRequest, request: Request):
         result = await lora_toggle(req.use_lora)
         return result
     except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"AceStep error: {exc}")
+        raise _upstream_error(exc)
 
 
 @app.post("/lora/scale")
@@ -1147,7 +2628,7 @@ async def lora_scale_route(req: LoRAScaleRequest, request: Request):
         result = await lora_scale(req.scale, req.adapter_name)
         return result
     except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"AceStep error: {exc}")
+        raise _upstream_error(exc)
 
 
 @app.get("/lora/status")
@@ -1159,7 +2640,7 @@ async def lora_status_route():
             result["locked_by"] = lock["user"] if lock else None
         return result
     except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"AceStep error: {exc}")
+        raise _upstream_error(exc)
 
 
 @app.get("/lora/browse")
@@ -1301,7 +2782,7 @@ async def train_scan(req: TrainScanRequest = TrainScanRequest()):
         scan_result = await dataset_scan(payload)
         return {"scan": scan_result}
     except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"AceStep error: {exc}")
+        raise _upstream_error(exc)
 
 
 class TrainLabelRequest(BaseModel):
@@ -1318,7 +2799,7 @@ async def train_label(req: TrainLabelRequest = TrainLabelRequest()):
         result = await dataset_auto_label_async(payload)
         return result
     except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"AceStep error: {exc}")
+        raise _upstream_error(exc)
 
 
 @app.get("/train/label/status")
@@ -1328,7 +2809,7 @@ async def train_label_status():
         result = await dataset_auto_label_status()
         return result
     except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"AceStep error: {exc}")
+        raise _upstream_error(exc)
 
 
 class SampleUpdateRequest(BaseModel):
@@ -1360,7 +2841,7 @@ async def train_sample_update(sample_idx: int, req: SampleUpdateRequest):
         })
         return result
     except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"AceStep error: {exc}")
+        raise _upstream_error(exc)
 
 
 _TRAIN_DATASET_FILE = _TRAIN_DIR / "dataset.json"
@@ -1374,7 +2855,7 @@ async def train_save():
         result = await dataset_save(str(_TRAIN_DATASET_FILE))
         return result
     except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"AceStep error: {exc}")
+        raise _upstream_error(exc)
 
 
 @app.post("/train/load")
@@ -1386,7 +2867,7 @@ async def train_load():
         result = await dataset_load(str(_TRAIN_DATASET_FILE))
         return result
     except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"AceStep error: {exc}")
+        raise _upstream_error(exc)
 
 
 # ---------------------------------------------------------------------------
@@ -1509,7 +2990,7 @@ async def train_preprocess():
         result = await dataset_preprocess_async(str(_TRAIN_TENSOR_DIR))
         return result
     except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"AceStep error: {exc}")
+        raise _upstream_error(exc)
 
 
 @app.get("/train/preprocess/status")
@@ -1519,7 +3000,7 @@ async def train_preprocess_status(task_id: Optional[str] = None):
         result = await dataset_preprocess_status(task_id)
         return result
     except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"AceStep error: {exc}")
+        raise _upstream_error(exc)
 
 
 @app.get("/train/samples")
@@ -1529,7 +3010,7 @@ async def train_samples():
         result = await dataset_samples()
         return result
     except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"AceStep error: {exc}")
+        raise _upstream_error(exc)
 
 
 @app.post("/train/start")
@@ -1582,7 +3063,7 @@ async def train_start(req: TrainStartRequest, request: Request):
         detail = exc.response.text if exc.response else str(exc)
         raise HTTPException(status_code=exc.response.status_code, detail=detail)
     except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"AceStep error: {exc}")
+        raise _upstream_error(exc)
 
 
 @app.get("/train/status")
@@ -1595,7 +3076,7 @@ async def train_status():
             result["locked_by"] = lock["user"] if lock else None
         return result
     except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"AceStep error: {exc}")
+        raise _upstream_error(exc)
 
 
 @app.post("/train/stop")
@@ -1608,7 +3089,7 @@ async def train_stop(request: Request):
         result = await training_stop()
         return result
     except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"AceStep error: {exc}")
+        raise _upstream_error(exc)
 
 
 @app.post("/train/export")
@@ -1624,7 +3105,7 @@ async def train_export(req: TrainExportRequest, request: Request):
         result = await training_export(export_path, output_dir)
         return result
     except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"AceStep error: {exc}")
+        raise _upstream_error(exc)
 
 
 @app.post("/train/reinitialize")
@@ -1637,7 +3118,7 @@ async def train_reinitialize(request: Request):
         result = await reinitialize_service()
         return result
     except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"AceStep error: {exc}")
+        raise _upstream_error(exc)
 
 
 # ---------------------------------------------------------------------------
@@ -1647,16 +3128,14 @@ async def train_reinitialize(request: Request):
 @app.get("/api/session")
 async def api_session(request: Request):
     user = request.state.user
-    now = time.monotonic()
-    timeout = SESSION_TIMEOUT_MIN * 60
-    active = sum(1 for s in _sessions.values() if now - s["last_seen"] < timeout)
     return {
         "user": user,
-        "active_users": active,
+        "active_users": _active_sessions(time.monotonic()),
         "max_users": MAX_USERS,
-        "pending_jobs": sum(1 for p in _pending.values() if p.get("user") == user),
+        "pending_jobs": _jobs_in_progress(user),
+        "weight": _waiting.weight(user),
         "max_jobs_per_user": MAX_JOBS_PER_USER,
-        "queue_depth": len(_queue_order),
+        "queue_depth": _queue_depth(),
     }
 
 
@@ -1690,7 +3169,8 @@ def _sweep_tmp_audio(directory: Path, ttl_seconds: float) -> int:
 
 async def _tmp_audio_sweeper():
     while True:
-        if TMP_AUDIO_TTL_DAYS > 0:
+        # A remote AceStep manages its own cache; ours is bounded by transfer.py
+        if TMP_AUDIO_TTL_DAYS > 0 and not transfer.REMOTE:
             n = _sweep_tmp_audio(_TMP_AUDIO_DIR, TMP_AUDIO_TTL_DAYS * 86400)
             if n:
                 logger.info("tmp-audio sweep: deleted %d file(s) older than %g days",
@@ -1698,63 +3178,92 @@ async def _tmp_audio_sweeper():
         await asyncio.sleep(3600)
 
 
-async def _cleanup_loop():
-    """Periodically expire stale jobs, uploads, sessions, and locks."""
+async def _engine_monitor():
+    """Probe AceStep's /health: eject backends that stop answering, readmit
+    them on recovery, and open the readiness gate once any is serving."""
     while True:
-        await asyncio.sleep(60)
-        now = time.monotonic()
-        evicted = {"jobs": 0, "pending": 0, "uploads": 0, "sessions": 0, "locks": 0}
-
-        job_ttl = JOB_TTL_MIN * 60
-        upload_ttl = UPLOAD_TTL_MIN * 60
-        session_ttl = SESSION_TIMEOUT_MIN * 60
-
-        # Expire completed jobs
-        expired_jobs = [k for k, v in _jobs.items() if now - v.get("created_at", now) > job_ttl]
-        for k in expired_jobs:
-            del _jobs[k]
-            evicted["jobs"] += 1
-
-        # Expire stuck pending tasks
-        expired_pending = [k for k, v in _pending.items() if now - v.get("created_at", now) > job_ttl]
-        for k in expired_pending:
-            del _pending[k]
-            _queue_order[:] = [(t, u) for t, u in _queue_order if t != k]
-            evicted["pending"] += 1
-
-        # Expire uploads (delete files too)
-        expired_uploads = [k for k, v in _uploads.items() if now - v.get("created_at", now) > upload_ttl]
-        for k in expired_uploads:
-            info = _uploads.pop(k)
+        try:
+            restarted = await check_backends()
+            _set_engine_ready(backend_count() > 0)
+            if restarted:
+                _recover_restarted(restarted)
+        except Exception:
+            logger.exception("backend health check failed")
+        interval = BACKEND_HEALTH_INTERVAL_S if _engine_ready else ENGINE_POLL_INTERVAL_S
+        try:
+            await asyncio.wait_for(_engine_wake.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+        _engine_wake.clear()
+
+
+def _expire_due(now: float) -> dict:
+    """Expire the jobs, uploads, sessions, locks and idempotency keys whose deadline has
+    passed; returns counts per kind. Only due entries are visited."""
+    evicted = {"jobs": 0, "pending": 0, "uploads": 0, "sessions": _expire_sessions(now),
+               "locks": 0, "idempotency_keys": 0}
+    expired_pending = False
+    for kind, key in _expiry.pop_due(now):
+        record, clock = _expiring_record(kind, key)
+        if record is None:
+            continue   # already gone (finalized, deleted, or re-created and rescheduled)
+        deadline = record.get(clock, now) + _ttl(kind)
+        if deadline > now:   # refreshed or restarted since it was scheduled
+            _expiry.schedule((kind, key), deadline)
+            continue
+        if kind == "job":
+            del _jobs[key]
+            jobstore.delete_job(key)
+        elif kind == "pending":
+            # A fused member's AceStep task is its leader's, still running
+            if _upstream_id(key) is not None and not record.get("fused_into"):
+                settle_task(_upstream_id(key))
+            _finalize_job(key, {"status": "error", "reason": "expired"}, publish_positions=False)
+            expired_pending = True
+        elif kind == "upload":
+            info = _uploads.pop(key)
+            jobstore.delete_upload(key)
             try:
                 Path(info["path"]).unlink(missing_ok=True)
             except OSError:
                 pass
-            evicted["uploads"] += 1
-
-        # Expire inactive sessions
-        expired_sessions = [u for u, s in _sessions.items() if now - s["last_seen"] > session_ttl]
-        for u in expired_sessions:
-            del _sessions[u]
-            evicted["sessions"] += 1
-
-        # Release stale resource locks
-        expired_locks = [r for r, l in _resource_locks.items() if now - l["acquired_at"] > _LOCK_TIMEOUT]
-        for r in expired_locks:
-            del _resource_locks[r]
-            evicted["locks"] += 1
-
-        total = sum(evicted.values())
-        if total:
+        elif kind == "idempotency":
+            del _idempotency[key]
+        else:
+            del _resource_locks[key]
+        evicted[_EXPIRY_COUNTER[kind]] += 1
+    if expired_pending:
+        _publish_positions()
+    return evicted
+
+
+async def _cleanup_loop():
+    """Periodically expire stale jobs, uploads, sessions, and locks."""
+    while True:
+        await asyncio.sleep(60)
+        evicted = _expire_due(time.monotonic())
+        if any(evicted.values()):
             logger.info("cleanup evicted=%s", evicted)
 
 
 @app.on_event("startup")
 async def start_cleanup():
+    await open_client()
+    await _restore_jobs()
+    jobstore.start()
     asyncio.create_task(_cleanup_loop())
     asyncio.create_task(_alignment_worker())
     asyncio.create_task(_pending_job_watcher())
     asyncio.create_task(_tmp_audio_sweeper())
+    asyncio.create_task(_engine_monitor())
+    webhooks.start()
+
+
+@app.on_event("shutdown")
+async def stop_upstream_client():
+    await webhooks.stop()
+    await jobstore.stop()
+    await close_client()
 
 
 # ---------------------------------------------------------------------------
@@ -0,0 +1,96 @@
+"""Result cache for deterministic generations.
+
+A request with a fixed seed, the same payload, the same source audio and
+the same LoRA state renders the same audio again. /generate looks such
+requests up here first; a hit is answered from the earlier job's takes
+without calling AceStep.
+
+The key is a SHA-256 over the canonical JSON of the payload
+_build_payload() sends to AceStep. Audio paths in it are replaced by a
+hash of the file's content, since uploads of the same file land at
+different paths. The LoRA status AceStep reports is hashed in too.
+
+Entries are scoped to the user who generated them — another user's
+identical request is a miss — and the cache keeps at most
+RESULT_CACHE_ENTRIES of them, evicting the least recently used.
+"""
+
+import copy
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+MAX_ENTRIES = int(os.environ.get("RESULT_CACHE_ENTRIES", "1000"))   # 0 disables
+
+AUDIO_FIELDS = ("src_audio_path", "reference_audio_path")
+
+# (path, size, mtime_ns) → content digest; an edited file gets a new entry
+_digests: "OrderedDict[tuple, str]" = OrderedDict()
+_MAX_DIGESTS = 256
+
+
+def file_digest(path: str) -> str:
+    """SHA-256 of a file's content. Blocking; run it off the event loop."""
+    st = Path(path).stat()
+    memo_key = (path, st.st_size, st.st_mtime_ns)
+    digest = _digests.get(memo_key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        digest = _digests[memo_key] = h.hexdigest()
+        if len(_digests) > _MAX_DIGESTS:
+            _digests.popitem(last=False)
+    return digest
+
+
+def request_key(payload: dict, audio_digests: dict, lora: Optional[dict]) -> str:
+    """Canonical hash of what AceStep is asked to render."""
+    canonical = {k: v for k, v in payload.items() if k not in AUDIO_FIELDS}
+    canonical["audio"] = {k: audio_digests[k] for k in sorted(audio_digests)}
+    canonical["lora"] = lora
+    blob = json.dumps(canonical, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+class ResultCache:
+    """(user, key) → the finished job's id and results, LRU-bounded."""
+
+    __slots__ = ("max_entries", "_entries", "hits", "misses")
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple[str, str], dict]" = OrderedDict()
+        self.hits = self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, user: str, key: str) -> Optional[dict]:
+        """A copy of the cached entry ({"task_id", "results"}), or None."""
+        entry = self._entries.get((user, key))
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end((user, key))
+        self.hits += 1
+        return copy.deepcopy(entry)
+
+    def put(self, user: str, key: str, task_id: str, results: list) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[(user, key)] = {"task_id": task_id, "results": copy.deepcopy(results)}
+        self._entries.move_to_end((user, key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def discard(self, user: str, key: str) -> None:
+        self._entries.pop((user, key), None)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "max_entries": self.max_entries,
+                "hits": self.hits, "misses": self.misses}
@@ -6,13 +6,14 @@ rework lineage, and (once computed) the lyric alignment block.
 """
 
 import json
+import os
 import shutil
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Optional
 from urllib.parse import parse_qs, urlparse
 
-TAKES_DIR = Path(__file__).parent.parent / "takes"
+TAKES_DIR = Path(os.environ.get("TAKES_DIR", str(Path(__file__).parent.parent / "takes")))
 
 TAKE_VERSION = 2
 
@@ -0,0 +1,264 @@
+"""Audio transfer for a remote AceStep host (no shared filesystem).
+
+By default Wrangler reads AceStep's output paths straight off disk and
+hands it local paths for source audio. With ACESTEP_REMOTE=1 (and usually
+ACESTEP_URL=http://gpu-box:8001) the two run on different machines:
+
+- Generated audio is streamed from AceStep's /v1/audio into a local,
+  size-bounded LRU disk cache. Takes are written from the cached copy, and
+  /audio serves from it.
+- Source and reference audio is uploaded to the AceStep host once per
+  content hash (acestep_wrapper.upload_audio). Later submits of the same
+  bytes reuse the server-side path. With several backends each host gets
+  its own copy, uploaded to whichever one the job is dispatched to.
+- Only paths AceStep itself returned or accepted are proxied by /audio;
+  those are tracked in a bounded set.
+
+Concurrent requests for the same download or upload share one transfer.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+from urllib.parse import parse_qs, quote, urlparse
+
+from acestep_wrapper import backend_for_path, open_audio_stream, upload_audio
+
+logger = logging.getLogger("wrangler")
+
+REMOTE = os.environ.get("ACESTEP_REMOTE", "").lower() in ("1", "true", "yes")
+CACHE_DIR = Path(os.environ.get(
+    "ACESTEP_AUDIO_CACHE_DIR", str(Path(tempfile.gettempdir()) / "wrangler-audio-cache")))
+CACHE_MAX_BYTES = int(float(os.environ.get("ACESTEP_AUDIO_CACHE_MB", "2048")) * 1024 * 1024)
+_MAX_TRACKED = 10_000   # remote paths / upload hashes remembered
+_WRITE_CHUNK = 1 << 20
+
+_lru: "OrderedDict[str, int]" = OrderedDict()     # cache file name → size, oldest first
+_lru_bytes = 0
+_index_loaded = False
+_inflight: dict[str, asyncio.Future] = {}
+_remote_paths: "OrderedDict[str, None]" = OrderedDict()
+_uploads: "OrderedDict[str, str]" = OrderedDict()   # "backend:sha256" → server-side path
+_hash_memo: dict[tuple, str] = {}                   # (path, size, mtime_ns) → sha256
+_stats = {"hits": 0, "misses": 0, "evictions": 0, "bytes_fetched": 0,
+          "uploads": 0, "upload_hits": 0}
+
+
+def remote_path(audio_url: str) -> str:
+    """Server-side filesystem path from a /v1/audio?path=... URL or raw path."""
+    if "?" in audio_url:
+        vals = parse_qs(urlparse(audio_url).query).get("path")
+        if vals:
+            return vals[0]
+    return audio_url
+
+
+def to_audio_url(path: str) -> str:
+    return path if path.startswith("/v1/audio?") else f"/v1/audio?path={quote(path)}"
+
+
+def remember(audio_url: str) -> None:
+    """Mark a path as living on the AceStep host."""
+    path = remote_path(audio_url)
+    _remote_paths[path] = None
+    _remote_paths.move_to_end(path)
+    while len(_remote_paths) > _MAX_TRACKED:
+        _remote_paths.popitem(last=False)
+
+
+def is_remote(audio_url: str) -> bool:
+    return remote_path(audio_url) in _remote_paths
+
+
+# ---------------------------------------------------------------------------
+# LRU disk cache
+# ---------------------------------------------------------------------------
+
+def _cache_name(path: str) -> str:
+    return hashlib.sha256(path.encode()).hexdigest()[:32] + Path(path).suffix
+
+
+def _load_index() -> None:
+    """Adopt files left by a previous run, oldest first by mtime."""
+    global _index_loaded, _lru_bytes
+    _index_loaded = True
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    files = []
+    for f in CACHE_DIR.iterdir():
+        if f.name.endswith(".part"):
+            f.unlink(missing_ok=True)
+        elif f.is_file():
+            st = f.stat()
+            files.append((st.st_mtime, f.name, st.st_size))
+    for _, name, size in sorted(files):
+        _lru[name] = size
+        _lru_bytes += size
+    _evict()
+
+
+def _evict(keep: str | None = None) -> None:
+    global _lru_bytes
+    while _lru_bytes > CACHE_MAX_BYTES and len(_lru) > (1 if keep else 0):
+        name, size = next(iter(_lru.items()))
+        if name == keep:
+            _lru.move_to_end(name)
+            continue
+        del _lru[name]
+        _lru_bytes -= size
+        (CACHE_DIR / name).unlink(missing_ok=True)
+        _stats["evictions"] += 1
+
+
+def cached(audio_url: str) -> Optional[Path]:
+    """Local copy of remote audio if it is in the cache (marks it recently used)."""
+    global _lru_bytes
+    if not _index_loaded:
+        _load_index()
+    name = _cache_name(remote_path(audio_url))
+    if name not in _lru:
+        return None
+    local = CACHE_DIR / name
+    if not local.exists():
+        _lru_bytes -= _lru.pop(name)
+        return None
+    _lru.move_to_end(name)
+    os.utime(local)
+    return local
+
+
+async def _single_flight(key: str, factory):
+    fut = _inflight.get(key)
+    if fut is None:
+        fut = asyncio.ensure_future(factory())
+        _inflight[key] = fut
+        fut.add_done_callback(lambda _: _inflight.pop(key, None))
+    return await asyncio.shield(fut)
+
+
+async def fetch(audio_url: str) -> Path:
+    """Local path for remote audio, streaming it into the cache on a miss."""
+    hit = cached(audio_url)
+    if hit is not None:
+        _stats["hits"] += 1
+        return hit
+    _stats["misses"] += 1
+    path = remote_path(audio_url)
+    remember(path)
+    return await _single_flight("get:" + path, lambda: _download(path))
+
+
+async def _download(path: str) -> Path:
+    global _lru_bytes
+    name = _cache_name(path)
+    part = CACHE_DIR / f"{name}.{uuid.uuid4().hex[:8]}.part"
+    size = 0
+    upstream = await open_audio_stream(to_audio_url(path))
+    try:
+        with open(part, "wb") as f:
+            # Disk writes go to a thread in _WRITE_CHUNK pieces, so a slow
+            # disk doesn't stall the event loop
+            buf = bytearray()
+            async for chunk in upstream.aiter_bytes():
+                buf += chunk
+                if len(buf) >= _WRITE_CHUNK:
+                    await asyncio.to_thread(f.write, bytes(buf))
+                    size += len(buf)
+                    buf.clear()
+            if buf:
+                await asyncio.to_thread(f.write, bytes(buf))
+                size += len(buf)
+    except BaseException:
+        part.unlink(missing_ok=True)
+        raise
+    finally:
+        await upstream.aclose()
+    os.replace(part, CACHE_DIR / name)
+    _stats["bytes_fetched"] += size
+    _lru[name] = size
+    _lru_bytes += size
+    _evict(keep=name)
+    return CACHE_DIR / name
+
+
+async def localize(results: list) -> None:
+    """Pull every result's audio into the cache before it is persisted.
+
+    audio_url is left pointing at the AceStep path; persistence and /audio
+    look the local copy up with cached(). Failures are logged and skipped —
+    /audio can still proxy the file on demand."""
+    for result in results or []:
+        url = result.get("audio_url")
+        if not url:
+            continue
+        remember(url)
+        try:
+            await fetch(url)
+        except Exception as exc:
+            logger.warning("remote audio fetch failed path=%s: %s", remote_path(url), exc)
+
+
+# ---------------------------------------------------------------------------
+# Source / reference audio uploads
+# ---------------------------------------------------------------------------
+
+def _file_hash(path: Path) -> str:
+    st = path.stat()
+    memo_key = (str(path), st.st_size, st.st_mtime_ns)
+    digest = _hash_memo.get(memo_key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        digest = h.hexdigest()
+        if len(_hash_memo) >= _MAX_TRACKED:
+            _hash_memo.clear()
+        _hash_memo[memo_key] = digest
+    return digest
+
+
+async def stage_source(path: str, backend: int = 0) -> str:
+    """Server-side path on `backend` for source/reference audio named by a
+    Wrangler path.
+
+    Paths that already live on that AceStep host (earlier outputs) pass
+    through; outputs of another backend are relayed through the cache, and
+    local files are uploaded once per content hash and backend."""
+    path = remote_path(path)
+    if path in _remote_paths:
+        if backend_for_path(path) == backend:
+            return path
+        local = await fetch(path)
+    else:
+        local = Path(path)
+        if not local.is_file():
+            raise FileNotFoundError(f"Audio not found: {path}")
+    digest = await asyncio.to_thread(_file_hash, local)
+    key = f"{backend}:{digest}"
+    known = _uploads.get(key)
+    if known is not None:
+        _uploads.move_to_end(key)
+        _stats["upload_hits"] += 1
+        return known
+
+    async def upload() -> str:
+        server_path = await upload_audio(str(local), backend=backend)
+        _stats["uploads"] += 1
+        _uploads[key] = server_path
+        while len(_uploads) > _MAX_TRACKED:
+            _uploads.popitem(last=False)
+        remember(server_path)
+        return server_path
+
+    return await _single_flight("put:" + key, upload)
+
+
+def stats() -> dict:
+    return {**_stats, "cache_bytes": _lru_bytes, "cache_files": len(_lru),
+            "cache_max_bytes": CACHE_MAX_BYTES}
@@ -0,0 +1,203 @@
+"""Webhook delivery for headless API clients.
+
+POST /generate may carry a callback_url (and optionally a callback_secret).
+When the job finalizes, main._finalize_job calls enqueue() and a small pool
+of background workers POSTs the JSON body to that URL. The event loop never
+waits on a receiver: enqueue() is non-blocking and retries are re-queued on
+a timer rather than slept on inside a worker.
+
+Each delivery carries:
+
+    X-Wrangler-Event      job.done | job.failed | job.cancelled
+    X-Wrangler-Delivery   unique id, stable across retries of one delivery
+    X-Wrangler-Timestamp  unix seconds at send time
+    X-Wrangler-Signature  sha256=<hex HMAC of "<timestamp>.<body>">  (secret only)
+
+Connection errors, timeouts, 408, 429 and 5xx are retried with exponential
+backoff up to WEBHOOK_MAX_ATTEMPTS; any other status is final.
+
+Callbacks only go to public addresses: a URL whose host resolves to a
+loopback, private or link-local address (Wrangler's own host, AceStep, the
+LAN) is refused at submit time and again before each send, unless the host
+is listed in WEBHOOK_ALLOWED_HOSTS.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import ipaddress
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger("wrangler")
+
+WEBHOOK_MAX_ATTEMPTS = int(os.environ.get("WEBHOOK_MAX_ATTEMPTS", "5"))
+WEBHOOK_TIMEOUT_S = float(os.environ.get("WEBHOOK_TIMEOUT_SECONDS", "10"))
+WEBHOOK_QUEUE_SIZE = int(os.environ.get("WEBHOOK_QUEUE_SIZE", "1000"))
+WEBHOOK_WORKERS = int(os.environ.get("WEBHOOK_WORKERS", "4"))
+# Comma-separated hosts callbacks may target even if they aren't public
+# (e.g. "127.0.0.1,hooks.lan"); matched against the URL's host as written.
+WEBHOOK_ALLOWED_HOSTS = {h.strip().lower() for h in
+                         os.environ.get("WEBHOOK_ALLOWED_HOSTS", "").split(",") if h.strip()}
+_BACKOFF_BASE_S = 1.0
+_BACKOFF_CAP_S = 60.0
+
+_RETRYABLE_STATUS = {408, 429}
+
+_queue: Optional[asyncio.Queue] = None
+_workers: list[asyncio.Task] = []
+_client: Optional[httpx.AsyncClient] = None
+_stats = {"queued": 0, "delivered": 0, "retried": 0, "failed": 0, "dropped": 0}
+
+
+def sign(secret: str, timestamp: str, body: bytes) -> str:
+    """Signature header value for body; receivers recompute and compare."""
+    mac = hmac.new(secret.encode(), timestamp.encode() + b"." + body, hashlib.sha256)
+    return "sha256=" + mac.hexdigest()
+
+
+async def _is_public(host: str, port: Optional[int]) -> bool:
+    """Whether every address host resolves to is globally routable. Raises
+    OSError if it can't be resolved."""
+    infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    return bool(infos) and all(ipaddress.ip_address(info[4][0].split("%")[0]).is_global
+                               for info in infos)
+
+
+async def url_allowed(url: str) -> bool:
+    """Whether url is an acceptable callback_url: http(s), with a host that
+    is in WEBHOOK_ALLOWED_HOSTS or resolves only to public addresses."""
+    try:
+        parsed = httpx.URL(url)
+    except (httpx.InvalidURL, ValueError):
+        return False
+    if parsed.scheme not in ("http", "https") or not parsed.host:
+        return False
+    if parsed.host.lower() in WEBHOOK_ALLOWED_HOSTS:
+        return True
+    try:
+        return await _is_public(parsed.host, parsed.port)
+    except (OSError, ValueError, UnicodeError):
+        return False
+
+
+def _get_queue() -> asyncio.Queue:
+    global _queue
+    if _queue is None:
+        _queue = asyncio.Queue(maxsize=WEBHOOK_QUEUE_SIZE)
+    return _queue
+
+
+def enqueue(url: str, secret: Optional[str], event: str, payload: dict) -> bool:
+    """Schedule a delivery. Returns False (and logs) if the queue is full."""
+    item = {
+        "url": url,
+        "secret": secret,
+        "event": event,
+        "body": json.dumps(payload).encode(),
+        "delivery_id": uuid.uuid4().hex,
+        "attempt": 0,
+    }
+    try:
+        _get_queue().put_nowait(item)
+    except asyncio.QueueFull:
+        _stats["dropped"] += 1
+        logger.warning("webhook queue full, dropped event=%s url=%s", event, url)
+        return False
+    _stats["queued"] += 1
+    return True
+
+
+def _backoff(attempt: int) -> float:
+    return min(_BACKOFF_CAP_S, _BACKOFF_BASE_S * 2 ** (attempt - 1))
+
+
+async def deliver(item: dict) -> bool:
+    """POST one delivery attempt. True when the receiver accepted it."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(timeout=WEBHOOK_TIMEOUT_S)
+    ts = str(int(time.time()))
+    headers = {
+        "Content-Type": "application/json",
+        "User-Agent": "ace-step-wrangler-webhook",
+        "X-Wrangler-Event": item["event"],
+        "X-Wrangler-Delivery": item["delivery_id"],
+        "X-Wrangler-Timestamp": ts,
+    }
+    if item["secret"]:
+        headers["X-Wrangler-Signature"] = sign(item["secret"], ts, item["body"])
+    # Checked again at send time: the host's DNS may have changed since
+    # submit. A failed lookup raises OSError and is retried.
+    url = httpx.URL(item["url"])
+    if url.host.lower() not in WEBHOOK_ALLOWED_HOSTS and not await _is_public(url.host, url.port):
+        logger.warning("webhook refused event=%s url=%s: not a public address",
+                       item["event"], item["url"])
+        return False
+    r = await _client.post(item["url"], content=item["body"], headers=headers)
+    if r.status_code < 300:
+        return True
+    if r.status_code in _RETRYABLE_STATUS or r.status_code >= 500:
+        raise httpx.HTTPStatusError(f"receiver returned {r.status_code}",
+                                    request=r.request, response=r)
+    logger.warning("webhook rejected event=%s url=%s status=%d", item["event"],
+                   item["url"], r.status_code)
+    return False
+
+
+async def _worker() -> None:
+    queue = _get_queue()
+    loop = asyncio.get_running_loop()
+    while True:
+        item = await queue.get()
+        item["attempt"] += 1
+        try:
+            ok = await deliver(item)
+        except (httpx.HTTPError, OSError) as exc:
+            if item["attempt"] < WEBHOOK_MAX_ATTEMPTS:
+                _stats["retried"] += 1
+                loop.call_later(_backoff(item["attempt"]), _requeue, item)
+                continue
+            logger.warning("webhook gave up event=%s url=%s after %d attempts: %s",
+                           item["event"], item["url"], item["attempt"], exc)
+            ok = False
+        except Exception as exc:
+            # Not a delivery fault (e.g. httpx.InvalidURL): retrying won't
+            # help, and letting it escape would end this worker for good.
+            logger.warning("webhook failed event=%s url=%s: %r", item["event"], item["url"], exc)
+            ok = False
+        _stats["delivered" if ok else "failed"] += 1
+
+
+def _requeue(item: dict) -> None:
+    try:
+        _get_queue().put_nowait(item)
+    except asyncio.QueueFull:
+        _stats["dropped"] += 1
+
+
+def start(workers: int = WEBHOOK_WORKERS) -> None:
+    for _ in range(workers):
+        _workers.append(asyncio.create_task(_worker()))
+
+
+async def stop() -> None:
+    global _client, _queue
+    for task in _workers:
+        task.cancel()
+    _workers.clear()
+    _queue = None
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def stats() -> dict:
+    return {**_stats, "pending": _queue.qsize() if _queue is not None else 0}
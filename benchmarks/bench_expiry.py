@@ -0,0 +1,94 @@
+"""
+Cleanup tick cost with many live sessions and jobs.
+
+Loads N sessions and N finished jobs into Wrangler's in-process state,
+in the shape the request paths leave it: jobs scheduled for expiry, and
+sessions in last_seen order. It then times one _expire_due() tick when
+nothing is due and when 1% is due. For comparison it also times the full
+scan the cleanup loop used to do (one pass over every store per tick) and
+the MAX_USERS admission check for a new user.
+
+Usage:
+    python benchmarks/bench_expiry.py [--size 100000] [--ticks 20]
+"""
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+_HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(_HERE.parent / "backend"))
+import main as backend_main  # noqa: E402
+
+
+def _fill(n: int, now: float) -> None:
+    """1% of the entries are old enough to expire at `now`; half of the
+    sessions were seen again recently."""
+    backend_main._expiry = backend_main.DeadlineHeap()
+    backend_main._sessions.clear()
+    backend_main._jobs.clear()
+    session_ttl = backend_main.SESSION_TIMEOUT_MIN * 60
+    job_ttl = backend_main._ttl("job")
+    idle, recent = [], []
+    for i in range(n):
+        user = f"user-{i}"
+        if i % 100 == 0:
+            idle.append((user, now - session_ttl - 1))
+        else:
+            recent.append((user, now - 1 if i % 2 else now - session_ttl / 2))
+        task_id = f"job-{i}"
+        start = now - job_ttl - 1 if i % 100 == 0 else now - job_ttl / 2
+        backend_main._jobs[task_id] = {"results": [], "params": {}, "format": "mp3",
+                                       "user": user, "created_at": start}
+        backend_main._expire_after("job", task_id, start)
+    # _sessions is kept in last_seen order, as the user middleware leaves it
+    for user, last_seen in idle + sorted(recent, key=lambda r: r[1]):
+        backend_main._sessions[user] = backend_main._Session(last_seen)
+
+
+def _full_scan(now: float) -> int:
+    job_ttl = backend_main.JOB_TTL_MIN * 60
+    session_ttl = backend_main.SESSION_TIMEOUT_MIN * 60
+    found = [k for k, v in backend_main._jobs.items() if now - v.get("created_at", now) > job_ttl]
+    found += [k for k, v in backend_main._pending.items() if now - v.get("created_at", now) > job_ttl]
+    found += [u for u, s in backend_main._sessions.items() if now - s.last_seen > session_ttl]
+    return len(found)
+
+
+def _time(fn, ticks: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(ticks):
+        fn()
+    return (time.perf_counter() - t0) / ticks * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--ticks", type=int, default=20)
+    args = parser.parse_args()
+    logging.getLogger("wrangler").setLevel(logging.WARNING)
+
+    now = time.monotonic()
+    _fill(args.size, now)
+    scan_ms = _time(lambda: _full_scan(now), args.ticks)
+    # Nothing due yet: the heap's top is in the future
+    idle_ms = _time(lambda: backend_main._expire_due(now - 2), args.ticks)
+    t0 = time.perf_counter()
+    evicted = backend_main._expire_due(now)
+    due_ms = (time.perf_counter() - t0) * 1000
+    after_ms = _time(lambda: backend_main._expire_due(now), args.ticks)
+    admit_ms = _time(lambda: backend_main._active_sessions(now), args.ticks)
+
+    print(f"{args.size:,} sessions + {args.size:,} jobs")
+    print(f"  full scan per tick             {scan_ms:9.3f} ms")
+    print(f"  heap tick, nothing due         {idle_ms:9.3f} ms")
+    print(f"  heap tick, 1% due              {due_ms:9.3f} ms  evicted={evicted}")
+    print(f"  heap tick, right after         {after_ms:9.3f} ms")
+    print(f"  new-user admission check       {admit_ms:9.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+/status and /api/session latency against queue depth.
+
+Fills Wrangler's in-process job state with N queued jobs spread over a
+few users, then polls /status (head, middle and tail of the queue) and
+/api/session through the ASGI app — no AceStep involved, since tracked
+jobs are answered from local state. Latency should stay flat as N grows.
+
+Usage:
+    python benchmarks/bench_queue.py [--sizes 100,1000,10000] [--polls 2000]
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+_HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(_HERE.parent / "backend"))
+import main as backend_main  # noqa: E402
+
+_USERS = [f"user-{i}" for i in range(8)]
+
+
+def _fill(n: int) -> list[str]:
+    backend_main._pending.clear()
+    backend_main._queue_order = backend_main.JobQueue()
+    backend_main._estimate_memo = None
+    now = time.monotonic()
+    ids = []
+    for i in range(n):
+        task_id, user = f"bench-{i}", _USERS[i % len(_USERS)]
+        backend_main._pending[task_id] = {"params": {}, "format": "mp3", "user": user,
+                                          "created_at": now, "predicted_s": 20.0}
+        backend_main._queue_order.append(task_id, user)
+        ids.append(task_id)
+    return ids
+
+
+async def _poll(client: httpx.AsyncClient, paths: list[str], polls: int) -> list[float]:
+    latencies = []
+    for i in range(polls):
+        t0 = time.perf_counter()
+        r = await client.get(paths[i % len(paths)], headers={"x-auth-user": _USERS[i % len(_USERS)]})
+        latencies.append(time.perf_counter() - t0)
+        r.raise_for_status()
+    return sorted(latencies)
+
+
+async def _run(n: int, polls: int) -> dict:
+    ids = _fill(n)
+    status = [f"/status/{ids[0]}", f"/status/{ids[n // 2]}", f"/status/{ids[-1]}"]
+    transport = httpx.ASGITransport(app=backend_main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://wrangler") as client:
+        await _poll(client, status, 50)   # warm up
+        status_lat = await _poll(client, status, polls)
+        session_lat = await _poll(client, ["/api/session"], polls)
+    return {"status": status_lat, "session": session_lat}
+
+
+def _ms(latencies: list[float], q: float) -> float:
+    return latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="100,1000,10000")
+    parser.add_argument("--polls", type=int, default=2000)
+    args = parser.parse_args()
+    backend_main.MAX_USERS = 0   # every bench user is admitted
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    print(f"{'queued':>8}{'status p50':>12}{'status p99':>12}{'status mean':>13}{'session p50':>13}")
+    for n in (int(s) for s in args.sizes.split(",")):
+        r = asyncio.run(_run(n, args.polls))
+        print(f"{n:>8}{_ms(r['status'], 0.5):>12.3f}{_ms(r['status'], 0.99):>12.3f}"
+              f"{statistics.mean(r['status']) * 1000:>13.3f}{_ms(r['session'], 0.5):>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Per-poll latency and throughput of the AceStep client: loopback TCP vs a
+Unix-domain socket.
+
+Starts a stub AceStep (/query_result only) under uvicorn once per
+transport, then drives it through acestep_wrapper's pooled client —
+the same code path the pending-job watcher and /status use.
+
+Usage:
+    python benchmarks/bench_transport.py [--polls 5000] [--concurrency 16]
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from fastapi import FastAPI
+
+_HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(_HERE.parent / "backend"))
+import acestep_wrapper as aw  # noqa: E402
+
+# --- stub server (imported by the uvicorn subprocess) ----------------------
+
+stub_app = FastAPI()
+
+
+@stub_app.post("/query_result")
+async def _stub_query_result(body: dict):
+    return {"data": [{"task_id": t, "status": 0, "result": None}
+                     for t in body.get("task_id_list", [])]}
+
+
+# --- driver -----------------------------------------------------------------
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_server(uds: str | None, port: int) -> subprocess.Popen:
+    bind = ["--uds", uds] if uds else ["--host", "127.0.0.1", "--port", str(port)]
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "bench_transport:stub_app",
+         "--app-dir", str(_HERE), "--log-level", "warning", *bind],
+    )
+
+
+async def _wait_ready() -> None:
+    for _ in range(100):
+        try:
+            await aw.query_results(["warmup"])
+            return
+        except Exception:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("stub server did not start")
+
+
+async def _run(polls: int, concurrency: int) -> dict:
+    await _wait_ready()
+    latencies: list[float] = []
+    remaining = polls
+
+    async def worker() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            t0 = time.perf_counter()
+            await aw.query_results(["bench-task"])
+            latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    stats = aw.pool_stats()
+    await aw.close_client()
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "polls_per_s": len(latencies) / elapsed,
+        "connections": stats["connections_opened"],
+    }
+
+
+def _bench(transport: str, polls: int, concurrency: int) -> dict:
+    tmp = tempfile.mkdtemp(prefix="wrangler-bench-")
+    uds = os.path.join(tmp, "acestep.sock") if transport == "uds" else None
+    port = _free_port()
+    aw.ACESTEP_UDS = uds
+    aw.ACESTEP_BASE_URL = "http://acestep" if uds else f"http://127.0.0.1:{port}"
+    aw._pool_stats.update({k: 0 for k in aw._pool_stats})
+    aw._BREAKER_THRESHOLD = 10**9  # connection refused while the stub boots
+    proc = _start_server(uds, port)
+    try:
+        return asyncio.run(_run(polls, concurrency))
+    finally:
+        proc.terminate()
+        proc.wait(timeout=5)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--polls", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    print(f"{'transport':<10}{'p50 ms':>10}{'p99 ms':>10}{'polls/s':>12}{'conns':>8}")
+    for transport in ("tcp", "uds"):
+        r = _bench(transport, args.polls, args.concurrency)
+        print(f"{transport:<10}{r['p50_ms']:>10.3f}{r['p99_ms']:>10.3f}"
+              f"{r['polls_per_s']:>12.0f}{r['connections']:>8}")
+
+
+if __name__ == "__main__":
+    main()
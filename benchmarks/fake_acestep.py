@@ -0,0 +1,389 @@
+"""
+Simulated AceStep API server for load testing without a GPU.
+
+Implements the subset of AceStep 1.5's REST API that Wrangler calls —
+/release_task, /query_result (including its JSON-string `result` quirk),
+/v1/audio, /v1/models, /v1/lora/*, /v1/dataset/*, /v1/training/*,
+/v1/reinitialize and /format_input — with configurable request latency,
+failure rates and generation-time distributions. It also serves the
+/v1/audio/upload route Wrangler's remote mode (ACESTEP_REMOTE) uses to
+stage source audio on the AceStep host.
+
+Generation runs through a FIFO queue drained by --workers slots, like
+AceStep's own queue. Each job's time is a sample from --gen-time scaled by
+its cost relative to a 30 s / 20-step / batch-1 render (disable with
+--no-cost-scaling). Results are tiny silent WAVs under the system temp
+dir, so Wrangler's take persistence and /audio paths work unchanged.
+
+Usage:
+    python benchmarks/fake_acestep.py --port 8002
+    python benchmarks/fake_acestep.py --gen-time lognormal:8,0.4 --workers 2 \\
+        --latency-ms 3 --failure-rate 0.01 --gen-failure-rate 0.02
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import tempfile
+import time
+import uuid
+import wave
+from pathlib import Path
+from urllib.parse import quote
+
+from fastapi import FastAPI, HTTPException, Request, UploadFile
+from fastapi.responses import FileResponse, JSONResponse
+
+_REF_DURATION = 30.0
+_REF_STEPS = 20
+
+
+def parse_distribution(spec: str):
+    """'fixed:S' | 'uniform:A,B' | 'lognormal:MEDIAN,SIGMA' | 'exp:MEAN' → sampler."""
+    kind, _, args = spec.partition(":")
+    vals = [float(v) for v in args.split(",") if v]
+    if kind == "fixed":
+        return lambda: vals[0]
+    if kind == "uniform":
+        return lambda: random.uniform(vals[0], vals[1])
+    if kind == "lognormal":
+        mu = math.log(vals[0])
+        return lambda: random.lognormvariate(mu, vals[1])
+    if kind == "exp":
+        return lambda: random.expovariate(1.0 / vals[0])
+    raise ValueError(f"Unknown distribution: {spec}")
+
+
+def _ok(data) -> dict:
+    return {"data": data, "code": 200, "error": None, "timestamp": int(time.time() * 1000)}
+
+
+def _write_silence(path: Path, seconds: float = 0.25) -> None:
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(8000)
+        w.writeframes(b"\x00\x00" * int(8000 * seconds))
+
+
+def create_app(
+    latency_ms: float = 0.0,
+    failure_rate: float = 0.0,
+    gen_time: str = "fixed:2",
+    gen_failure_rate: float = 0.0,
+    workers: int = 1,
+    cost_scaling: bool = True,
+    startup_s: float = 0.0,
+    output_dir: str | None = None,
+) -> FastAPI:
+    app = FastAPI(title="Fake AceStep")
+    sample_gen = parse_distribution(gen_time)
+    out_dir = Path(output_dir or tempfile.mkdtemp(prefix="fake-acestep-"))
+    out_dir.mkdir(parents=True, exist_ok=True)
+    booted_at = time.monotonic()
+
+    # task_id → {"status": 0|1|2, "payload": dict, "result": str|None, ...}
+    tasks: dict[str, dict] = {}
+    queue: asyncio.Queue = asyncio.Queue()
+    lora = {"loaded": False, "lora_path": None, "use_lora": False, "scale": 1.0}
+    dataset = {"samples": [], "label": {"status": "idle"}, "preprocess": {"status": "idle"}}
+    training = {"is_training": False, "started_at": 0.0, "epochs": 0, "stop": False}
+    app.state.tasks = tasks
+    app.state.instance_id = uuid.uuid4().hex
+
+    @app.middleware("http")
+    async def chaos(request: Request, call_next):
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        if request.url.path != "/health" and random.random() < failure_rate:
+            return JSONResponse(status_code=500, content={"detail": "injected failure"})
+        return await call_next(request)
+
+    def _cost(payload: dict) -> float:
+        if not cost_scaling:
+            return 1.0
+        duration = float(payload.get("audio_duration") or _REF_DURATION)
+        steps = float(payload.get("inference_steps") or _REF_STEPS)
+        batch = max(1, int(payload.get("batch_size") or 1))
+        return (duration / _REF_DURATION) * (steps / _REF_STEPS) * batch
+
+    async def _render(task_id: str) -> None:
+        task = tasks[task_id]
+        payload = task["payload"]
+        await asyncio.sleep(max(0.0, sample_gen() * _cost(payload)))
+        for key in ("src_audio_path", "reference_audio_path"):
+            if payload.get(key) and not Path(payload[key]).is_file():
+                task["status"] = 2   # AceStep can't read a path that isn't on its host
+                return
+        if random.random() < gen_failure_rate:
+            task["status"] = 2
+            return
+        items = []
+        for i in range(max(1, int(payload.get("batch_size") or 1))):
+            fmt = payload.get("audio_format") or "wav"
+            fp = out_dir / f"{task_id}-{i}.{fmt}"
+            _write_silence(fp)
+            seed = payload.get("seed", -1)
+            if payload.get("use_random_seed", True) or seed in (None, -1):
+                seed = random.randint(0, 2**31 - 1)
+            items.append({
+                "file": f"/v1/audio?path={quote(str(fp))}",
+                "status": 1,
+                "prompt": payload.get("prompt") or payload.get("sample_query") or "",
+                "lyrics": payload.get("lyrics", ""),
+                "seed_value": str(seed),
+                "metas": {
+                    "bpm": 120, "keyscale": "C major", "timesignature": "4",
+                    "duration": payload.get("audio_duration", _REF_DURATION),
+                    "language": payload.get("vocal_language", "en"),
+                },
+            })
+        task["result"] = json.dumps(items)
+        task["status"] = 1
+
+    async def _worker() -> None:
+        while True:
+            task_id = await queue.get()
+            try:
+                await _render(task_id)
+            except Exception:
+                tasks[task_id]["status"] = 2
+
+    app.state.render = _render  # lets tests finish a job without the workers
+    app.state.uploads = 0
+
+    @app.on_event("startup")
+    async def _start_workers():
+        for _ in range(max(1, workers)):
+            asyncio.create_task(_worker())
+
+    # --- core generation API -------------------------------------------------
+
+    @app.get("/health")
+    async def health():
+        if time.monotonic() - booted_at < startup_s:
+            raise HTTPException(status_code=503, detail="models loading")
+        return _ok({"status": "ok", "service": "ACE-Step API", "version": "1.0",
+                    "instance_id": app.state.instance_id})
+
+    @app.get("/v1/models")
+    async def models():
+        return {"data": [{"id": "acestep-v15-turbo"}]}
+
+    @app.post("/release_task")
+    async def release_task(payload: dict):
+        if time.monotonic() - booted_at < startup_s:
+            raise HTTPException(status_code=500, detail="models loading")
+        task_id = str(uuid.uuid4())
+        tasks[task_id] = {"status": 0, "payload": payload, "result": None,
+                          "created_at": time.monotonic()}
+        queue.put_nowait(task_id)
+        return _ok({"task_id": task_id, "status": "queued", "queue_position": queue.qsize()})
+
+    @app.post("/query_result")
+    async def query_result(body: dict):
+        out = []
+        for tid in body.get("task_id_list", []):
+            task = tasks.get(tid)
+            if task is None:
+                out.append({"task_id": tid, "status": 2, "result": None,
+                            "error": "Task not found"})
+            else:
+                out.append({"task_id": tid, "status": task["status"], "result": task["result"]})
+        return _ok(out)
+
+    @app.get("/v1/audio")
+    async def audio(path: str):
+        fp = Path(path)
+        if not fp.is_file():
+            raise HTTPException(status_code=404, detail="not found")
+        return FileResponse(str(fp), media_type="audio/wav")
+
+    @app.post("/v1/audio/upload")
+    async def upload_audio(file: UploadFile):
+        fp = out_dir / f"upload-{uuid.uuid4().hex}{Path(file.filename or '').suffix}"
+        fp.write_bytes(await file.read())
+        app.state.uploads += 1
+        return _ok({"path": str(fp)})
+
+    @app.post("/format_input")
+    async def format_input(body: dict):
+        return _ok({"duration": 30 + 10 * str(body.get("lyrics", "")).count("[")})
+
+    # --- LoRA ------------------------------------------------------------------
+
+    @app.post("/v1/lora/load")
+    async def lora_load(body: dict):
+        lora.update(loaded=True, lora_path=body.get("lora_path"), use_lora=True)
+        return _ok(dict(lora))
+
+    @app.post("/v1/lora/unload")
+    async def lora_unload():
+        lora.update(loaded=False, lora_path=None, use_lora=False)
+        return _ok(dict(lora))
+
+    @app.post("/v1/lora/toggle")
+    async def lora_toggle(body: dict):
+        lora["use_lora"] = bool(body.get("use_lora"))
+        return _ok(dict(lora))
+
+    @app.post("/v1/lora/scale")
+    async def lora_scale(body: dict):
+        lora["scale"] = float(body.get("scale", 1.0))
+        return _ok(dict(lora))
+
+    @app.get("/v1/lora/status")
+    async def lora_status():
+        return _ok(dict(lora))
+
+    # --- dataset ---------------------------------------------------------------
+
+    def _progress(state: dict, seconds: float = 3.0) -> dict:
+        if state["status"] == "running" and time.monotonic() - state["started_at"] >= seconds:
+            state["status"] = "completed"
+        return {k: v for k, v in state.items() if k != "started_at"}
+
+    @app.post("/v1/dataset/scan")
+    async def dataset_scan(body: dict):
+        d = Path(body.get("audio_dir", ""))
+        files = sorted(f for f in d.iterdir() if f.is_file()) if d.is_dir() else []
+        dataset["samples"] = [{"idx": i, "filename": f.name, "caption": "", "labeled": False}
+                              for i, f in enumerate(files)]
+        return _ok({"count": len(files)})
+
+    @app.post("/v1/dataset/preprocess_async")
+    async def dataset_preprocess_async(body: dict):
+        dataset["preprocess"] = {"status": "running", "task_id": uuid.uuid4().hex,
+                                 "started_at": time.monotonic()}
+        return _ok({"task_id": dataset["preprocess"]["task_id"]})
+
+    @app.get("/v1/dataset/preprocess_status")
+    @app.get("/v1/dataset/preprocess_status/{task_id}")
+    async def dataset_preprocess_status(task_id: str | None = None):
+        return _ok(_progress(dataset["preprocess"]))
+
+    @app.post("/v1/dataset/auto_label")
+    async def dataset_auto_label(body: dict):
+        for s in dataset["samples"]:
+            s["labeled"] = True
+        return _ok({"labeled": len(dataset["samples"])})
+
+    @app.post("/v1/dataset/auto_label_async")
+    async def dataset_auto_label_async(body: dict):
+        dataset["label"] = {"status": "running", "task_id": uuid.uuid4().hex,
+                            "started_at": time.monotonic()}
+        return _ok({"task_id": dataset["label"]["task_id"]})
+
+    @app.get("/v1/dataset/auto_label_status")
+    async def dataset_auto_label_status():
+        return _ok(_progress(dataset["label"]))
+
+    @app.put("/v1/dataset/sample/{idx}")
+    async def dataset_sample_update(idx: int, body: dict):
+        if idx >= len(dataset["samples"]):
+            raise HTTPException(status_code=404, detail="no such sample")
+        dataset["samples"][idx].update(body)
+        return _ok(dataset["samples"][idx])
+
+    @app.post("/v1/dataset/save")
+    async def dataset_save(body: dict):
+        Path(body["save_path"]).write_text(json.dumps(dataset["samples"]))
+        return _ok({"saved": body["save_path"]})
+
+    @app.post("/v1/dataset/load")
+    async def dataset_load(body: dict):
+        p = Path(body["dataset_path"])
+        dataset["samples"] = json.loads(p.read_text()) if p.is_file() else []
+        return _ok({"count": len(dataset["samples"])})
+
+    @app.get("/v1/dataset/samples")
+    async def dataset_samples():
+        return _ok({"samples": dataset["samples"]})
+
+    # --- training --------------------------------------------------------------
+
+    async def _train(body: dict):
+        training.update(is_training=True, started_at=time.monotonic(),
+                        epochs=int(body.get("train_epochs", 10)), stop=False)
+        return _ok({"started": True})
+
+    @app.post("/v1/training/start")
+    async def training_start(body: dict):
+        return await _train(body)
+
+    @app.post("/v1/training/start_lokr")
+    async def training_start_lokr(body: dict):
+        return await _train(body)
+
+    @app.get("/v1/training/status")
+    async def training_status():
+        epoch = int(time.monotonic() - training["started_at"]) if training["is_training"] else 0
+        if training["is_training"] and (epoch >= training["epochs"] or training["stop"]):
+            training["is_training"] = False
+        return _ok({"is_training": training["is_training"],
+                    "current_epoch": min(epoch, training["epochs"]),
+                    "total_epochs": training["epochs"]})
+
+    @app.post("/v1/training/stop")
+    async def training_stop():
+        training["stop"] = True
+        return _ok({"stopped": True})
+
+    @app.post("/v1/training/export")
+    async def training_export(body: dict):
+        dest = Path(body["export_path"])
+        dest.mkdir(parents=True, exist_ok=True)
+        (dest / "adapter_config.json").write_text("{}")
+        return _ok({"exported": str(dest)})
+
+    @app.post("/v1/reinitialize")
+    async def reinitialize():
+        return _ok({"reinitialized": True})
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Simulated AceStep API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8002)
+    parser.add_argument("--uds", default=None, help="Bind to a Unix socket instead")
+    parser.add_argument("--latency-ms", type=float, default=0.0,
+                        help="Added latency per request")
+    parser.add_argument("--failure-rate", type=float, default=0.0,
+                        help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--gen-time", default="fixed:2",
+                        help="fixed:S | uniform:A,B | lognormal:MEDIAN,SIGMA | exp:MEAN "
+                             "(seconds for a 30 s / 20-step / batch-1 job)")
+    parser.add_argument("--gen-failure-rate", type=float, default=0.0,
+                        help="Fraction of generations that end in status 2")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Concurrent generation slots")
+    parser.add_argument("--no-cost-scaling", action="store_true",
+                        help="Don't scale generation time by duration/steps/batch")
+    parser.add_argument("--startup-s", type=float, default=0.0,
+                        help="Simulated model-loading time (health 503, submit 500)")
+    parser.add_argument("--output-dir", default=None)
+    args = parser.parse_args()
+
+    import uvicorn
+    app = create_app(
+        latency_ms=args.latency_ms,
+        failure_rate=args.failure_rate,
+        gen_time=args.gen_time,
+        gen_failure_rate=args.gen_failure_rate,
+        workers=args.workers,
+        cost_scaling=not args.no_cost_scaling,
+        startup_s=args.startup_s,
+        output_dir=args.output_dir,
+    )
+    if args.uds:
+        uvicorn.run(app, uds=args.uds, log_level="warning")
+    else:
+        uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
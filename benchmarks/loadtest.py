@@ -0,0 +1,243 @@
+"""
+End-to-end load test: N simulated users driving Wrangler.
+
+Starts benchmarks/fake_acestep.py and Wrangler (backend/main.py under
+uvicorn) on free ports, unless --wrangler-url points at a running stack.
+Each user repeatedly submits a job through POST /generate and polls
+GET /status/{task_id} until it finishes, then submits the next one.
+
+Reports p50/p99 latency per route, Wrangler CPU time and peak RSS (read
+from /proc, so Linux only, and only when this script spawned Wrangler),
+and completed jobs/min. With --render-users, that many users submit long
+renders instead of short previews, and time from submit to finished audio
+is reported per kind.
+
+Usage:
+    python benchmarks/loadtest.py --users 50 --seconds 60
+    python benchmarks/loadtest.py --users 200 --gen-time lognormal:3,0.5 --workers 4
+    python benchmarks/loadtest.py --users 20 --backends 3   # multi-GPU dispatch
+    python benchmarks/loadtest.py --users 12 --render-users 4   # previews vs renders
+    python benchmarks/loadtest.py --wrangler-url http://localhost:7860 --users 20
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+
+_HERE = Path(__file__).resolve().parent
+_ROOT = _HERE.parent
+
+_JOB = {
+    "style": "load test, lo-fi",
+    "lyrics": "",          # instrumental — keeps the alignment worker idle
+    "duration": 30,
+    "quality": 0,
+    "lm_model": "none",
+    "audio_format": "wav",
+}
+# A long, high-quality render: 8× the duration and 5× the steps of _JOB
+_RENDER = {**_JOB, "style": "load test, render", "duration": 240, "quality": 2}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class _ProcSampler:
+    """Samples CPU seconds and RSS of a process from /proc."""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.peak_rss_mb = 0.0
+        self.cpu0 = self._cpu()
+
+    def _cpu(self) -> float:
+        try:
+            fields = Path(f"/proc/{self.pid}/stat").read_text().rsplit(")", 1)[1].split()
+            return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+        except (OSError, IndexError, ValueError):
+            return 0.0
+
+    def sample(self) -> None:
+        try:
+            for line in Path(f"/proc/{self.pid}/status").read_text().splitlines():
+                if line.startswith("VmRSS:"):
+                    self.peak_rss_mb = max(self.peak_rss_mb, int(line.split()[1]) / 1024)
+        except OSError:
+            pass
+
+    def cpu_seconds(self) -> float:
+        return self._cpu() - self.cpu0
+
+
+async def _user(client: httpx.AsyncClient, name: str, deadline: float,
+                poll_interval: float, lat: dict, counts: dict, job: dict = _JOB,
+                turnaround: list | None = None) -> None:
+    headers = {"x-auth-user": name}
+    while time.monotonic() < deadline:
+        t0 = time.perf_counter()
+        r = await client.post("/generate", json=job, headers=headers)
+        lat["/generate"].append(time.perf_counter() - t0)
+        if r.status_code != 200:
+            counts[f"generate_{r.status_code}"] += 1
+            await asyncio.sleep(poll_interval)
+            continue
+        task_id = r.json()["task_id"]
+        submitted = t0
+        while time.monotonic() < deadline:
+            await asyncio.sleep(poll_interval)
+            t0 = time.perf_counter()
+            r = await client.get(f"/status/{task_id}", headers=headers)
+            lat["/status"].append(time.perf_counter() - t0)
+            if r.status_code != 200:
+                counts[f"status_{r.status_code}"] += 1
+                continue
+            state = r.json().get("status")
+            if state == "done":
+                counts["done"] += 1
+                if turnaround is not None:
+                    turnaround.append(time.perf_counter() - submitted)
+                break
+            if state == "error":
+                counts["failed"] += 1
+                break
+
+
+async def _wait_ready(url: str, timeout: float = 120.0) -> None:
+    async with httpx.AsyncClient(base_url=url) as client:
+        t_end = time.monotonic() + timeout
+        while time.monotonic() < t_end:
+            try:
+                if (await client.get("/api/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.5)
+    raise RuntimeError(f"Wrangler at {url} did not become healthy")
+
+
+async def _drive(url: str, users: int, seconds: float, poll_interval: float,
+                 sampler: _ProcSampler | None, render_users: int = 0) -> None:
+    await _wait_ready(url)
+    lat: dict[str, list[float]] = defaultdict(list)
+    counts: dict[str, int] = defaultdict(int)
+    limits = httpx.Limits(max_connections=users + 10, max_keepalive_connections=users + 10)
+    if sampler:
+        sampler.cpu0 = sampler._cpu()
+    t_start = time.monotonic()
+    deadline = t_start + seconds
+
+    async def sample_loop():
+        while time.monotonic() < deadline:
+            sampler.sample()
+            await asyncio.sleep(0.5)
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60.0) as client:
+        turnaround: dict[str, list[float]] = {"preview": [], "render": []}
+        tasks = [_user(client, f"user{i}", deadline, poll_interval, lat, counts,
+                       *((_RENDER, turnaround["render"]) if i < render_users
+                         else (_JOB, turnaround["preview"])))
+                 for i in range(users)]
+        if sampler:
+            tasks.append(sample_loop())
+        await asyncio.gather(*tasks)
+    elapsed = time.monotonic() - t_start
+
+    print(f"\nusers={users}  duration={elapsed:.0f}s  poll_interval={poll_interval}s")
+    print(f"{'route':<12}{'requests':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for route, values in sorted(lat.items()):
+        values.sort()
+        p99 = values[max(0, int(len(values) * 0.99) - 1)]
+        print(f"{route:<12}{len(values):>10}{statistics.median(values) * 1000:>10.1f}"
+              f"{p99 * 1000:>10.1f}")
+    print(f"jobs done={counts['done']}  failed={counts['failed']}  "
+          f"jobs/min={counts['done'] / elapsed * 60:.1f}")
+    if render_users:
+        for kind, values in turnaround.items():
+            if values:
+                print(f"{kind:<8} done={len(values):<4} submit→audio p50={statistics.median(values):.1f}s"
+                      f"  max={max(values):.1f}s")
+    others = {k: v for k, v in counts.items() if k not in ("done", "failed")}
+    if others:
+        print(f"non-200 responses: {dict(others)}")
+    if sampler:
+        cpu = sampler.cpu_seconds()
+        print(f"wrangler cpu={cpu:.1f}s ({cpu / elapsed * 100:.0f}% of one core)  "
+              f"peak_rss={sampler.peak_rss_mb:.0f} MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Wrangler end-to-end load test")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=60.0)
+    parser.add_argument("--poll-interval", type=float, default=2.0,
+                        help="Seconds between /status polls (frontend uses 2)")
+    parser.add_argument("--render-users", type=int, default=0,
+                        help="Users that submit long renders instead of previews")
+    parser.add_argument("--wrangler-url", default=None,
+                        help="Drive an already-running Wrangler instead of spawning one")
+    # Passed through to the simulated AceStep
+    parser.add_argument("--gen-time", default="fixed:2")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--gen-failure-rate", type=float, default=0.0)
+    parser.add_argument("--backends", type=int, default=1,
+                        help="Simulated AceStep instances (ACESTEP_BACKENDS), one per 'GPU'")
+    args = parser.parse_args()
+
+    if args.wrangler_url:
+        asyncio.run(_drive(args.wrangler_url, args.users, args.seconds,
+                           args.poll_interval, None, args.render_users))
+        return
+
+    work = Path(tempfile.mkdtemp(prefix="wrangler-loadtest-"))
+    fake_ports = [_free_port() for _ in range(max(1, args.backends))]
+    wrangler_port = _free_port()
+    fakes = [subprocess.Popen([
+        sys.executable, str(_HERE / "fake_acestep.py"), "--port", str(port),
+        "--gen-time", args.gen_time, "--workers", str(args.workers),
+        "--latency-ms", str(args.latency_ms), "--failure-rate", str(args.failure_rate),
+        "--gen-failure-rate", str(args.gen_failure_rate),
+        "--output-dir", str(work / f"acestep-out-{i}"),
+    ]) for i, port in enumerate(fake_ports)]
+    env = os.environ.copy()
+    env.update({
+        "ACESTEP_PORT": str(fake_ports[0]),
+        "TAKES_DIR": str(work / "takes"),
+        "JOB_DB": str(work / "jobs.db"),
+        "MAX_JOBS_PER_USER": "1000",
+    })
+    if len(fake_ports) > 1:
+        env["ACESTEP_BACKENDS"] = ",".join(f"http://127.0.0.1:{p}" for p in fake_ports)
+    wrangler = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "main:app", "--app-dir", str(_ROOT / "backend"),
+        "--port", str(wrangler_port), "--log-level", "warning",
+    ], env=env)
+    try:
+        asyncio.run(_drive(f"http://127.0.0.1:{wrangler_port}", args.users, args.seconds,
+                           args.poll_interval, _ProcSampler(wrangler.pid), args.render_users))
+    finally:
+        for proc in (wrangler, *fakes):
+            proc.terminate()
+            try:
+                proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        print(f"artifacts: {work}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1208,6 +1208,91 @@ document.getElementById('repaint-strength').addEventListener('input', function (
 _changeInit.cover = true;
 _applyChangePreset(_CHANGE_PRESETS.cover.default);
 
+// ===== Job events (Server-Sent Events) =====
+// One /events stream per page replaces per-job /status polling. The server
+// pushes queued / queue_position / done / failed / cancelled for generation jobs and
+// alignment_done for takes; handlers are keyed by task_id.
+
+let _jobEvents = null;
+const _jobWatchers = new Map();   // task_id → handler(type, data)
+// Events for a task_id nobody watches yet — 'queued' (and, for a fast job,
+// its outcome) is published while the POST that created it is still in
+// flight. _watchJob replays them; unclaimed ones are dropped after a while.
+const _earlyJobEvents = new Map();   // task_id → [{type, data, at}]
+const EARLY_EVENT_TTL_MS = 60000;
+
+function _holdJobEvent(type, data) {
+  const now = Date.now();
+  for (const [taskId, events] of _earlyJobEvents) {
+    if (now - events[0].at > EARLY_EVENT_TTL_MS) _earlyJobEvents.delete(taskId);
+  }
+  if (!_earlyJobEvents.has(data.task_id)) _earlyJobEvents.set(data.task_id, []);
+  _earlyJobEvents.get(data.task_id).push({ type, data, at: now });
+}
+
+function _ensureJobEvents() {
+  if (_jobEvents) return;
+  _jobEvents = new EventSource('/events');
+  const dispatch = (e) => {
+    const data = JSON.parse(e.data);
+    const handler = _jobWatchers.get(data.task_id);
+    if (handler) handler(e.type, data);
+    else _holdJobEvent(e.type, data);
+  };
+  ['queued', 'queue_position', 'done', 'failed', 'cancelled'].forEach(t => _jobEvents.addEventListener(t, dispatch));
+  _jobEvents.addEventListener('alignment_done', (e) => {
+    const data = JSON.parse(e.data);
+    if (_alignWaiting && _alignWaiting.jobId === data.job_id && _alignWaiting.index === data.index) {
+      refreshAlignmentUI();
+    }
+  });
+  // EventSource reconnects on its own and replays via Last-Event-ID, but a
+  // restarted server has no backlog — resync anything still outstanding.
+  _jobEvents.addEventListener('open', () => {
+    for (const taskId of _jobWatchers.keys()) _resyncJob(taskId);
+    if (_alignWaiting) refreshAlignmentUI();
+  });
+}
+
+async function _resyncJob(taskId) {
+  let type, data;
+  try {
+    const res = await fetch(`/status/${taskId}`);
+    if (res.status >= 400 && res.status < 500) {
+      // Unknown task (e.g. backend restarted and AceStep forgot it)
+      type = 'failed';
+      data = { task_id: taskId, status: 'error', reason: res.statusText };
+    } else if (!res.ok) {
+      return;   // transient — the stream will deliver the outcome
+    } else {
+      data = await res.json();
+      if (data.status === 'done') type = 'done';
+      else if (data.status === 'error') type = 'failed';
+      else if (data.status === 'cancelled') type = 'cancelled';
+      else return;
+    }
+  } catch (_) {
+    return;
+  }
+  const handler = _jobWatchers.get(taskId);
+  if (handler) handler(type, { ...data, task_id: taskId });
+}
+
+function _watchJob(taskId, handler) {
+  _ensureJobEvents();
+  _jobWatchers.set(taskId, handler);
+  const early = _earlyJobEvents.get(taskId) || [];
+  _earlyJobEvents.delete(taskId);
+  for (const { type, data } of early) {
+    if (_jobWatchers.get(taskId) !== handler) break;   // finished by an earlier one
+    handler(type, data);
+  }
+}
+
+function _unwatchJob(taskId) {
+  _jobWatchers.delete(taskId);
+}
+
 // ===== Fix & Blend lyric selection =====
 
 const _alignGroup = document.getElementById('lyric-align-group');
@@ -1216,7 +1301,7 @@ const _alignState = document.getElementById('align-state');
 let _alignLines = null;      // alignment lines for the loaded take
 let _alignSections = null;   // [{label, occ, first, last}] from lyric [Tags]
 let _alignSel = null;        // {first, last} indices into _alignLines
-let _alignPollTimer = null;
+let _alignWaiting = null;    // {jobId, index} while alignment is pending
 let _alignToken = 0;
 const LOW_CONFIDENCE = 0.5;
 
@@ -1328,18 +1413,24 @@ function renderAlignList(lines) {
 
 async function refreshAlignmentUI() {
   const token = ++_alignToken;
-  if (_alignPollTimer) { clearTimeout(_alignPollTimer); _alignPollTimer = null; }
+  _alignWaiting = null;
   const isRepaint = _reworkApproach === 'repaint';
   _alignGroup.classList.toggle('hidden', !isRepaint || !_reworkTakeRef);
   if (!isRepaint || !_reworkTakeRef) {
     _checkGroup.classList.add('hidden');
     return;
   }
+  // Armed before the fetch so an alignment_done landing mid-request re-runs us
+  _alignWaiting = { jobId: _reworkTakeRef.jobId, index: _reworkTakeRef.index };
+  _ensureJobEvents();
   try {
     const res = await fetch(`/takes/${_reworkTakeRef.jobId}/${_reworkTakeRef.index}`);
     if (!res.ok) throw new Error(res.statusText);
     const take = await res.json();
     if (token !== _alignToken) return; // superseded by a newer call
+    if (take.alignment_status === 'done' || take.alignment_status === 'failed') {
+      _alignWaiting = null;
+    }
     if (take.alignment && take.alignment.lines.length) {
       _alignState.textContent = '';
       _alignSections = computeAlignSections(take.lyrics, take.alignment.lines);
@@ -1357,10 +1448,11 @@ async function refreshAlignmentUI() {
         fetch(`/takes/${_reworkTakeRef.jobId}/${_reworkTakeRef.index}/align`,
               { method: 'POST' });
       }
-      _alignPollTimer = setTimeout(refreshAlignmentUI, 3000);
+      // Re-rendered when the alignment_done event arrives
     }
   } catch (_) {
     if (token !== _alignToken) return; // superseded by a newer call
+    _alignWaiting = null;
     _alignGroup.classList.add('hidden');
     _checkGroup.classList.add('hidden');
   }
@@ -4086,8 +4178,14 @@ function buildPayload() {
   return _currentMode === 'rework' ? buildReworkPayload() : buildCreatePayload();
 }
 
-let _pollInterval = null;
-let _pollFailSince = null;   // start of the current failure streak, or null
+let _activeTaskId = null;    // generation job currently watched via /events
+
+// Server-side runtime estimate → "1m 20s" / "15s"
+function _fmtEta(secs) {
+  const t = Math.max(1, Math.round(secs));
+  const m = Math.floor(t / 60);
+  return m > 0 ? `${m}m ${String(t % 60).padStart(2, '0')}s` : `${t}s`;
+}
 let _timerInterval = null;
 
 // Ctrl/Cmd+Enter keyboard shortcut — trigger Generate from anywhere in the UI
@@ -4141,7 +4239,13 @@ function setGenerating(on) {
 }
 
 document.getElementById('cancel-btn').addEventListener('click', () => {
-  if (_pollInterval) { clearInterval(_pollInterval); _pollInterval = null; }
+  if (_activeTaskId) {
+    const taskId = _activeTaskId;
+    _unwatchJob(taskId);
+    _activeTaskId = null;
+    // Frees the job's queue slot server-side; the UI doesn't wait on it
+    fetch(`/jobs/${taskId}`, { method: 'DELETE' }).catch(() => {});
+  }
   setGenerating(false);
   setOutputState('now-playing');
 });
@@ -4368,8 +4472,9 @@ generateBtn.addEventListener('click', async () => {
   const payload = buildPayload();
   const _loraWasLoaded = _loraStatusEl.classList.contains('loaded');
   setGenerating(true);
+  _ensureJobEvents();   // open the stream before submitting so 'queued' isn't missed
 
-  let taskId;
+  let taskId, submitted;
   try {
     const res = await fetch('/generate', {
       method:  'POST',
@@ -4380,7 +4485,8 @@ generateBtn.addEventListener('click', async () => {
       const err = await res.json().catch(() => ({ detail: res.statusText }));
       throw new Error(err.detail || res.statusText);
     }
-    ({ task_id: taskId } = await res.json());
+    submitted = await res.json();
+    taskId = submitted.task_id;
   } catch (err) {
     generateHint.textContent = `Error: ${err.message}`;
     setGenerating(false);
@@ -4388,32 +4494,26 @@ generateBtn.addEventListener('click', async () => {
     return;
   }
 
-  // Poll /status/{task_id} every 2 seconds
-  _pollFailSince = null;
-  _pollInterval = setInterval(async () => {
+  // Lifecycle updates arrive on the /events stream — no polling
+  _activeTaskId = taskId;
+  _watchJob(taskId, async (type, data) => {
     try {
-      const res = await fetch(`/status/${taskId}`);
-      if (!res.ok) {
-        const err = new Error(res.statusText);
-        // 4xx = permanent (e.g. unknown task after a backend restart);
-        // 5xx = transient (AceStep busy or still loading models)
-        err.permanent = res.status >= 400 && res.status < 500;
-        throw err;
-      }
-      const data = await res.json();
-      _pollFailSince = null;
-
       // Queue position display while waiting
-      if (data.status === 'processing' && data.queue_position >= 0) {
-        if (data.queue_position === 0) {
-          generateHint.textContent = 'Your job is being processed\u2026';
+      if (type === 'queued' || type === 'queue_position') {
+        const eta = data.eta_seconds != null ? ` \u00b7 about ${_fmtEta(data.eta_seconds)} left` : '';
+        if (data.status === 'waiting') {
+          // Held by the server until AceStep finishes loading; submitted automatically
+          generateHint.textContent = 'Waiting for the engine to finish loading\u2026';
+        } else if (data.queue_position === 0) {
+          generateHint.textContent = `Your job is being processed\u2026${eta}`;
         } else {
-          generateHint.textContent = `Queue position: ${data.queue_position + 1} of ${data.queue_depth}`;
+          generateHint.textContent = `Queue position: ${data.queue_position + 1} of ${data.queue_depth}${eta}`;
         }
       }
 
-      if (data.status === 'done') {
-        clearInterval(_pollInterval);
+      if (type === 'done') {
+        _unwatchJob(taskId);
+        _activeTaskId = null;
         setGenerating(false);
         generateHint.textContent = '';
         if (_currentMode === 'analyze') {
@@ -4486,28 +4586,32 @@ generateBtn.addEventListener('click', async () => {
             generateHint.textContent = 'Style adapter was unloaded during generation. Reload it before the next run.';
           }
         }
-      } else if (data.status === 'error') {
-        clearInterval(_pollInterval);
+      } else if (type === 'failed') {
+        _unwatchJob(taskId);
+        _activeTaskId = null;
         setGenerating(false);
         setOutputState('now-playing');
-        generateHint.textContent = 'Generation failed. Check AceStep logs.';
+        generateHint.textContent = data.reason === 'expired'
+          ? 'Generation timed out. Check AceStep logs.'
+          : 'Generation failed. Check AceStep logs.';
         if (_loraWasLoaded) _refreshLoraStatus();
+      } else if (type === 'cancelled') {
+        // Cancelled elsewhere (another tab or an API client)
+        _unwatchJob(taskId);
+        _activeTaskId = null;
+        setGenerating(false);
+        setOutputState('now-playing');
+        generateHint.textContent = 'Generation cancelled.';
       }
-      // 'processing' → keep polling
     } catch (err) {
-      // Tolerate transient failures for up to 5 minutes — cold-start model
-      // loading and busy-GPU windows can stall AceStep far longer than a
-      // fixed retry count allows. Only 4xx responses give up immediately.
-      if (!err.permanent) {
-        if (_pollFailSince === null) _pollFailSince = Date.now();
-        if (Date.now() - _pollFailSince < 5 * 60 * 1000) return;
-      }
-      clearInterval(_pollInterval);
       setGenerating(false);
       setOutputState('now-playing');
-      generateHint.textContent = `Polling error: ${err.message}`;
+      generateHint.textContent = `Error: ${err.message}`;
     }
-  }, 2000);
+  });
+  // A request served from cache is done before the POST answers, and its
+  // 'done' event may have gone out before the stream connected.
+  if (submitted.status === 'done') _resyncJob(taskId);
 });
 
 // ===== Song Project Save / Load =====
@@ -3,10 +3,14 @@ ACE-Step Wrangler — unified launcher.
 
 Starts the AceStep API server (GPU, port 8002) and the Wrangler FastAPI UI
 server (no GPU, port 7860) as subprocesses, with graceful shutdown on Ctrl+C.
+With several GPUs listed, one AceStep server runs per GPU on consecutive
+ports and Wrangler dispatches jobs across them.
 
 Usage:
     uv run wrangler                   # auto GPU detection
     uv run wrangler --gpu 1           # use GPU 1
+    uv run wrangler --gpu 0,1,2       # one AceStep per GPU, jobs spread across them
+    uv run wrangler --acestep-uds /tmp/acestep.sock   # AceStep on a Unix socket
     ACESTEP_GPU=0 uv run wrangler
 """
 
@@ -178,8 +182,9 @@ def main() -> None:
         type=str,
         default=None,
         help="GPU device(s) for AceStep (e.g. 0, 1, 0,1). "
-             "Sets CUDA_VISIBLE_DEVICES on the AceStep subprocess. "
-             "Overrides ACESTEP_GPU env var.",
+             "Sets CUDA_VISIBLE_DEVICES on the AceStep subprocess; a list "
+             "starts one AceStep per GPU on consecutive ports (or sockets "
+             "PATH, PATH.1, ...). Overrides ACESTEP_GPU env var.",
     )
     parser.add_argument(
         "--acestep-port",
@@ -187,6 +192,15 @@ def main() -> None:
         default=8002,
         help="Port for the AceStep API server (default: 8002)",
     )
+    parser.add_argument(
+        "--acestep-uds",
+        type=str,
+        default=None,
+        metavar="PATH",
+        help="Bind AceStep to this Unix socket instead of TCP (skips loopback "
+             "TCP on the polling path, avoids port collisions). "
+             "Overrides --acestep-port. Default: env ACESTEP_UDS or off",
+    )
     parser.add_argument(
         "--port",
         type=int,
@@ -245,10 +259,13 @@ def main() -> None:
             if gpu:
                 gpu_source = "auto-selected (most free VRAM)"
 
+    # ACE-Step is single-GPU: a list of GPUs means one instance per GPU
+    gpus = [g.strip() for g in gpu.split(",") if g.strip()] if gpu else []
+    if len(gpus) < 2:
+        gpus = [gpu] if gpu else [None]
+
     # --- Build environment for AceStep subprocess ---------------------------
     acestep_env = os.environ.copy()
-    if gpu:
-        acestep_env["CUDA_VISIBLE_DEVICES"] = gpu
 
     # Strip LD_LIBRARY_PATH to prevent system CUDA libs (e.g. cuBLAS from a
     # newer toolkit) from shadowing the versions bundled with PyTorch.
@@ -274,6 +291,23 @@ def main() -> None:
     wrangler_env = os.environ.copy()
     wrangler_env.pop("CUDA_VISIBLE_DEVICES", None)
     wrangler_env["ACESTEP_PORT"] = str(args.acestep_port)
+    acestep_uds = args.acestep_uds or os.environ.get("ACESTEP_UDS") or None
+    if acestep_uds:
+        acestep_uds = str(Path(acestep_uds).expanduser().resolve())
+        wrangler_env["ACESTEP_UDS"] = acestep_uds
+
+    # (gpu, port, uds) per AceStep instance; the first keeps the configured
+    # port/socket so single-GPU setups are unchanged
+    instances = [
+        (g, args.acestep_port + i,
+         (acestep_uds if i == 0 else f"{acestep_uds}.{i}") if acestep_uds else None)
+        for i, g in enumerate(gpus)
+    ]
+    if len(instances) > 1:
+        wrangler_env["ACESTEP_BACKENDS"] = ",".join(
+            f"unix:{uds}" if uds else f"http://127.0.0.1:{port}"
+            for _, port, uds in instances
+        )
 
     # Forward multi-user CLI args as env vars
     if args.max_users is not None:
@@ -286,17 +320,17 @@ def main() -> None:
         wrangler_env["JOB_TTL_MINUTES"] = str(args.job_ttl)
 
     # --- Startup banner -----------------------------------------------------
-    gpu_info = _get_gpu_info(gpu) if gpu else None
+    gpu_infos = {g: _get_gpu_info(g) for g in gpus if g}
 
-    if gpu and gpu_info:
-        name, free_mb, total_mb = gpu_info
-        gpu_display = (
-            f"{gpu} — {name} ({free_mb / 1024:.1f} / {total_mb / 1024:.1f} GB free)"
-        )
-    elif gpu:
-        gpu_display = gpu
-    else:
-        gpu_display = "CUDA default"
+    def _gpu_display(g: str | None) -> str:
+        info = gpu_infos.get(g)
+        if g and info:
+            name, free_mb, total_mb = info
+            return f"{g} — {name} ({free_mb / 1024:.1f} / {total_mb / 1024:.1f} GB free)"
+        return g or "CUDA default"
+
+    def _api_display(port: int, uds: str | None) -> str:
+        return f"unix:{uds}" if uds else f"http://localhost:{port}"
 
     active_overrides = {
         k: os.environ[k] for k in _ACESTEP_PASSTHROUGH_VARS if k in os.environ
@@ -306,16 +340,21 @@ def main() -> None:
     print("=" * 60)
     print("  ACE-Step Wrangler")
     print("=" * 60)
-    if gpu_source:
-        print(f"  GPU:           {gpu_display}  [{gpu_source}]")
+    source = f"  [{gpu_source}]" if gpu_source else ""
+    if len(instances) == 1:
+        print(f"  GPU:           {_gpu_display(gpus[0])}{source}")
     else:
-        print(f"  GPU:           {gpu_display}")
-    if gpu_info and gpu_info[1] < _LOW_VRAM_THRESHOLD_MB:
+        for g, port, uds in instances:
+            print(f"  GPU:           {_gpu_display(g)} → {_api_display(port, uds)}{source}")
+    if any(info and info[1] < _LOW_VRAM_THRESHOLD_MB for info in gpu_infos.values()):
         print(f"  ⚠ Low free VRAM — consider ACESTEP_LM_MODEL_PATH=acestep-5Hz-lm-0.6B")
         print(f"    or ACESTEP_VAE_ON_CPU=true")
     if model_location:
         print(f"  Models:        {model_location}")
-    print(f"  AceStep API:   http://localhost:{args.acestep_port}")
+    if len(instances) == 1:
+        print(f"  AceStep API:   {_api_display(instances[0][1], instances[0][2])}")
+    else:
+        print(f"  AceStep APIs:  {len(instances)} instances (least-loaded dispatch)")
     print(f"  Wrangler UI:   http://localhost:{args.port}")
     if active_overrides:
         print("-" * 60)
@@ -327,19 +366,35 @@ def main() -> None:
 
     # --- Launch subprocesses ------------------------------------------------
     procs: list[subprocess.Popen] = []
+    acestep_procs: dict[subprocess.Popen, str] = {}   # proc → display name
 
     try:
-        # 1) AceStep API server
-        acestep_cmd = [
-            sys.executable, "-m", "acestep.api_server",
-            "--host", "127.0.0.1",
-            "--port", str(args.acestep_port),
-        ]
-        print(f"[run] Starting AceStep API server on port {args.acestep_port}...")
-        acestep_proc = subprocess.Popen(
-            acestep_cmd, env=acestep_env, start_new_session=True,
-        )
-        procs.append(acestep_proc)
+        # 1) AceStep API server(s)
+        for g, port, uds in instances:
+            if uds:
+                # api_server's own CLI only knows host/port, so serve its ASGI
+                # app through uvicorn directly. Remove a stale socket first —
+                # uvicorn refuses to bind over an existing file.
+                Path(uds).parent.mkdir(parents=True, exist_ok=True)
+                Path(uds).unlink(missing_ok=True)
+                acestep_cmd = [
+                    sys.executable, "-m", "uvicorn", "acestep.api_server:app",
+                    "--uds", uds,
+                ]
+            else:
+                acestep_cmd = [
+                    sys.executable, "-m", "acestep.api_server",
+                    "--host", "127.0.0.1",
+                    "--port", str(port),
+                ]
+            env = dict(acestep_env)
+            if g:
+                env["CUDA_VISIBLE_DEVICES"] = g
+            name = "AceStep" if len(instances) == 1 else f"AceStep (GPU {g})"
+            print(f"[run] Starting {name} API server on {_api_display(port, uds)}...")
+            proc = subprocess.Popen(acestep_cmd, env=env, start_new_session=True)
+            procs.append(proc)
+            acestep_procs[proc] = name
 
         # Brief pause so AceStep begins initialization before Wrangler starts
         time.sleep(1)
@@ -354,14 +409,24 @@ def main() -> None:
         )
         procs.append(wrangler_proc)
 
-        # Wait for either process to exit (or Ctrl+C)
+        # Wait for Wrangler or every AceStep to exit (or Ctrl+C). With
+        # several AceStep instances, Wrangler ejects one that dies and keeps
+        # dispatching to the rest.
+        reported: set[subprocess.Popen] = set()
         while True:
-            for proc in procs:
+            ret = wrangler_proc.poll()
+            if ret is not None:
+                print(f"\n[run] Wrangler exited (code {ret}). Shutting down...")
+                raise SystemExit(ret)
+            for proc, name in acestep_procs.items():
                 ret = proc.poll()
-                if ret is not None:
-                    name = "AceStep" if proc is acestep_proc else "Wrangler"
+                if ret is None or proc in reported:
+                    continue
+                reported.add(proc)
+                if len(reported) == len(acestep_procs):
                     print(f"\n[run] {name} exited (code {ret}). Shutting down...")
                     raise SystemExit(ret)
+                print(f"\n[run] {name} exited (code {ret}); continuing on the remaining GPUs")
             time.sleep(0.5)
 
     except KeyboardInterrupt:
@@ -385,6 +450,9 @@ def main() -> None:
                     os.killpg(proc.pid, signal.SIGKILL)
                 except OSError:
                     proc.kill()
+        for _, _, uds in instances:
+            if uds:
+                Path(uds).unlink(missing_ok=True)
         print("[run] All servers stopped.")
 
 
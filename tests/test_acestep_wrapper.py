@@ -0,0 +1,238 @@
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+import acestep_wrapper as aw
+
+
+def _mock_client(handler):
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def _fresh_circuit(monkeypatch):
+    monkeypatch.setattr(aw, "_circuit", {"state": "closed", "failures": 0, "opened_at": 0.0,
+                                         "trips": 0, "probe_in_flight": False})
+    monkeypatch.setattr(aw, "_RETRY_BASE_S", 0.0)
+    monkeypatch.setattr(aw, "_pool_stats", {"requests": 0, "connections_opened": 0,
+                                            "errors": 0, "retries": 0})
+
+
+def test_calls_share_one_pooled_client(monkeypatch):
+    seen = []
+
+    def handler(request):
+        seen.append(request.url.path)
+        if request.url.path == "/query_result":
+            entry = {"status": 1, "result": json.dumps([{"file": "/tmp/a.mp3"}])}
+            return httpx.Response(200, json={"data": [entry]})
+        return httpx.Response(200, json={"status": "ok"})
+
+    async def go():
+        monkeypatch.setattr(aw, "_client", _mock_client(handler))
+        client = aw._http()
+        await aw.health_check()
+        data = await aw.query_result("t1")
+        assert aw._http() is client  # no per-call client
+        await aw.close_client()
+        return data
+
+    _fresh_circuit(monkeypatch)
+    data = asyncio.run(go())
+    assert seen == ["/health", "/query_result"]
+    assert data["results"][0]["audio_url"] == "/tmp/a.mp3"
+    assert aw._client is None
+    assert aw.pool_stats()["requests"] == 2
+
+
+def test_http_errors_are_counted_and_raised(monkeypatch):
+    async def go():
+        monkeypatch.setattr(aw, "_client", _mock_client(lambda r: httpx.Response(500)))
+        try:
+            await aw.lora_unload()
+        except httpx.HTTPStatusError:
+            return True
+        finally:
+            await aw.close_client()
+        return False
+
+    _fresh_circuit(monkeypatch)
+    assert asyncio.run(go()) is True
+    assert aw.pool_stats()["errors"] == 1
+
+
+def test_query_results_batches_and_chunks(monkeypatch):
+    bodies = []
+
+    def handler(request):
+        ids = json.loads(request.content)["task_id_list"]
+        bodies.append(ids)
+        return httpx.Response(200, json={"data": [
+            {"task_id": t, "status": 0, "result": None} for t in ids
+        ]})
+
+    async def go():
+        monkeypatch.setattr(aw, "_client", _mock_client(handler))
+        try:
+            return await aw.query_results([f"t{i}" for i in range(5)])
+        finally:
+            await aw.close_client()
+
+    monkeypatch.setattr(aw, "_QUERY_BATCH_SIZE", 2)
+    out = asyncio.run(go())
+    assert sorted(len(b) for b in bodies) == [1, 2, 2]
+    assert set(out) == {f"t{i}" for i in range(5)}
+    assert out["t3"] == {"status": "processing", "results": None}
+
+
+def test_concurrent_query_result_calls_coalesce(monkeypatch):
+    bodies = []
+
+    def handler(request):
+        ids = json.loads(request.content)["task_id_list"]
+        bodies.append(ids)
+        # No task_id in entries — mapped back by request order
+        return httpx.Response(200, json={"data": [
+            {"status": 2, "result": None} for _ in ids
+        ]})
+
+    async def go():
+        monkeypatch.setattr(aw, "_client", _mock_client(handler))
+        try:
+            return await asyncio.gather(
+                aw.query_result("a"), aw.query_result("b"), aw.query_result("a"),
+            )
+        finally:
+            await aw.close_client()
+
+    out = asyncio.run(go())
+    assert bodies == [["a", "b"]]
+    assert [o["status"] for o in out] == ["error"] * 3
+    assert out[0] is not out[2]  # each caller gets its own copy
+
+
+def test_idempotent_calls_retry_but_submits_do_not(monkeypatch):
+    _fresh_circuit(monkeypatch)
+    calls = {"GET": 0, "POST": 0}
+
+    def handler(request):
+        calls[request.method] += 1
+        if calls[request.method] < 3:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"data": {"task_id": "t"}})
+
+    async def go():
+        monkeypatch.setattr(aw, "_client", _mock_client(handler))
+        try:
+            await aw.lora_status()  # GET: 2 faults, then success
+            try:
+                await aw.release_task({})
+            except httpx.HTTPStatusError:
+                pass
+        finally:
+            await aw.close_client()
+
+    asyncio.run(go())
+    assert calls == {"GET": 3, "POST": 1}
+    assert aw.pool_stats()["retries"] == 2
+
+
+def test_breaker_opens_fails_fast_and_recovers(monkeypatch):
+    _fresh_circuit(monkeypatch)
+    monkeypatch.setattr(aw, "_BREAKER_THRESHOLD", 2)
+    monkeypatch.setattr(aw, "_BREAKER_COOLDOWN", 30.0)
+    healthy = {"up": False}
+    hits = []
+
+    def handler(request):
+        hits.append(request.url.path)
+        if not healthy["up"]:
+            raise httpx.ConnectError("refused")
+        return httpx.Response(200, json={"status": "ok"})
+
+    async def go():
+        monkeypatch.setattr(aw, "_client", _mock_client(handler))
+        try:
+            for _ in range(2):
+                try:
+                    await aw.training_stop()
+                except httpx.ConnectError:
+                    pass
+            assert aw.circuit_state()["state"] == "open"
+            try:
+                await aw.training_stop()
+            except aw.AceStepUnavailable as exc:
+                assert exc.retry_after >= 1
+            assert len(hits) == 2  # failed fast, AceStep not contacted
+
+            # Cooldown elapsed — one probe goes through and closes the breaker
+            aw._circuit["opened_at"] -= 31
+            healthy["up"] = True
+            await aw.training_stop()
+        finally:
+            await aw.close_client()
+
+    asyncio.run(go())
+    assert aw.circuit_state() == {"state": "closed", "failures": 0, "trips": 1}
+
+
+def test_client_errors_do_not_trip_breaker(monkeypatch):
+    _fresh_circuit(monkeypatch)
+    monkeypatch.setattr(aw, "_BREAKER_THRESHOLD", 1)
+
+    async def go():
+        monkeypatch.setattr(aw, "_client", _mock_client(lambda r: httpx.Response(422)))
+        try:
+            await aw.lora_load("/nope")
+        except httpx.HTTPStatusError:
+            pass
+        finally:
+            await aw.close_client()
+
+    asyncio.run(go())
+    assert aw.circuit_state()["state"] == "closed"
+
+
+def _fresh_cache(monkeypatch):
+    monkeypatch.setattr(aw, "_cache", {})
+    monkeypatch.setattr(aw, "_cache_inflight", {})
+    monkeypatch.setattr(aw, "_cache_gen", {})
+
+
+def test_status_reads_are_single_flight_and_cached(monkeypatch):
+    _fresh_circuit(monkeypatch)
+    _fresh_cache(monkeypatch)
+    hits = []
+
+    async def slow_handler(request):
+        hits.append(request.url.path)
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"loaded": len(hits)})
+
+    async def go():
+        monkeypatch.setattr(aw, "_client", _mock_client(slow_handler))
+        try:
+            first = await asyncio.gather(*(aw.lora_status() for _ in range(10)))
+            again = await aw.lora_status()  # within TTL
+            first[0]["locked_by"] = "x"     # callers get private copies
+            await aw.lora_toggle(False)     # mutation invalidates
+            after = await aw.lora_status()
+            return first, again, after
+        finally:
+            await aw.close_client()
+
+    first, again, after = asyncio.run(go())
+    assert hits == ["/v1/lora/status", "/v1/lora/toggle", "/v1/lora/status"]
+    assert all(r.get("loaded") == 1 for r in first)
+    assert again == {"loaded": 1}
+    assert after == {"loaded": 3}
+
+
+def test_only_unknown_task_failures_are_flagged_lost():
+    unknown = {"task_id": "t", "status": 2, "result": None, "error": "Task not found"}
+    failed = {"task_id": "t", "status": 2, "result": None, "error": "CUDA out of memory"}
+    assert aw._parse_entry(unknown) == {"status": "error", "results": None, "lost": True}
+    assert aw._parse_entry(failed) == {"status": "error", "results": None}
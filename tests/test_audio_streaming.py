@@ -0,0 +1,56 @@
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+import acestep_wrapper as aw
+import main as backend_main
+from fastapi.testclient import TestClient
+
+
+def _job(audio_url):
+    return {"results": [{"audio_url": audio_url}], "params": {}, "format": "wav",
+            "user": "local", "created_at": time.monotonic()}
+
+
+def test_download_local_file_supports_range(tmp_path, monkeypatch):
+    src = tmp_path / "take-1.wav"
+    src.write_bytes(b"0123456789")
+    monkeypatch.setitem(backend_main._jobs, "dl-local-job", _job(str(src)))
+
+    client = TestClient(backend_main.app)
+    resp = client.get("/download/dl-local-job/0/audio", headers={"Range": "bytes=2-5"})
+    assert resp.status_code == 206
+    assert resp.content == b"2345"
+    assert resp.headers["content-disposition"].startswith("attachment;")
+    assert 'filename="acestep-dl-local-1.wav"' in resp.headers["content-disposition"]
+
+
+def test_download_proxies_range_from_acestep(monkeypatch):
+    seen = {}
+
+    async def body():
+        yield b"ab"
+        yield b"c"
+
+    def handler(request):
+        seen["range"] = request.headers.get("range")
+        return httpx.Response(
+            206, content=body(),
+            headers={"content-type": "audio/wav", "content-range": "bytes 0-2/100",
+                     "accept-ranges": "bytes"},
+        )
+
+    monkeypatch.setattr(aw, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setitem(backend_main._jobs, "dl-remote-job",
+                        _job("/v1/audio?path=%2Fnowhere%2Fgen.wav"))
+
+    client = TestClient(backend_main.app)
+    resp = client.get("/download/dl-remote-job/0/audio", headers={"Range": "bytes=0-2"})
+    assert seen["range"] == "bytes=0-2"
+    assert resp.status_code == 206
+    assert resp.content == b"abc"
+    assert resp.headers["content-range"] == "bytes 0-2/100"
+    assert "attachment" in resp.headers["content-disposition"]
@@ -0,0 +1,154 @@
+import asyncio
+import json
+import sys
+from collections import OrderedDict
+from pathlib import Path
+
+import httpx
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+import acestep_wrapper as aw
+
+
+class _FakeBackend:
+    """Minimal AceStep: hands out ids prefixed with its name, reports every
+    task done with an audio path of its own, and can be taken down."""
+
+    def __init__(self, name):
+        self.name = name
+        self.up = True
+        self.seen = []
+        self.count = 0
+
+    def __call__(self, request):
+        path = request.url.path
+        self.seen.append(path)
+        if not self.up:
+            return httpx.Response(503)
+        if path == "/release_task":
+            self.count += 1
+            return httpx.Response(200, json={"data": {"task_id": f"{self.name}-{self.count}"}})
+        if path == "/query_result":
+            ids = json.loads(request.content)["task_id_list"]
+            return httpx.Response(200, json={"data": [
+                {"task_id": t, "status": 1,
+                 "result": json.dumps([{"file": f"/v1/audio?path=/out/{t}.wav"}])}
+                for t in ids
+            ]})
+        return httpx.Response(200, json={"status": "ok"})
+
+
+@pytest.fixture
+def backends(monkeypatch):
+    fakes = [_FakeBackend(n) for n in ("a", "b", "c")]
+    pool = [aw._Backend(0)] + [aw._Backend(i, f"http://gpu{i}") for i in (1, 2)]
+    monkeypatch.setattr(aw, "_backends", pool)
+    monkeypatch.setattr(aw, "_circuit", aw._new_circuit())
+    monkeypatch.setattr(aw, "_RETRY_BASE_S", 0.0)
+    monkeypatch.setattr(aw, "_task_backend", OrderedDict())
+    monkeypatch.setattr(aw, "_task_open", set())
+    monkeypatch.setattr(aw, "_path_backend", OrderedDict())
+    monkeypatch.setattr(aw, "_client", httpx.AsyncClient(transport=httpx.MockTransport(fakes[0])))
+    for b, fake in zip(pool[1:], fakes[1:]):
+        b.client = httpx.AsyncClient(transport=httpx.MockTransport(fake))
+    return fakes
+
+
+def test_burst_spreads_and_polls_follow_their_backend(backends):
+    async def go():
+        try:
+            ids = await asyncio.gather(*(aw.release_task({"prompt": "p"}) for _ in range(6)))
+            loads = [b.active for b in aw._backends]
+            results = await aw.query_results(ids)
+            stream = await aw.open_audio_stream(results["c-1"]["results"][0]["audio_url"])
+            await stream.aclose()
+            return ids, loads, results
+        finally:
+            await aw.close_client()
+
+    ids, loads, results = asyncio.run(go())
+    assert loads == [2, 2, 2]
+    assert sorted(ids) == ["a-1", "a-2", "b-1", "b-2", "c-1", "c-2"]
+    assert all(r["status"] == "done" for r in results.values())
+    # One batched poll per backend, and the audio fetch went to the owner
+    assert [f.seen.count("/query_result") for f in backends] == [1, 1, 1]
+    assert backends[2].seen[-1] == "/v1/audio"
+    assert [b.active for b in aw._backends] == [0, 0, 0]
+
+
+def test_unhealthy_backend_is_ejected_and_readmitted(backends):
+    async def go():
+        try:
+            first = await asyncio.gather(*(aw.release_task({}) for _ in range(3)))
+            backends[1].up = False
+            await aw.check_backends()
+            ejected = [b.admitted for b in aw._backends]
+            later = await asyncio.gather(*(aw.release_task({}) for _ in range(4)))
+            # The dead backend's tasks drop out; the others still answer
+            partial = await aw.query_results(first)
+            backends[1].up = True
+            # Its breaker tripped too; a passing probe closes it at once
+            await aw.check_backends()
+            return ejected, later, partial
+        finally:
+            await aw.close_client()
+
+    ejected, later, partial = asyncio.run(go())
+    assert ejected == [True, False, True]
+    assert not any(t.startswith("b-") for t in later)
+    assert sorted(partial) == ["a-1", "c-1"]
+    assert [b.admitted for b in aw._backends] == [True, True, True]
+    assert aw._backends[1].ejections == 1
+
+
+def test_lora_changes_reach_every_backend(backends):
+    async def go():
+        try:
+            await aw.lora_load("/loras/style")
+        finally:
+            await aw.close_client()
+
+    asyncio.run(go())
+    assert all(f.seen == ["/v1/lora/load"] for f in backends)
+
+
+def test_partial_lora_change_still_drops_cached_status(backends, monkeypatch):
+    monkeypatch.setattr(aw, "_cache", {"/v1/lora/status": (float("inf"), {"loaded": False})})
+    backends[2].up = False
+
+    async def go():
+        try:
+            await aw.lora_load("/loras/style")
+        except httpx.HTTPStatusError:
+            pass
+        finally:
+            await aw.close_client()
+
+    asyncio.run(go())
+    # Backends a and b loaded it; their old state must not be served
+    assert "/v1/lora/status" not in aw._cache
+
+
+def test_instance_change_is_reported_as_restart(backends):
+    identity = {"id": "first"}
+
+    def health(request):
+        return httpx.Response(200, json={"data": {"status": "ok", "instance_id": identity["id"]}})
+
+    async def go():
+        aw._backends[0].client = None
+        aw._backends[1].client = httpx.AsyncClient(transport=httpx.MockTransport(health))
+        try:
+            first = await aw.check_backends()
+            seen = aw._backends[1].seen_at
+            identity["id"] = "second"
+            second = await aw.check_backends()
+            return first, seen, second
+        finally:
+            await aw.close_client()
+
+    first, seen, second = asyncio.run(go())
+    assert first == {}
+    assert second == {1: seen}
+    assert aw.backend_stats()[1]["restarts"] == 1
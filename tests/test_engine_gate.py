@@ -0,0 +1,444 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+import takes
+import main as backend_main
+
+
+@pytest.fixture
+def gate(tmp_path, monkeypatch):
+    monkeypatch.setattr(takes, "TAKES_DIR", tmp_path)
+    monkeypatch.setattr(backend_main, "_pending", {})
+    monkeypatch.setattr(backend_main, "_jobs", {})
+    monkeypatch.setattr(backend_main, "_queue_order", backend_main.JobQueue())
+    monkeypatch.setattr(backend_main, "_waiting", backend_main.LaneQueue())
+    monkeypatch.setattr(backend_main, "_engine_ready", True)
+    monkeypatch.setattr(backend_main, "_drain_task", None)
+    monkeypatch.setattr(backend_main, "_expiry", backend_main.DeadlineHeap())
+    monkeypatch.setattr(backend_main, "_idempotency", {})
+    monkeypatch.setattr(backend_main, "_cancelled", backend_main.OrderedDict())
+    monkeypatch.setattr(backend_main, "_discarding", {})
+    monkeypatch.setattr(backend_main, "_fusable", {})
+    monkeypatch.setattr(backend_main, "_fused_members", {})
+    engine = {"up": False, "submitted": []}
+
+    async def fake_release(payload, backend=None):
+        if not engine["up"]:
+            raise httpx.ConnectError("connection refused")
+        engine["submitted"].append(payload)
+        return f"up-{len(engine['submitted'])}"
+
+    monkeypatch.setattr(backend_main, "release_task", fake_release)
+    return engine
+
+
+def _client():
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=backend_main.app),
+                             base_url="http://wrangler")
+
+
+def test_requests_are_held_then_submitted_in_order(gate, tmp_path, monkeypatch):
+    audio = tmp_path / "gen.mp3"
+    audio.write_bytes(b"audio")
+
+    async def fake_query(tids):
+        return {t: {"status": "done", "results": [{"audio_url": str(audio), "meta": {}}]}
+                for t in tids}
+
+    monkeypatch.setattr(backend_main, "query_results", fake_query)
+
+    async def go():
+        async with _client() as client:
+            first = (await client.post("/generate", json={"style": "one"})).json()
+            second = (await client.post("/generate", json={"style": "two"})).json()
+            held = (await client.get(f"/status/{first['task_id']}")).json()
+            gate["up"] = True
+            backend_main._set_engine_ready(True)
+            await backend_main._drain_task
+            mapped = backend_main._pending[second["task_id"]]["upstream_id"]
+            await backend_main._watch_pending_jobs_once()
+            done = (await client.get(f"/status/{first['task_id']}")).json()
+        return first, second, held, mapped, done
+
+    first, second, held, mapped, done = asyncio.run(go())
+    assert first["status"] == second["status"] == "waiting"
+    assert held["status"] == "waiting" and held["reason"] == "waiting for engine"
+    assert held["queue_position"] == 0 and held["eta_seconds"] is None
+    # Submitted in arrival order; the client's id now resolves to AceStep's
+    assert [p["prompt"].split(",")[0] for p in gate["submitted"]] == ["one", "two"]
+    assert mapped == "up-2"
+    assert done["status"] == "done"
+    assert takes.audio_path_for(first["task_id"], 0) is not None
+
+
+def test_wait_queue_is_bounded(gate, monkeypatch):
+    monkeypatch.setattr(backend_main, "ENGINE_WAIT_QUEUE_SIZE", 1)
+
+    async def go():
+        async with _client() as client:
+            ok = await client.post("/generate", json={})
+            full = await client.post("/generate", json={})
+        return ok, full
+
+    ok, full = asyncio.run(go())
+    assert ok.status_code == 200
+    assert full.status_code == 503 and "Retry-After" in full.headers
+
+
+def test_lost_jobs_are_resubmitted_with_their_seed_then_capped(gate, monkeypatch):
+    monkeypatch.setattr(backend_main, "JOB_MAX_RESUBMITS", 1)
+    gate["up"] = True
+
+    async def forgotten(tids):
+        return {t: {"status": "error", "results": None, "lost": True} for t in tids}
+
+    monkeypatch.setattr(backend_main, "query_results", forgotten)
+
+    async def go():
+        async with _client() as client:
+            task_id = (await client.post("/generate", json={"style": "s", "seed": 1234})).json()["task_id"]
+        backend_main._pending[task_id]["next_check"] = 0.0
+        await backend_main._watch_pending_jobs_once()     # AceStep forgot it → resubmit
+        await backend_main._drain_task
+        remapped = backend_main._pending[task_id]["upstream_id"]
+        backend_main._pending[task_id]["next_check"] = 0.0
+        await backend_main._watch_pending_jobs_once()     # forgotten again → give up
+        return task_id, remapped
+
+    task_id, remapped = asyncio.run(go())
+    assert task_id == "up-1" and remapped == "up-2"
+    assert [p["seed"] for p in gate["submitted"]] == [1234, 1234]
+    assert task_id not in backend_main._pending and not backend_main._waiting
+
+
+def test_restart_requeues_only_jobs_the_old_instance_had(gate, monkeypatch):
+    gate["up"] = True
+    monkeypatch.setattr(backend_main, "backend_of", lambda upstream_id: 0)
+
+    async def go():
+        async with _client() as client:
+            old = (await client.post("/generate", json={})).json()["task_id"]
+            backend_main._pending[old]["created_at"] -= 10
+            new = (await client.post("/generate", json={})).json()["task_id"]
+            backend_main._pending[new]["next_check"] = 1e12
+            seen_at = backend_main._pending[new]["created_at"] - 5
+            backend_main._recover_restarted({0: seen_at})
+            await backend_main._drain_task
+        return old, new
+
+    old, new = asyncio.run(go())
+    assert backend_main._pending[old]["upstream_id"] == "up-3"
+    assert backend_main._pending[old]["resubmits"] == 1
+    assert backend_main._pending[new].get("upstream_id", new) == new
+    assert backend_main._pending[new]["next_check"] == 0.0
+
+
+def test_held_job_that_fails_to_submit_reports_why(gate, monkeypatch):
+    monkeypatch.setattr(backend_main, "_engine_ready", False)
+
+    async def rejected(payload, backend=None):
+        raise ValueError("bad payload")
+
+    async def unknown_to_acestep(task_id):
+        raise AssertionError("AceStep never saw this id")
+
+    monkeypatch.setattr(backend_main, "release_task", rejected)
+    monkeypatch.setattr(backend_main, "query_result", unknown_to_acestep)
+
+    async def go():
+        async with _client() as client:
+            task_id = (await client.post("/generate", json={})).json()["task_id"]
+            backend_main._set_engine_ready(True)
+            await backend_main._drain_task
+            return (await client.get(f"/status/{task_id}")).json()
+
+    status = asyncio.run(go())
+    assert status["status"] == "error" and status["reason"] == "submit failed: bad payload"
+
+
+def test_in_flight_cap_dispatches_users_round_robin(gate, monkeypatch):
+    monkeypatch.setattr(backend_main, "DISPATCH_IN_FLIGHT_PER_BACKEND", 1)
+    monkeypatch.setattr(backend_main, "backend_count", lambda: 1)
+    monkeypatch.setattr(backend_main, "MAX_JOBS_PER_USER", 10)
+    gate["up"] = True
+
+    async def go():
+        async with _client() as client:
+            async def submit(user, style):
+                r = await client.post("/generate", json={"style": style},
+                                      headers={"x-auth-user": user})
+                return r.json()["task_id"]
+
+            first = await submit("alice", "a1")
+            flood = [await submit("alice", f"a{i}") for i in (2, 3, 4)]
+            bob = await submit("bob", "b1")
+            bob_status = (await client.get(f"/status/{bob}", headers={"x-auth-user": "bob"})).json()
+            running = first
+            for _ in range(4):   # each finished job frees the single slot
+                backend_main._finalize_job(running, {"status": "error", "reason": "done"})
+                await backend_main._drain_task
+                running = next(iter(backend_main._queue_order))[0]
+        return flood, bob_status
+
+    flood, bob_status = asyncio.run(go())
+    assert bob_status["status"] == "queued" and bob_status["reason"] == "waiting for a dispatch slot"
+    # One in flight, then alice's next job, then bob's turn
+    assert bob_status["queue_position"] == 2
+    assert [p["prompt"].split(",")[0] for p in gate["submitted"]] == ["a1", "a2", "b1", "a3", "a4"]
+
+
+def test_previews_skip_ahead_of_held_renders(gate, monkeypatch):
+    monkeypatch.setattr(backend_main, "DISPATCH_IN_FLIGHT_PER_BACKEND", 2)
+    monkeypatch.setattr(backend_main, "backend_count", lambda: 1)
+    monkeypatch.setattr(backend_main, "_runtime", backend_main.eta.RuntimePredictor())
+    gate["up"] = True
+    render = {"style": "render", "duration": 600, "inference_steps_raw": 100, "gen_model": "sft"}
+    preview = {"style": "preview", "duration": 15, "inference_steps_raw": 20}
+
+    async def go():
+        async with _client() as client:
+            first = (await client.post("/generate", json=render)).json()
+            held = (await client.post("/generate", json=render)).json()
+            quick = (await client.post("/generate", json=preview)).json()
+            await backend_main._drain_task
+            status = (await client.get(f"/status/{held['task_id']}")).json()
+            backend_main._finalize_job(first["task_id"], {"status": "error", "reason": "done"})
+            backend_main._finalize_job(quick["task_id"], {"status": "error", "reason": "done"})
+            await backend_main._drain_task
+        return held, quick, status
+
+    held, quick, status = asyncio.run(go())
+    # The second render may not take the last slot; the preview may
+    assert held["lane"] == "bulk" and quick["lane"] == "interactive"
+    assert status["status"] == "queued" and status["lane"] == "bulk"
+    assert [p["prompt"] for p in gate["submitted"]] == ["render", "preview", "render"]
+
+
+def test_identical_held_requests_share_one_batch(gate, tmp_path, monkeypatch):
+    monkeypatch.setattr(backend_main, "DISPATCH_IN_FLIGHT_PER_BACKEND", 1)
+    monkeypatch.setattr(backend_main, "backend_count", lambda: 1)
+    monkeypatch.setattr(backend_main, "MAX_JOBS_PER_USER", 10)
+    gate["up"] = True
+
+    async def fake_query(tids):
+        done = {}
+        for t in tids:
+            payload = gate["submitted"][int(t.split("-")[1]) - 1]
+            results = []
+            for i in range(payload["batch_size"]):
+                audio = tmp_path / f"{t}-{i}.mp3"
+                audio.write_bytes(b"audio")
+                results.append({"audio_url": str(audio), "meta": {}, "seed_value": str(i)})
+            done[t] = {"status": "done", "results": results}
+        return done
+
+    monkeypatch.setattr(backend_main, "query_results", fake_query)
+    same = {"style": "lofi", "lyrics": "la"}
+
+    async def go():
+        async with _client() as client:
+            async def submit(body, user="alice"):
+                r = await client.post("/generate", json=body, headers={"x-auth-user": user})
+                return r.json()["task_id"]
+
+            running = await submit({"style": "first"})
+            a = await submit(same)
+            b = await submit({**same, "batch_size": 2}, user="bob")
+            other = await submit({**same, "style": "jazz"})
+            c = await submit(same)
+            backend_main._finalize_job(running, {"status": "error", "reason": "done"})
+            await backend_main._drain_task
+            member = (await client.get(f"/status/{c}", headers={"x-auth-user": "alice"})).json()
+            backend_main._pending[a]["next_check"] = 0.0
+            await backend_main._watch_pending_jobs_once()
+        return a, b, c, other, member
+
+    a, b, c, other, member = asyncio.run(go())
+    fused = gate["submitted"][1]
+    assert fused["prompt"] == "lofi" and fused["batch_size"] == 4 and fused["use_random_seed"]
+    assert member["status"] == "processing" and member["queue_position"] == 0
+    # Each job gets its own slice of the batch, as its own takes
+    seeds = {t: [takes.read_take(t, i)["seed_used"]
+                 for i in range(len(backend_main._jobs[t]["results"]))] for t in (a, b, c)}
+    assert seeds == {a: [0], b: [1, 2], c: [3]}
+    assert backend_main._jobs[b]["user"] == "bob"
+    # The jazz request isn't compatible and goes out on its own next
+    assert [p["prompt"] for p in gate["submitted"]] == ["first", "lofi", "jazz"]
+    assert other in backend_main._queue_order
+
+
+def test_fused_members_still_count_against_the_job_limit(gate, monkeypatch):
+    alice = {"x-auth-user": "alice"}
+
+    async def go():
+        async with _client() as client:
+            ids = [(await client.post("/generate", json={"style": "same"},
+                                      headers=alice)).json()["task_id"] for _ in range(2)]
+            gate["up"] = True
+            backend_main._set_engine_ready(True)
+            await backend_main._drain_task
+            assert backend_main._pending[ids[1]]["fused_into"] == ids[0]
+            session = (await client.get("/api/session", headers=alice)).json()
+            third = await client.post("/generate", json={"style": "same"}, headers=alice)
+            backend_main._cancel_job(ids[1], running=False)
+            after_cancel = (await client.get("/api/session", headers=alice)).json()
+        return session, third, after_cancel
+
+    session, third, after_cancel = asyncio.run(go())
+    assert len(gate["submitted"]) == 1 and gate["submitted"][0]["batch_size"] == 2
+    assert session["pending_jobs"] == 2
+    assert third.status_code == 429
+    assert after_cancel["pending_jobs"] == 1 and not backend_main._fused_members
+
+
+def test_lost_batch_is_split_back_into_its_jobs(gate, monkeypatch):
+    monkeypatch.setattr(backend_main, "DISPATCH_IN_FLIGHT_PER_BACKEND", 1)
+    monkeypatch.setattr(backend_main, "backend_count", lambda: 1)
+    gate["up"] = True
+
+    async def go():
+        async with _client() as client:
+            running = (await client.post("/generate", json={"style": "first"})).json()["task_id"]
+            ids = [(await client.post("/generate", json={"style": "same"})).json()["task_id"]
+                   for _ in range(2)]
+        backend_main._finalize_job(running, {"status": "error", "reason": "done"})
+        await backend_main._drain_task
+        assert backend_main._pending[ids[1]]["fused_into"] == ids[0]
+        monkeypatch.setattr(backend_main, "_engine_ready", False)
+        backend_main._requeue_orphans([ids[0]], "task unknown to AceStep")
+        return ids
+
+    ids = asyncio.run(go())
+    assert [t for t, _ in backend_main._waiting] == ids
+    for t in ids:
+        assert backend_main._pending[t]["upstream_id"] is None
+        assert "fused" not in backend_main._pending[t] and "fused_into" not in backend_main._pending[t]
+
+
+def test_idempotency_key_returns_the_first_task(gate, monkeypatch):
+    gate["up"] = True
+    release = asyncio.Event()
+    plain_release = backend_main.release_task
+
+    async def slow_release(payload, backend=None):
+        await release.wait()
+        return await plain_release(payload, backend)
+
+    monkeypatch.setattr(backend_main, "release_task", slow_release)
+
+    async def go():
+        async with _client() as client:
+            def post(body, key="k-1", user="alice"):
+                return client.post("/generate", json=body,
+                                   headers={"x-auth-user": user, "idempotency-key": key})
+
+            first = asyncio.create_task(post({"style": "s"}))
+            retry = asyncio.create_task(post({"style": "s"}))   # while release_task is in flight
+            await asyncio.sleep(0.05)
+            release.set()
+            first, retry = await first, await retry
+            later = await post({"style": "s"})
+            mismatch = await post({"style": "other"})
+            bob = await post({"style": "s"}, user="bob")
+        return first, retry, later, mismatch, bob
+
+    first, retry, later, mismatch, bob = asyncio.run(go())
+    assert first.json()["task_id"] == retry.json()["task_id"] == later.json()["task_id"] == "up-1"
+    assert retry.headers["idempotent-replayed"] == "true" and "idempotent-replayed" not in first.headers
+    assert mismatch.status_code == 422
+    assert bob.json()["task_id"] == "up-2" and len(gate["submitted"]) == 2
+
+    deadline = max(e["created_at"] for e in backend_main._idempotency.values()) \
+        + backend_main.IDEMPOTENCY_TTL_MIN * 60
+    assert backend_main._expire_due(deadline)["idempotency_keys"] == 2
+    assert not backend_main._idempotency
+
+
+def test_cancelled_jobs_leave_the_queue_and_their_audio_is_discarded(gate, tmp_path, monkeypatch):
+    monkeypatch.setattr(backend_main, "DISPATCH_IN_FLIGHT_PER_BACKEND", 1)
+    monkeypatch.setattr(backend_main, "backend_count", lambda: 1)
+    gate["up"] = True
+    tmp_audio = tmp_path / ".cache" / "acestep" / "tmp" / "up-1.mp3"
+    tmp_audio.parent.mkdir(parents=True)
+    tmp_audio.write_bytes(b"audio")
+    asked = []
+
+    async def no_cancel_route(upstream_id):
+        asked.append(upstream_id)
+        return False
+
+    async def fake_query(tids):
+        return {t: {"status": "done", "results": [{"audio_url": str(tmp_audio), "meta": {}}]}
+                for t in tids}
+
+    monkeypatch.setattr(backend_main, "cancel_task", no_cancel_route)
+    monkeypatch.setattr(backend_main, "query_results", fake_query)
+    alice = {"x-auth-user": "alice"}
+
+    async def go():
+        async with _client() as client:
+            running = (await client.post("/generate", json={"style": "a"}, headers=alice)).json()
+            held = (await client.post("/generate", json={"style": "b"}, headers=alice)).json()
+            not_hers = await client.delete(f"/jobs/{held['task_id']}", headers={"x-auth-user": "bob"})
+            dropped = (await client.delete(f"/jobs/{held['task_id']}", headers=alice)).json()
+            discarding = (await client.delete(f"/jobs/{running['task_id']}", headers=alice)).json()
+            # Neither counts against the limit any more; AceStep is still busy
+            later = (await client.post("/generate", json={"style": "c"}, headers=alice)).json()
+            status = (await client.get(f"/status/{running['task_id']}")).json()
+            backend_main._pending[running["task_id"]]["next_check"] = 0.0
+            await backend_main._watch_pending_jobs_once()
+            await backend_main._drain_task
+            finished = await client.delete(f"/jobs/{running['task_id']}", headers=alice)
+        return running, held, not_hers, dropped, discarding, later, status, finished
+
+    running, held, not_hers, dropped, discarding, later, status, finished = asyncio.run(go())
+    assert not_hers.status_code == 404
+    assert dropped == {"task_id": held["task_id"], "status": "cancelled", "running_upstream": False}
+    assert discarding["running_upstream"] is True and asked == ["up-1"]
+    assert later["status"] == "queued" and status["status"] == "cancelled"
+    # AceStep finished the cancelled job: its audio is gone and no take was kept
+    assert not tmp_audio.exists() and takes.audio_path_for(running["task_id"], 0) is None
+    assert running["task_id"] not in backend_main._pending and not backend_main._discarding
+    assert [p["prompt"] for p in gate["submitted"]] == ["a", "c"]
+    assert finished.status_code == 200 and finished.json()["running_upstream"] is False
+
+
+def test_job_cancelled_during_its_submit_is_still_discarded(gate, monkeypatch):
+    monkeypatch.setattr(backend_main, "_engine_ready", False)
+    job = {}
+
+    async def cancel_mid_submit(payload, backend=None):
+        backend_main._cancel_job(job["task_id"], running=False)   # DELETE lands meanwhile
+        return "up-1"
+
+    async def no_cancel_route(upstream_id):
+        return False
+
+    async def fake_query(tids):
+        return {t: {"status": "done", "results": []} for t in tids}
+
+    monkeypatch.setattr(backend_main, "release_task", cancel_mid_submit)
+    monkeypatch.setattr(backend_main, "cancel_task", no_cancel_route)
+    monkeypatch.setattr(backend_main, "query_results", fake_query)
+
+    async def go():
+        async with _client() as client:
+            job["task_id"] = (await client.post("/generate", json={})).json()["task_id"]
+            backend_main._set_engine_ready(True)
+            await backend_main._drain_task
+            tracked = dict(backend_main._pending[job["task_id"]])
+            status = (await client.get(f"/status/{job['task_id']}")).json()
+            await backend_main._watch_pending_jobs_once()
+        return tracked, status
+
+    tracked, status = asyncio.run(go())
+    # AceStep's task is polled until it finishes, then dropped
+    assert tracked["cancelled"] and tracked["upstream_id"] == "up-1"
+    assert status["status"] == "cancelled"
+    assert job["task_id"] not in backend_main._pending and not backend_main._queue_order
+    assert not backend_main._discarding
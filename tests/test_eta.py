@@ -0,0 +1,65 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+import eta
+import main as backend_main
+from fastapi.testclient import TestClient
+
+
+def _features(steps, duration=30.0, batch=1, gen="turbo", lm="1.7b"):
+    return {"gen_model": gen, "lm_model": lm, "task_type": "text2music",
+            "steps": steps, "duration": duration, "batch_size": batch}
+
+
+def test_predictor_learns_overhead_plus_rate():
+    p = eta.RuntimePredictor()
+    for steps in (20, 40, 100, 20, 40, 100):
+        # true model: 5s overhead + 0.004 s per step·second
+        p.observe(_features(steps), 5.0 + 0.004 * steps * 30.0)
+    assert abs(p.predict(_features(60)) - (5.0 + 0.004 * 60 * 30.0)) < 0.01
+    # Unseen LM size falls back to the (gen_model, task_type) fit
+    assert abs(p.predict(_features(60, lm="4b")) - (5.0 + 0.004 * 60 * 30.0)) < 0.01
+    # Unseen gen_model falls back to the global fit, doubling with batch
+    assert p.predict(_features(40, batch=2, gen="sft")) > p.predict(_features(40, gen="sft"))
+
+
+def test_watcher_checks_only_due_jobs_and_reschedules(monkeypatch):
+    now = time.monotonic()
+    monkeypatch.setattr(backend_main, "_pending", {
+        "due": {"params": {"quality": 0}, "user": "u", "created_at": now - 30,
+                "next_check": now - 1},
+        "later": {"params": {"quality": 2}, "user": "u", "created_at": now,
+                  "next_check": now + 60},
+    })
+    monkeypatch.setattr(backend_main, "_queue_order", backend_main.JobQueue([("due", "u"), ("later", "u")]))
+    asked = []
+
+    async def fake_query(tids):
+        asked.append(sorted(tids))
+        return {t: {"status": "processing", "results": None} for t in tids}
+
+    monkeypatch.setattr(backend_main, "query_results", fake_query)
+    asyncio.run(backend_main._watch_pending_jobs_once())
+
+    assert asked == [["due"]]
+    # "due" is overdue, so it backs off but stays within the watcher bounds;
+    # "later" is rescheduled near its predicted finish behind "due".
+    for p in backend_main._pending.values():
+        assert backend_main.WATCH_MIN_INTERVAL_S <= p["next_check"] - now \
+            <= backend_main.WATCH_MAX_INTERVAL_S + 1
+
+
+def test_status_reports_wait_and_eta(monkeypatch):
+    now = time.monotonic()
+    monkeypatch.setattr(backend_main, "_pending", {
+        "first": {"params": {}, "user": "u", "created_at": now, "predicted_s": 20.0},
+        "second": {"params": {}, "user": "u", "created_at": now, "predicted_s": 30.0},
+    })
+    monkeypatch.setattr(backend_main, "_queue_order", backend_main.JobQueue([("first", "u"), ("second", "u")]))
+    body = TestClient(backend_main.app).get("/status/second").json()
+    assert body["queue_position"] == 1
+    assert 19.0 <= body["expected_wait_seconds"] <= 20.0
+    assert 49.0 <= body["eta_seconds"] <= 50.0
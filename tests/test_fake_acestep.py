@@ -0,0 +1,41 @@
+import asyncio
+import sys
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+sys.path.insert(0, str(Path(__file__).parent.parent / "benchmarks"))
+import acestep_wrapper as aw
+import fake_acestep
+
+
+def test_wrapper_round_trip_against_simulated_acestep(tmp_path, monkeypatch):
+    app = fake_acestep.create_app(gen_time="fixed:0", output_dir=str(tmp_path))
+
+    async def go():
+        monkeypatch.setattr(aw, "_client", httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app)))
+        try:
+            task_id = await aw.release_task({"prompt": "p", "audio_format": "wav",
+                                             "batch_size": 2, "seed": 5,
+                                             "use_random_seed": False})
+            queued = await aw.query_results([task_id])
+            await app.state.render(task_id)
+            done = await aw.query_results([task_id])
+            # An id from before a restart: AceStep's own "Task not found" answer
+            forgotten = await aw.query_results(["from-before-a-restart"])
+            lora = await aw.lora_load("/loras/x")
+            return task_id, queued, done, forgotten, lora
+        finally:
+            await aw.close_client()
+
+    task_id, queued, done, forgotten, lora = asyncio.run(go())
+    assert queued[task_id]["status"] == "processing"
+    results = done[task_id]["results"]
+    assert len(results) == 2 and results[0]["seed_value"] == "5"
+    path = parse_qs(urlparse(results[0]["audio_url"]).query)["path"][0]
+    assert Path(path).is_file()
+    assert forgotten["from-before-a-restart"]["lost"] is True
+    assert lora["data"]["loaded"] is True
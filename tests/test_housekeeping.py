@@ -6,6 +6,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
 import takes
 import main as backend_main
+from fastapi.testclient import TestClient
 
 
 def test_persist_deletes_tmp_source_after_copy(tmp_path, monkeypatch):
@@ -50,3 +51,74 @@ def test_sweep_tmp_audio_deletes_only_old_files(tmp_path):
 
 def test_sweep_tmp_audio_missing_dir_is_noop(tmp_path):
     assert backend_main._sweep_tmp_audio(tmp_path / "nope", ttl_seconds=1) == 0
+
+
+def test_expiry_visits_only_due_entries_and_rechecks_refreshed_ones(monkeypatch):
+    monkeypatch.setattr(backend_main, "_expiry", backend_main.DeadlineHeap())
+    monkeypatch.setattr(backend_main, "_pending", {})
+    monkeypatch.setattr(backend_main, "_resource_locks", {})
+    monkeypatch.setattr(backend_main, "_queue_order", backend_main.JobQueue())
+    monkeypatch.setattr(backend_main, "_waiting", backend_main.LaneQueue())
+    monkeypatch.setattr(backend_main, "JOB_TTL_MIN", 1)
+    published = []
+    monkeypatch.setattr(backend_main, "_publish_positions", lambda: published.append(1))
+
+    for i in range(3):
+        task_id = f"stuck-{i}"
+        backend_main._pending[task_id] = {"params": {}, "user": "idle", "created_at": 0.0,
+                                          "upstream_id": None}
+        backend_main._queue_order.append(task_id, "idle")
+        backend_main._expire_after("pending", task_id, 0.0)
+    for resource, acquired_at in (("lora", 0.0), ("training", 0.0)):
+        backend_main._resource_locks[resource] = {"user": "u", "acquired_at": acquired_at,
+                                                  "action": "a"}
+        backend_main._expire_after("lock", resource, acquired_at)
+    backend_main._resource_locks["training"]["acquired_at"] = 200.0   # refreshed; heap untouched
+
+    evicted = backend_main._expire_due(301.0)
+    assert evicted["pending"] == 3 and evicted["locks"] == 1
+    assert len(backend_main._queue_order) == 0 and published == [1]
+    assert set(backend_main._resource_locks) == {"training"}
+    # The refreshed lock was rescheduled from its new acquired_at
+    assert backend_main._expire_due(499.0)["locks"] == 0
+    assert backend_main._expire_due(501.0)["locks"] == 1
+    assert len(backend_main._expiry) == 0
+
+
+def test_expired_fused_member_leaves_its_leaders_task_counted(monkeypatch):
+    monkeypatch.setattr(backend_main, "_expiry", backend_main.DeadlineHeap())
+    monkeypatch.setattr(backend_main, "_pending", {})
+    monkeypatch.setattr(backend_main, "_queue_order", backend_main.JobQueue())
+    monkeypatch.setattr(backend_main, "JOB_TTL_MIN", 1)
+    settled = []
+    monkeypatch.setattr(backend_main, "settle_task", settled.append)
+    backend_main._pending["leader"] = {"params": {}, "user": "u", "created_at": 250.0,
+                                       "upstream_id": "up-1", "fused": [["leader", 1], ["member", 1]]}
+    backend_main._pending["member"] = {"params": {}, "user": "u", "created_at": 0.0,
+                                       "upstream_id": "up-1", "fused_into": "leader"}
+    backend_main._queue_order.append("leader", "u")
+    backend_main._expire_after("pending", "member", 0.0)
+
+    assert backend_main._expire_due(61.0)["pending"] == 1
+    assert "member" not in backend_main._pending and settled == []
+
+
+def test_sessions_expire_in_last_seen_order_and_cap_admission(monkeypatch):
+    monkeypatch.setattr(backend_main, "_sessions", backend_main.OrderedDict())
+    monkeypatch.setattr(backend_main, "MAX_USERS", 2)
+    monkeypatch.setattr(backend_main, "SESSION_TIMEOUT_MIN", 1)
+    clock = {"now": 1000.0}
+    monkeypatch.setattr(backend_main.time, "monotonic", lambda: clock["now"])
+    client = TestClient(backend_main.app)
+
+    def visit(user, at):
+        clock["now"] = at
+        return client.get("/api/session", headers={"x-auth-user": user})
+
+    assert visit("alice", 1000.0).status_code == 200
+    assert visit("bob", 1010.0).json()["active_users"] == 2
+    assert visit("carol", 1020.0).status_code == 503
+    visit("alice", 1050.0)                      # alice is active again; bob is now the oldest
+    assert visit("carol", 1071.0).status_code == 200   # bob timed out, his slot is free
+    assert list(backend_main._sessions) == ["alice", "carol"]
+    assert backend_main._expire_sessions(1200.0) == 2
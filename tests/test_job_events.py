@@ -0,0 +1,78 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+import takes
+import main as backend_main
+from fastapi.testclient import TestClient
+
+
+def _pending_entry(user):
+    return {
+        "params": {"task_type": "text2music", "seed_mode": "random"},
+        "format": "mp3",
+        "user": user,
+        "created_at": time.monotonic(),
+    }
+
+
+def _drain(queue):
+    items = []
+    while not queue.empty():
+        items.append(queue.get_nowait())
+    return [(event, data) for _, event, data in items]
+
+
+def test_watcher_pushes_done_with_take_refs_and_queue_moves(tmp_path, monkeypatch):
+    monkeypatch.setattr(takes, "TAKES_DIR", tmp_path)
+    src = tmp_path / "gen.mp3"
+    src.write_bytes(b"audio")
+    for tid, user in (("ev-job-1", "alice"), ("ev-job-2", "bob")):
+        backend_main._pending[tid] = _pending_entry(user)
+        backend_main._queue_order.append(tid, user)
+
+    async def fake_query(tids):
+        done = {"status": "done",
+                "results": [{"audio_url": f"/v1/audio?path={src}", "meta": {},
+                             "prompt": "p", "lyrics": "", "seed_value": "3"}]}
+        return {"ev-job-1": done, "ev-job-2": {"status": "processing", "results": None}}
+
+    monkeypatch.setattr(backend_main, "query_results", fake_query)
+    alice, bob = asyncio.Queue(), asyncio.Queue()
+    monkeypatch.setitem(backend_main._subscribers, "alice", {alice})
+    monkeypatch.setitem(backend_main._subscribers, "bob", {bob})
+    try:
+        asyncio.run(backend_main._watch_pending_jobs_once())
+    finally:
+        backend_main._pending.pop("ev-job-2", None)
+        backend_main._queue_order.remove("ev-job-2")
+
+    (event, data), = _drain(alice)
+    assert event == "done" and data["task_id"] == "ev-job-1"
+    assert data["results"][0]["take"] == {"job_id": "ev-job-1", "index": 0}
+    # bob's job moved up; bob never sees alice's job
+    (event, data), = _drain(bob)
+    assert event == "queue_position"
+    assert (data["task_id"], data["queue_position"], data["queue_depth"]) == ("ev-job-2", 0, 1)
+
+
+def test_status_for_tracked_job_does_not_call_acestep(monkeypatch):
+    async def boom(task_id):
+        raise AssertionError("upstream polled")
+
+    monkeypatch.setattr(backend_main, "query_result", boom)
+    monkeypatch.setitem(backend_main._pending, "ev-job-3", _pending_entry("local"))
+    body = TestClient(backend_main.app).get("/status/ev-job-3").json()
+    assert body["status"] == "processing"
+
+
+def test_overflowing_subscriber_is_closed_for_replay(monkeypatch):
+    monkeypatch.setattr(backend_main, "_event_log", {})
+    slow = asyncio.Queue(maxsize=1)
+    monkeypatch.setitem(backend_main._subscribers, "carol", {slow})
+    backend_main._publish("carol", "queued", {"task_id": "a"})
+    backend_main._publish("carol", "queued", {"task_id": "b"})
+    assert slow.get_nowait() is None
+    assert [e[2]["task_id"] for e in backend_main._event_log["carol"]] == ["a", "b"]
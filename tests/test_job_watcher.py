@@ -23,7 +23,7 @@ def test_watcher_finalizes_done_job_without_client_polling(tmp_path, monkeypatch
     src.write_bytes(b"audio")
     task_id = "watched-job-1"
     backend_main._pending[task_id] = _pending_entry()
-    backend_main._queue_order.append((task_id, "local"))
+    backend_main._queue_order.append(task_id, "local")
 
     done = {
         "status": "done",
@@ -31,36 +31,92 @@ def test_watcher_finalizes_done_job_without_client_polling(tmp_path, monkeypatch
                      "prompt": "p", "lyrics": "la la", "seed_value": "7"}],
     }
 
-    async def fake_query(tid):
-        return done
+    async def fake_query(tids):
+        return {tid: done for tid in tids}
 
-    monkeypatch.setattr(backend_main, "query_result", fake_query)
+    monkeypatch.setattr(backend_main, "query_results", fake_query)
     asyncio.run(backend_main._watch_pending_jobs_once())
 
     assert task_id in backend_main._jobs
     assert task_id not in backend_main._pending
-    assert (task_id, "local") not in backend_main._queue_order
+    assert task_id not in backend_main._queue_order
     assert takes.read_take(task_id, 0)["seed_used"] == 7
 
 
+def test_slow_remote_download_does_not_hold_up_other_jobs(tmp_path, monkeypatch):
+    monkeypatch.setattr(takes, "TAKES_DIR", tmp_path)
+    monkeypatch.setattr(backend_main.transfer, "REMOTE", True)
+    for task_id in ("big-job", "small-job"):
+        backend_main._pending[task_id] = _pending_entry()
+        backend_main._queue_order.append(task_id, "local")
+    sizes = {"big-job": [{"audio_url": "big.mp3"}], "small-job": [{"audio_url": "small.mp3"}]}
+    release, polled = asyncio.Event(), []
+
+    async def fake_query(tids):
+        polled.append(sorted(tids))
+        return {t: {"status": "done", "results": sizes[t]} for t in tids}
+
+    async def fake_localize(results):
+        if results[0]["audio_url"] == "big.mp3":
+            await release.wait()
+
+    monkeypatch.setattr(backend_main, "query_results", fake_query)
+    monkeypatch.setattr(backend_main.transfer, "localize", fake_localize)
+
+    async def go():
+        await backend_main._watch_pending_jobs_once()
+        await asyncio.sleep(0)
+        during = ("small-job" in backend_main._jobs, "big-job" in backend_main._jobs)
+        backend_main._pending["big-job"]["next_check"] = 0.0
+        await backend_main._watch_pending_jobs_once()   # not polled again meanwhile
+        release.set()
+        await asyncio.gather(*backend_main._localizing)
+        return during
+
+    assert asyncio.run(go()) == (True, False)
+    assert polled == [["big-job", "small-job"]]
+    assert "big-job" in backend_main._jobs and "big-job" not in backend_main._pending
+
+
+def test_job_cancelled_while_acestep_is_asked_is_skipped(tmp_path, monkeypatch):
+    monkeypatch.setattr(takes, "TAKES_DIR", tmp_path)
+    monkeypatch.setattr(backend_main.transfer, "REMOTE", True)
+    backend_main._pending["gone-job"] = _pending_entry()
+
+    async def fake_query(tids):
+        backend_main._pending.pop("gone-job")   # a DELETE landed during the await
+        return {t: {"status": "done", "results": [{"audio_url": "gone.mp3"}]} for t in tids}
+
+    monkeypatch.setattr(backend_main, "query_results", fake_query)
+    asyncio.run(backend_main._watch_pending_jobs_once())
+    assert "gone-job" not in backend_main._jobs and not backend_main._localizing
+
+
 def test_watcher_survives_errors_and_skips_processing(tmp_path, monkeypatch):
     monkeypatch.setattr(takes, "TAKES_DIR", tmp_path)
-    backend_main._pending["broken-job"] = _pending_entry()
+    backend_main._pending["unknown-job"] = _pending_entry()
     backend_main._pending["running-job"] = _pending_entry()
+    calls = []
 
-    async def fake_query(tid):
-        if tid == "broken-job":
+    async def fake_query(tids):
+        calls.append(list(tids))
+        if len(calls) == 1:
             raise RuntimeError("AceStep busy")
-        return {"status": "processing", "results": None}
+        # AceStep omits tasks it doesn't know about
+        return {"running-job": {"status": "processing", "results": None}}
 
-    monkeypatch.setattr(backend_main, "query_result", fake_query)
+    monkeypatch.setattr(backend_main, "query_results", fake_query)
+    asyncio.run(backend_main._watch_pending_jobs_once())
     asyncio.run(backend_main._watch_pending_jobs_once())
 
-    assert "broken-job" in backend_main._pending
+    # One batched upstream call per sweep, covering every pending task
+    assert len(calls) == 2
+    assert {"unknown-job", "running-job"} <= set(calls[0])
+    assert "unknown-job" in backend_main._pending
     assert "running-job" in backend_main._pending
-    assert "broken-job" not in backend_main._jobs
+    assert "unknown-job" not in backend_main._jobs
     # cleanup module state for other tests
-    del backend_main._pending["broken-job"]
+    del backend_main._pending["unknown-job"]
     del backend_main._pending["running-job"]
 
 
@@ -86,7 +142,11 @@ def test_status_returns_enriched_results_after_watcher_finalized(tmp_path, monke
     async def fake_query(tid):
         return fresh_done()  # new dicts every call, like a real AceStep response
 
+    async def fake_query_many(tids):
+        return {tid: fresh_done() for tid in tids}
+
     monkeypatch.setattr(backend_main, "query_result", fake_query)
+    monkeypatch.setattr(backend_main, "query_results", fake_query_many)
 
     # Watcher finalizes first (enriches ITS copy of the results)
     asyncio.run(backend_main._watch_pending_jobs_once())
@@ -97,3 +157,68 @@ def test_status_returns_enriched_results_after_watcher_finalized(tmp_path, monke
     body = client.get(f"/status/{task_id}").json()
     assert body["results"][0]["take"] == {"job_id": task_id, "index": 0}
     assert body["results"][0]["audio_url"].endswith("take-1.mp3")
+
+
+def test_analysis_and_lyrics_run_as_watched_jobs(monkeypatch):
+    import httpx
+
+    monkeypatch.setattr(backend_main, "_pending", {})
+    monkeypatch.setattr(backend_main, "_jobs", {})
+    monkeypatch.setattr(backend_main, "_queue_order", backend_main.JobQueue())
+    upstream = []
+
+    async def fake_release(payload, backend=None):
+        upstream.append(payload)
+        return "analysis-1"
+
+    async def fake_sample(description, vocal_language):
+        return "lyrics-1"
+
+    async def fake_stage(path, backend):
+        return path
+
+    async def fake_query_many(tids):
+        meta = {"bpm": "96", "keyscale": "A minor", "timesignature": "3", "duration": 31.5}
+        return {tid: {"status": "done", "results": [{"prompt": f"{tid} caption", "lyrics": "la",
+                                                     "audio_url": "", "meta": meta}]}
+                for tid in tids}
+
+    monkeypatch.setattr(backend_main, "release_task", fake_release)
+    monkeypatch.setattr(backend_main, "create_sample", fake_sample)
+    monkeypatch.setattr(backend_main, "_stage_audio", fake_stage)
+    monkeypatch.setattr(backend_main, "query_results", fake_query_many)
+    monkeypatch.setattr(backend_main, "_service_free_at", {})
+    observed = []
+    monkeypatch.setattr(backend_main._runtime, "observe", lambda *args: observed.append(args))
+
+    async def go():
+        transport = httpx.ASGITransport(app=backend_main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://wrangler") as client:
+            submitted = (await client.post("/analyze-audio?async=true",
+                                           json={"audio_path": "/tmp/x.wav"})).json()
+            running = (await client.get(f"/status/{submitted['task_id']}")).json()
+            in_progress = backend_main._jobs_in_progress("local")
+            # The blocking form waits on the watcher instead of polling AceStep itself
+            blocking = asyncio.create_task(client.post("/generate-lyrics", json={"description": "sea"}))
+            while "lyrics-1" not in backend_main._pending:
+                await asyncio.sleep(0)
+            for p in backend_main._pending.values():
+                p["next_check"] = 0.0
+            await backend_main._watch_pending_jobs_once()
+            done = (await client.get(f"/status/{submitted['task_id']}")).json()
+            lyrics = (await blocking).json()
+        return submitted, running, in_progress, done, lyrics
+
+    submitted, running, in_progress, done, lyrics = asyncio.run(go())
+    assert submitted == {"task_id": "analysis-1", "status": "processing", "kind": "analysis"}
+    # Sent to AceStep outside fair-share dispatch: no slot, no per-user count
+    assert running["status"] == "processing" and running["queue_position"] == -1
+    assert running["eta_seconds"] is not None and in_progress == 0
+    assert done["status"] == "done" and done["kind"] == "analysis"
+    assert done["result"] == {"caption": "analysis-1 caption", "lyrics": "la", "bpm": 96,
+                              "key_scale": "A minor", "time_signature": "3",
+                              "vocal_language": "", "duration": 31.5}
+    assert lyrics["caption"] == "lyrics-1 caption" and lyrics["bpm"] == 96
+    assert upstream == [{"full_analysis_only": True, "src_audio_path": "/tmp/x.wav"}]
+    # Nor do they teach the render runtime model or move a backend's free time
+    assert observed == [] and backend_main._service_free_at == {}
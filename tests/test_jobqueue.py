@@ -0,0 +1,100 @@
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+from jobqueue import BULK, FairQueue, JobQueue, LaneQueue
+
+
+def test_matches_a_plain_list_through_churn_and_compaction():
+    rng = random.Random(7)
+    queue, ref = JobQueue(), []
+    for n in range(3000):
+        if ref and rng.random() < 0.45:
+            task_id, _ = ref.pop(rng.randrange(len(ref)))
+            assert queue.remove(task_id)
+        elif ref and rng.random() < 0.1:
+            # a batch handed to another member keeps its place in line
+            i = rng.randrange(len(ref))
+            item = (f"heir-{n}", rng.choice("abc"))
+            assert queue.replace(ref[i][0], *item)
+            ref[i] = item
+        else:
+            item = (f"job-{n}", rng.choice("abc"))
+            queue.append(*item)
+            ref.append(item)
+        if n % 97 == 0:
+            assert list(queue) == ref
+            for i, (task_id, _) in enumerate(ref):
+                assert queue.position(task_id) == i
+            for user in "abc":
+                assert queue.count(user) == sum(1 for _, u in ref if u == user)
+    assert len(queue) == len(ref)
+    assert not queue.remove("job-missing") and queue.position("job-missing") == -1
+    # Holes never outnumber live jobs for long
+    assert len(queue._items) - 1 <= 2 * len(ref) + 65
+
+
+def test_fair_queue_round_robin_with_weights_and_positions():
+    queue = FairQueue({"heavy": 2})
+    for i in range(4):
+        queue.push(f"a{i}", "alice")          # alice floods the queue first
+    queue.push("b0", "bob")
+    for i in range(3):
+        queue.push(f"h{i}", "heavy")
+    queue.push_urgent("lost", "bob")          # a resubmission jumps every turn
+
+    expected = ["lost", "a0", "b0", "h0", "h1", "a1", "h2", "a2", "a3"]
+    assert [t for t, _ in queue] == expected
+    assert [queue.position(t) for t in expected] == list(range(len(expected)))
+    assert queue.count("bob") == 2 and queue.position("nope") == -1
+
+    dispatched = []
+    while len(queue):
+        task_id = queue.peek()
+        if task_id == "a2":
+            queue.push("b1", "bob")           # bob rejoins at the end of the rotation
+        order = [t for t, _ in queue]
+        assert [queue.position(t) for t in order] == list(range(len(order)))
+        assert queue.dispatched(task_id)
+        dispatched.append(task_id)
+    assert dispatched == expected[:7] + ["a2", "b1", "a3"]
+
+
+def test_fair_queue_removal_keeps_turns_consistent():
+    rng = random.Random(3)
+    queue = FairQueue({"u1": 3, "u2": 2})
+    n = 0
+    for _ in range(2000):
+        roll = rng.random()
+        if roll < 0.45 or not len(queue):
+            queue.push(f"j{n}", rng.choice(["u0", "u1", "u2", "u3"]))
+            n += 1
+        elif roll < 0.8:
+            queue.dispatched(queue.peek())
+        else:
+            queue.remove(rng.choice([t for t, _ in queue]))
+        order = [t for t, _ in queue]
+        assert sorted(order) == sorted(queue._owner)
+        assert [queue.position(t) for t in order] == list(range(len(order)))
+        assert queue.peek() == (order[0] if order else None)
+
+
+def test_lane_queue_serves_interactive_first_and_ages_bulk():
+    queue = LaneQueue(aging_s=60)
+    queue.push("render-a", "alice", BULK, now=0)
+    queue.push("render-b", "bob", BULK, now=30)
+    queue.push("preview", "bob", now=40)
+    assert [t for t, _ in queue] == ["preview", "render-a", "render-b"]
+    assert [queue.position(t) for t in ("preview", "render-a", "render-b")] == [0, 1, 2]
+    assert queue.count("bob") == 2 and queue.lane("render-b") == BULK
+
+    queue.push("preview-2", "carol", now=50)
+    assert queue.age(now=59) == 0
+    assert queue.age(now=60) == 1                # render-a has waited long enough
+    assert queue.lane("render-a") == "interactive"
+    assert [t for t, _ in queue] == ["preview", "preview-2", "render-a", "render-b"]
+
+    assert queue.dispatched(queue.peek()) and queue.remove("render-b")
+    assert queue.age(now=1000) == 0              # stale entries are skipped
+    assert [t for t, _ in queue] == ["preview-2", "render-a"] and len(queue) == 2
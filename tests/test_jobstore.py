@@ -0,0 +1,101 @@
+import asyncio
+import sqlite3
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+import jobstore
+import takes
+import main as backend_main
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobstore, "DB_PATH", str(tmp_path / "jobs.db"))
+    monkeypatch.setattr(jobstore, "_conn", None)
+    monkeypatch.setattr(jobstore, "_dirty", {})
+    monkeypatch.setattr(jobstore, "_stats", {k: 0 for k in jobstore._stats})
+    yield tmp_path / "jobs.db"
+    asyncio.run(jobstore.stop())
+
+
+def _fresh_state(monkeypatch):
+    monkeypatch.setattr(backend_main, "_pending", {})
+    monkeypatch.setattr(backend_main, "_jobs", {})
+    monkeypatch.setattr(backend_main, "_uploads", {})
+    monkeypatch.setattr(backend_main, "_queue_order", backend_main.JobQueue())
+    monkeypatch.setattr(backend_main, "_waiting", backend_main.LaneQueue())
+
+
+def test_changes_are_coalesced_into_one_batch(store):
+    jobstore.put_job("a", "alice", "pending", 1.0, {"n": 1})
+    jobstore.put_job("b", "bob", "pending", 2.0, {})
+    jobstore.put_job("a", "alice", "done", 1.0, {"n": 2})
+    jobstore.delete_job("b")
+    jobstore.put_upload("u1", "alice", 3.0, {"path": "/tmp/x.wav"})
+
+    async def go():
+        await jobstore.flush()
+        return await jobstore.load()
+
+    jobs, uploads = asyncio.run(go())
+    assert [(j["task_id"], j["status"], j["data"]) for j in jobs] == [("a", "done", {"n": 2})]
+    assert uploads[0]["data"]["path"] == "/tmp/x.wav"
+    assert jobstore.stats()["batches"] == 1 and jobstore.stats()["unflushed"] == 0
+    with sqlite3.connect(store) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        indexes = {r[1] for r in conn.execute("PRAGMA index_list(jobs)")}
+    assert {"jobs_user", "jobs_status", "jobs_created_at"} <= indexes
+
+
+def test_pending_jobs_survive_a_restart(store, tmp_path, monkeypatch):
+    monkeypatch.setattr(takes, "TAKES_DIR", tmp_path / "takes")
+    _fresh_state(monkeypatch)
+    monkeypatch.setattr(backend_main, "_engine_ready", True)
+
+    async def fake_release(payload, backend=None):
+        return "up-1"
+
+    monkeypatch.setattr(backend_main, "release_task", fake_release)
+
+    async def before_restart():
+        transport = httpx.ASGITransport(app=backend_main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://wrangler") as client:
+            await client.post("/generate", json={"style": "kept", "seed": 42},
+                              headers={"x-auth-user": "alice"})
+        monkeypatch.setattr(backend_main, "_engine_ready", False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://wrangler") as client:
+            held = (await client.post("/generate", json={"style": "held"})).json()["task_id"]
+        await jobstore.flush()
+        return held
+
+    held = asyncio.run(before_restart())
+    _fresh_state(monkeypatch)   # the process restarts
+    asyncio.run(backend_main._restore_jobs())
+
+    assert list(backend_main._queue_order) == [("up-1", "alice")]
+    running = backend_main._pending["up-1"]
+    assert running["next_check"] == 0.0 and running["upstream_id"] == "up-1"
+    assert running["request"].seed == 42 and running["request"].style == "kept"
+    assert list(backend_main._waiting) == [(held, "local")]
+    assert backend_main._pending[held]["upstream_id"] is None
+
+
+def test_held_job_with_an_unusable_request_fails_on_restore(store, monkeypatch):
+    _fresh_state(monkeypatch)
+    params = {"task_type": "text2music"}
+    for task_id, request in (("old-held", {"duration": "not a number"}), ("bare-held", None)):
+        jobstore.put_job(task_id, "alice", "pending", 1.0, {
+            "params": params, "format": "mp3", "upstream_id": None, "request": request})
+
+    async def go():
+        await jobstore.flush()
+        await backend_main._restore_jobs()
+        await jobstore.flush()
+        return await jobstore.load()
+
+    jobs, _ = asyncio.run(go())
+    assert not backend_main._waiting and not backend_main._pending and not jobs
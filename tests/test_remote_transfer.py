@@ -0,0 +1,102 @@
+import asyncio
+import socket
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import pytest
+import uvicorn
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+sys.path.insert(0, str(Path(__file__).parent.parent / "benchmarks"))
+import acestep_wrapper as aw
+import fake_acestep
+import takes
+import transfer
+import main as backend_main
+
+
+@pytest.fixture
+def remote_acestep(tmp_path, monkeypatch):
+    """Simulated AceStep on its own port, writing into a directory Wrangler
+    never reads directly — the transfer layer is the only way across."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    app = fake_acestep.create_app(gen_time="fixed:0", output_dir=str(tmp_path / "gpu-box"))
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+
+    monkeypatch.setattr(aw, "ACESTEP_BASE_URL", f"http://127.0.0.1:{port}")
+    monkeypatch.setattr(aw, "_client", None)
+    monkeypatch.setattr(transfer, "REMOTE", True)
+    monkeypatch.setattr(transfer, "CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setattr(transfer, "_index_loaded", False)
+    monkeypatch.setattr(transfer, "_lru", OrderedDict())
+    monkeypatch.setattr(transfer, "_lru_bytes", 0)
+    monkeypatch.setattr(transfer, "_remote_paths", OrderedDict())
+    monkeypatch.setattr(transfer, "_uploads", OrderedDict())
+    monkeypatch.setattr(transfer, "_stats", {k: 0 for k in transfer._stats})
+    monkeypatch.setattr(takes, "TAKES_DIR", tmp_path / "takes")
+    yield app
+    server.should_exit = True
+    thread.join(timeout=5)
+
+
+def test_source_upload_and_result_download_over_http(remote_acestep, tmp_path):
+    app = remote_acestep
+    src = tmp_path / "local-src.wav"
+    src.write_bytes(b"RIFF-local-source")
+
+    async def go():
+        try:
+            first = await backend_main._stage_audio(str(src))
+            again = await backend_main._stage_audio(str(src))
+            task_id = await aw.release_task({"prompt": "p", "audio_format": "wav",
+                                             "task_type": "cover", "src_audio_path": first})
+            await app.state.render(task_id)
+            data = (await aw.query_results([task_id]))[task_id]
+            await transfer.localize(data["results"])
+            backend_main._persist_results(task_id, data["results"],
+                                          {"params": {"task_type": "cover"}, "format": "wav"})
+            return first, again, task_id, data
+        finally:
+            await aw.close_client()
+
+    first, again, task_id, data = asyncio.run(go())
+
+    # Uploaded once per content hash; the server-side copy is what AceStep reads
+    assert first == again and app.state.uploads == 1
+    assert Path(first).read_bytes() == src.read_bytes()
+    assert data["status"] == "done"
+    # The take was written from the streamed copy, not AceStep's own path
+    take_audio = takes.audio_path_for(task_id, 0)
+    assert take_audio is not None and take_audio.parent == tmp_path / "takes" / task_id
+    assert transfer.stats()["bytes_fetched"] == take_audio.stat().st_size
+
+
+def test_cache_evicts_least_recently_used(remote_acestep, tmp_path, monkeypatch):
+    gpu = tmp_path / "gpu-box"
+    for name in ("a", "b", "c"):
+        (gpu / f"{name}.wav").write_bytes(name.encode() * 100)
+    monkeypatch.setattr(transfer, "CACHE_MAX_BYTES", 250)
+
+    async def go():
+        try:
+            await transfer.fetch(str(gpu / "a.wav"))
+            await transfer.fetch(str(gpu / "b.wav"))
+            await transfer.fetch(str(gpu / "a.wav"))   # hit — a becomes most recent
+            await transfer.fetch(str(gpu / "c.wav"))   # evicts b
+        finally:
+            await aw.close_client()
+
+    asyncio.run(go())
+    assert transfer.cached(str(gpu / "a.wav")) is not None
+    assert transfer.cached(str(gpu / "b.wav")) is None
+    assert transfer.cached(str(gpu / "c.wav")).read_bytes() == b"c" * 100
+    assert transfer.stats()["hits"] == 1 and transfer.stats()["evictions"] == 1
@@ -0,0 +1,114 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+import resultcache
+import takes
+import main as backend_main
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    monkeypatch.setattr(takes, "TAKES_DIR", tmp_path / "takes")
+    monkeypatch.setattr(backend_main, "_pending", {})
+    monkeypatch.setattr(backend_main, "_jobs", {})
+    monkeypatch.setattr(backend_main, "_queue_order", backend_main.JobQueue())
+    monkeypatch.setattr(backend_main, "_waiting", backend_main.LaneQueue())
+    monkeypatch.setattr(backend_main, "_results", resultcache.ResultCache())
+    monkeypatch.setattr(backend_main, "_engine_ready", True)
+    monkeypatch.setattr(backend_main, "MAX_USERS", 0)
+    state = {"submitted": [], "lora": {"loaded": False}}
+    out = tmp_path / "out"
+    out.mkdir()
+
+    async def fake_release(payload, backend=None):
+        state["submitted"].append(payload)
+        return f"up-{len(state['submitted'])}"
+
+    async def fake_query(tids):
+        done = {}
+        for t in tids:
+            audio = out / f"{t}.mp3"
+            audio.write_bytes(t.encode())
+            done[t] = {"status": "done", "results": [{"audio_url": str(audio), "meta": {}}]}
+        return done
+
+    async def fake_lora_status():
+        return state["lora"]
+
+    monkeypatch.setattr(backend_main, "release_task", fake_release)
+    monkeypatch.setattr(backend_main, "query_results", fake_query)
+    monkeypatch.setattr(backend_main, "lora_status", fake_lora_status)
+    return state
+
+
+async def _generate(client, body, user="alice"):
+    headers = {"x-auth-user": user}
+    r = (await client.post("/generate", json=body, headers=headers)).json()
+    if r.get("status") != "done":
+        backend_main._pending[r["task_id"]]["next_check"] = 0.0
+        await backend_main._watch_pending_jobs_once()
+    return r
+
+
+def test_fixed_seed_repeat_is_served_from_the_earlier_take(engine):
+    body = {"style": "lofi", "seed": 7}
+
+    async def go():
+        transport = httpx.ASGITransport(app=backend_main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://wrangler") as client:
+            first = await _generate(client, body)
+            again = await _generate(client, body)
+            audio = await client.get(f"/download/{again['task_id']}/0/audio",
+                                     headers={"x-auth-user": "alice"})
+            other_user = await _generate(client, body, user="bob")
+            random_seed = await _generate(client, {"style": "lofi"})
+            engine["lora"] = {"loaded": True, "scale": 0.8}
+            other_lora = await _generate(client, body)
+        return first, again, audio, other_user, random_seed, other_lora
+
+    first, again, audio, other_user, random_seed, other_lora = asyncio.run(go())
+    assert again["cached"] is True and again["task_id"] != first["task_id"]
+    cached = backend_main._jobs[again["task_id"]]["results"][0]
+    assert cached["take"] == {"job_id": first["task_id"], "index": 0}
+    assert audio.status_code == 200 and audio.content == first["task_id"].encode()
+    # Other users, random seeds and a different LoRA state all render afresh
+    assert not any(r.get("cached") for r in (other_user, random_seed, other_lora))
+    assert len(engine["submitted"]) == 4
+
+
+def test_deleted_take_is_a_miss(engine):
+    body = {"style": "lofi", "seed": 7}
+
+    async def go():
+        transport = httpx.ASGITransport(app=backend_main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://wrangler") as client:
+            first = await _generate(client, body)
+            takes.delete_take(first["task_id"], 0)
+            return await _generate(client, body)
+
+    again = asyncio.run(go())
+    assert "cached" not in again and len(engine["submitted"]) == 2
+
+
+def test_key_follows_audio_content_and_cache_is_bounded(tmp_path):
+    a, b, c = (tmp_path / n for n in ("a.wav", "b.wav", "c.wav"))
+    a.write_bytes(b"same")
+    b.write_bytes(b"same")
+    c.write_bytes(b"different")
+    payload = {"prompt": "p", "seed": 1, "src_audio_path": "ignored"}
+    keys = [resultcache.request_key(payload, {"src_audio_path": resultcache.file_digest(str(p))}, None)
+            for p in (a, b, c)]
+    assert keys[0] == keys[1] != keys[2]
+    assert resultcache.request_key({**payload, "seed": 2}, {}, None) != \
+        resultcache.request_key(payload, {}, None)
+
+    cache = resultcache.ResultCache(max_entries=2)
+    for i in range(3):
+        cache.put("u", f"k{i}", f"job-{i}", [])
+    assert cache.get("u", "k0") is None and cache.get("u", "k2")["task_id"] == "job-2"
+    assert cache.get("v", "k2") is None
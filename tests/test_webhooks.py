@@ -0,0 +1,141 @@
+import asyncio
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+import takes
+import webhooks
+import main as backend_main
+
+
+@pytest.fixture
+def receiver():
+    """A real HTTP receiver on a loopback port; replies with queued statuses."""
+    seen, replies = [], []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            seen.append((dict(self.headers), body))
+            self.send_response(replies.pop(0) if replies else 200)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/hook", seen, replies
+    server.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def _fresh_webhooks(monkeypatch):
+    monkeypatch.setattr(webhooks, "_stats", {k: 0 for k in webhooks._stats})
+    monkeypatch.setattr(webhooks, "_backoff", lambda attempt: 0)
+    monkeypatch.setattr(webhooks, "WEBHOOK_ALLOWED_HOSTS", {"127.0.0.1"})   # the receiver
+
+
+def _run_until_settled(fn, deliveries=1):
+    async def go():
+        webhooks.start(1)
+        try:
+            fn()
+            for _ in range(200):
+                s = webhooks.stats()
+                if s["delivered"] + s["failed"] >= deliveries and not s["pending"]:
+                    break
+                await asyncio.sleep(0.02)
+        finally:
+            await webhooks.stop()
+
+    asyncio.run(go())
+
+
+def test_done_job_posts_signed_payload_and_retries(receiver, tmp_path, monkeypatch):
+    url, seen, replies = receiver
+    replies.append(503)  # first attempt fails, second succeeds
+    monkeypatch.setattr(takes, "TAKES_DIR", tmp_path)
+    src = tmp_path / "gen.mp3"
+    src.write_bytes(b"audio")
+    backend_main._pending["hook-job-1"] = {
+        "params": {"task_type": "text2music"}, "format": "mp3", "user": "alice",
+        "created_at": time.monotonic(),
+        "callback": {"url": url, "secret": "s3cret"},
+    }
+    done = {"status": "done",
+            "results": [{"audio_url": f"/v1/audio?path={src}", "meta": {},
+                         "prompt": "p", "lyrics": "", "seed_value": "9"}]}
+
+    _run_until_settled(lambda: backend_main._finalize_job("hook-job-1", done))
+
+    assert len(seen) == 2
+    headers, body = seen[-1]
+    assert headers["X-Wrangler-Event"] == "job.done"
+    assert seen[0][0]["X-Wrangler-Delivery"] == headers["X-Wrangler-Delivery"]
+    assert headers["X-Wrangler-Signature"] == webhooks.sign(
+        "s3cret", headers["X-Wrangler-Timestamp"], body)
+    payload = json.loads(body)
+    assert payload["task_id"] == "hook-job-1" and payload["user"] == "alice"
+    assert payload["takes"] == [{"job_id": "hook-job-1", "index": 0}]
+    assert webhooks.stats()["delivered"] == 1 and webhooks.stats()["retried"] == 1
+
+
+def test_client_error_is_not_retried(receiver):
+    url, seen, replies = receiver
+    replies.append(410)
+    _run_until_settled(lambda: webhooks.enqueue(url, None, "job.failed", {"task_id": "x"}))
+    assert len(seen) == 1
+    assert "X-Wrangler-Signature" not in seen[0][0]
+    assert webhooks.stats()["failed"] == 1
+
+
+def test_unsendable_url_fails_without_killing_the_worker(receiver):
+    url, seen, _ = receiver
+    _run_until_settled(lambda: [webhooks.enqueue("http://exa\u0000mple.com/", None, "job.failed", {}),
+                                webhooks.enqueue(url, None, "job.failed", {"task_id": "x"})],
+                       deliveries=2)
+    assert len(seen) == 1
+    assert webhooks.stats()["failed"] == 1 and webhooks.stats()["delivered"] == 1
+
+
+def test_generate_rejects_non_http_callback():
+    from fastapi.testclient import TestClient
+
+    client = TestClient(backend_main.app)
+    for bad in ("file:///etc/passwd", "http://exa\u0000mple.com/", "http:///no-host"):
+        assert client.post("/generate", json={"callback_url": bad}).status_code == 422
+
+
+def test_callbacks_to_private_hosts_need_the_allowlist(receiver, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    url, seen, _ = receiver
+    assert asyncio.run(webhooks.url_allowed(url))
+    monkeypatch.setattr(webhooks, "WEBHOOK_ALLOWED_HOSTS", set())
+    client = TestClient(backend_main.app)
+    for private in (url, "http://localhost:8000/", "http://[::1]/", "http://10.0.0.5/hook",
+                    "http://169.254.169.254/latest/meta-data/"):
+        assert client.post("/generate", json={"callback_url": private}).status_code == 422
+    # An address that went private after submit is refused at send time too
+    _run_until_settled(lambda: webhooks.enqueue(url, None, "job.failed", {"task_id": "x"}))
+    assert seen == [] and webhooks.stats()["failed"] == 1
+
+
+def test_stored_request_leaves_out_the_callback_secret(monkeypatch):
+    stored = {}
+    monkeypatch.setattr(backend_main.jobstore, "put_job",
+                        lambda task_id, user, state, created, data: stored.update(data))
+    req = backend_main.GenerateRequest(callback_url="https://example.com/hook",
+                                       callback_secret="s3cret")
+    monkeypatch.setitem(backend_main._pending, "held-hook-job", {
+        "params": req.model_dump(exclude=backend_main._CALLBACK_FIELDS), "format": "mp3",
+        "user": "alice", "created_at": time.monotonic(), "upstream_id": None, "request": req})
+    backend_main._store_pending("held-hook-job")
+    assert "callback_secret" not in stored["request"] and "callback_url" not in stored["request"]